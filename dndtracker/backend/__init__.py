@@ -1,10 +1,13 @@
 """Backend package for DnD tracker."""
 
+from .async_store import AsyncEncounterStore, AsyncInMemoryEncounterStore
 from .security import generate_token, hash_token, verify_token
 from .state import build_initial_state
 from .store import EncounterStore, InMemoryEncounterStore
 
 __all__ = [
+    "AsyncEncounterStore",
+    "AsyncInMemoryEncounterStore",
     "build_initial_state",
     "EncounterStore",
     "generate_token",
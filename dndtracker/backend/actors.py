@@ -0,0 +1,208 @@
+"""Per-encounter command queues that serialize writes in front of an async store."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Any, Awaitable, Callable
+
+from .async_store import AsyncEncounterStore
+from .models import ActionBatchResult, CreatedEncounter, EncounterAccess, EncounterRecord, HistoryPage
+from .tracing import TRACER
+
+
+@dataclass
+class _Command:
+    token: str
+    run: Callable[[], Awaitable[Any]]
+    future: asyncio.Future[Any]
+    # Host actions queued back to back with the same token are persisted together.
+    action: dict[str, Any] | None = None
+
+    def resolve(self, result: Any) -> None:
+        if not self.future.done():
+            self.future.set_result(result)
+
+    def fail(self, exc: BaseException) -> None:
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+@dataclass
+class _EncounterActor:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue[_Command] = field(default_factory=asyncio.Queue)
+    task: asyncio.Task[None] | None = None
+
+
+class EncounterActors:
+    """Gives each active encounter one consumer task that applies its writes in arrival order.
+
+    Different encounters run concurrently; writes to one encounter never race each other in this
+    process, so the store's row lock is only contended by other processes. Commands that pile up
+    while a write is in flight are drained together, and runs of host actions with the same token
+    are persisted in one transaction; each action still gets its own version and event. Reads go
+    straight to the wrapped store.
+    """
+
+    def __init__(self, store: AsyncEncounterStore, max_batch: int = 100) -> None:
+        self.store = store
+        self.max_batch = max(1, max_batch)
+        self._actors: dict[str, _EncounterActor] = {}
+
+    @property
+    def active(self) -> int:
+        return len(self._actors)
+
+    async def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
+        return await self.store.create_encounter(name=name, host_token=host_token, player_token=player_token)
+
+    async def get_encounter_state(self, encounter_id: str, raw_token: str) -> EncounterRecord | None:
+        return await self.store.get_encounter_state(encounter_id=encounter_id, raw_token=raw_token)
+
+    async def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        with TRACER.span("get_encounter_access", "store"):
+            return await self.store.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
+
+    async def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        return await self.store.load_state(encounter_id=encounter_id)
+
+    async def invalidate(self, encounter_id: str, version: int) -> None:
+        await self.store.invalidate(encounter_id=encounter_id, version=version)
+
+    async def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        return await self._submit(
+            encounter_id,
+            raw_token,
+            lambda: self.store.apply_action(encounter_id=encounter_id, raw_token=raw_token, action=action),
+            action=action,
+        )
+
+    async def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        return await self._submit(
+            encounter_id,
+            raw_token,
+            lambda: self.store.apply_actions(encounter_id=encounter_id, raw_token=raw_token, actions=actions),
+        )
+
+    async def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
+        return await self._submit(
+            encounter_id,
+            raw_token,
+            lambda: self.store.append_roll(encounter_id=encounter_id, raw_token=raw_token, roll=roll),
+        )
+
+    async def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
+        return await self._submit(
+            encounter_id,
+            raw_token,
+            lambda: self.store.append_chat(encounter_id=encounter_id, raw_token=raw_token, message=message),
+        )
+
+    async def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        return await self._submit(
+            encounter_id,
+            raw_token,
+            lambda: self.store.register_player(encounter_id=encounter_id, raw_token=raw_token, name=name),
+        )
+
+    async def get_log_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        return await self.store.get_log_page(encounter_id=encounter_id, raw_token=raw_token, before=before, limit=limit)
+
+    async def get_chat_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        return await self.store.get_chat_page(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            before=before,
+            limit=limit,
+        )
+
+    async def open(self) -> None:
+        await self.store.open()
+
+    async def close(self) -> None:
+        """Let every actor finish the commands it already accepted, then close the store."""
+        loop = asyncio.get_running_loop()
+        tasks = [actor.task for actor in self._actors.values() if actor.loop is loop and actor.task is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.store.close()
+
+    async def _submit(
+        self,
+        encounter_id: str,
+        token: str,
+        run: Callable[[], Awaitable[Any]],
+        action: dict[str, Any] | None = None,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        command = _Command(token=token, run=run, future=loop.create_future(), action=action)
+        self._actor(encounter_id, loop).queue.put_nowait(command)
+        return await command.future
+
+    def _actor(self, encounter_id: str, loop: asyncio.AbstractEventLoop) -> _EncounterActor:
+        actor = self._actors.get(encounter_id)
+        # An actor belongs to the loop that started it; a caller on another loop (test clients) gets its own.
+        if actor is None or actor.loop is not loop:
+            actor = _EncounterActor(loop=loop)
+            actor.task = loop.create_task(self._run(encounter_id, actor))
+            self._actors[encounter_id] = actor
+        return actor
+
+    async def _run(self, encounter_id: str, actor: _EncounterActor) -> None:
+        # The actor lives only while its encounter has queued writes, so idle encounters cost nothing.
+        while not actor.queue.empty():
+            batch = [actor.queue.get_nowait()]
+            while len(batch) < self.max_batch and not actor.queue.empty():
+                batch.append(actor.queue.get_nowait())
+            commands = [command for command in batch if not command.future.done()]
+            for _, group in groupby(commands, key=lambda command: (command.action is not None, command.token)):
+                await self._execute(encounter_id, list(group))
+        # No await between the empty check and retiring, so no command can slip in unseen.
+        self._retire(encounter_id, actor)
+
+    def _retire(self, encounter_id: str, actor: _EncounterActor) -> None:
+        if self._actors.get(encounter_id) is actor:
+            del self._actors[encounter_id]
+
+    async def _execute(self, encounter_id: str, commands: list[_Command]) -> None:
+        if len(commands) > 1 and commands[0].action is not None:
+            try:
+                results = await self.store.apply_each_action(
+                    encounter_id=encounter_id,
+                    raw_token=commands[0].token,
+                    actions=[command.action for command in commands if command.action is not None],
+                )
+            except Exception as exc:
+                # The shared write failed, so none of the run is committed; retrying is up to each caller.
+                for command in commands:
+                    command.fail(exc)
+                return
+            for command, result in zip(commands, results):
+                if isinstance(result, Exception):
+                    command.fail(result)
+                else:
+                    command.resolve(result)
+            return
+        for command in commands:
+            try:
+                command.resolve(await command.run())
+            except Exception as exc:
+                command.fail(exc)
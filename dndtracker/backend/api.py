@@ -2,17 +2,35 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 import secrets
-from collections import defaultdict
-from typing import Any
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
 
-from fastapi import Depends, FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
+from .actors import EncounterActors
+from .async_store import AsyncEncounterStore, as_async_store, create_async_store
+from .broadcast import BroadcastBackend, StateUpdate, create_broadcast
+from .compact import Compactor, RetentionPolicy, run_compaction
 from .config import load_settings
-from .security import generate_token
-from .store import EncounterStore, create_store
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS
+from .patch import diff_states
+from .profiling import RequestProfiler
+from .schema import SchemaError, validate_action
+from .security import generate_token, ticket_expires_at
+from .store import EncounterStore
+from .tracing import TRACER, export_periodically
+from .wire import encode_message
+
+
+logger = logging.getLogger(__name__)
 
 
 class CreateEncounterRequest(BaseModel):
@@ -27,6 +45,14 @@ class CreateEncounterResponse(BaseModel):
 
 class EncounterStateResponse(BaseModel):
     state: dict[str, Any]
+    # Session ticket usable in place of the token until `ticket_expires_at` (unix seconds).
+    ticket: str | None = None
+    ticket_expires_at: float | None = None
+
+
+class HistoryPageResponse(BaseModel):
+    entries: list[dict[str, Any]]
+    next_before: int | None
 
 
 class ActionEnvelope(BaseModel):
@@ -34,6 +60,16 @@ class ActionEnvelope(BaseModel):
     action: dict[str, Any]
 
 
+class ActionBatchEnvelope(BaseModel):
+    token: str = Field(min_length=1)
+    actions: list[dict[str, Any]] = Field(min_length=1, max_length=500)
+
+
+class ActionBatchResponse(BaseModel):
+    state: dict[str, Any]
+    engine_events: list[list[dict[str, Any]]]
+
+
 class RollEnvelope(BaseModel):
     token: str = Field(min_length=1)
     roll: dict[str, Any]
@@ -49,39 +85,324 @@ class RegisterPlayerRequest(BaseModel):
     name: str = Field(min_length=1, max_length=200)
 
 
+class _Frame:
+    """One outbound message shared by every connection; encoded on first send, never if it goes stale first."""
+
+    __slots__ = ("message", "_text")
+
+    def __init__(self, message: dict[str, Any]) -> None:
+        self.message = message
+        self._text: str | None = None
+
+    @property
+    def is_full(self) -> bool:
+        return self.message["type"] == "state.full"
+
+    @property
+    def is_state(self) -> bool:
+        return self.message["type"] in ("state.full", "state.patch")
+
+    def text(self) -> str:
+        if self._text is None:
+            with TRACER.span("encode_message", "serialize"):
+                self._text = encode_message(self.message)
+            if METRICS.enabled and self.is_state:
+                METRICS.ws_frame_bytes.observe(len(self._text.encode("utf-8")), self.message["type"])
+        return self._text
+
+
+class _ConnectionWriter:
+    """Sends frames to one socket from its own task through a bounded, coalescing queue."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_pending: int,
+        send_timeout_s: float,
+        on_failed: Callable[[WebSocket], None],
+    ) -> None:
+        self.websocket = websocket
+        self._max_pending = max_pending
+        self._send_timeout_s = send_timeout_s
+        self._on_failed = on_failed
+        self._pending: deque[_Frame] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    def enqueue(self, frame: _Frame, full_frame: _Frame | None = None) -> None:
+        """Queue a state frame with its full-state fallback, or a reply frame (no fallback) that is never dropped."""
+        # Once the client is behind, or a full state is already waiting, only the latest full state is worth sending.
+        if full_frame is not None and (
+            frame.is_full or len(self._pending) >= self._max_pending or any(queued.is_full for queued in self._pending)
+        ):
+            # Replies are one per inbound request, so keeping them cannot grow the queue unboundedly.
+            self._pending = deque(queued for queued in self._pending if not queued.is_state)
+            self._pending.append(full_frame)
+        else:
+            self._pending.append(frame)
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                frame = self._pending.popleft()
+                if not await self._send(frame.text()):
+                    self._on_failed(self.websocket)
+                    return
+
+    async def _send(self, text: str) -> bool:
+        try:
+            await asyncio.wait_for(self.websocket.send_text(text), timeout=self._send_timeout_s)
+        except asyncio.TimeoutError:
+            # A straggler would miss this frame and drift; close it (1013) so app.js reconnects and gets a full state.
+            await self._close_quietly()
+            return False
+        except (RuntimeError, WebSocketDisconnect):
+            return False
+        return True
+
+    async def _close_quietly(self) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1013), timeout=self._send_timeout_s)
+        except (asyncio.TimeoutError, RuntimeError, WebSocketDisconnect):
+            pass
+
+
 class EncounterWebSocketHub:
-    def __init__(self) -> None:
-        self._connections: dict[str, set[WebSocket]] = defaultdict(set)
+    def __init__(self, send_timeout_s: float = 5.0, send_queue_size: int = 8) -> None:
+        self._send_timeout_s = send_timeout_s
+        self._send_queue_size = send_queue_size
+        self._connections: dict[str, dict[WebSocket, _ConnectionWriter]] = defaultdict(dict)
+        self._writers: dict[WebSocket, _ConnectionWriter] = {}
+        # Last state broadcast per encounter; the base for the next state.patch.
+        self._last_states: dict[str, dict[str, Any]] = {}
 
     async def connect(self, encounter_id: str, websocket: WebSocket) -> None:
         await websocket.accept()
-        self._connections[encounter_id].add(websocket)
+        writer = _ConnectionWriter(
+            websocket=websocket,
+            max_pending=self._send_queue_size,
+            send_timeout_s=self._send_timeout_s,
+            on_failed=lambda failed: self.disconnect(encounter_id=encounter_id, websocket=failed),
+        )
+        self._connections[encounter_id][websocket] = writer
+        self._writers[websocket] = writer
+        writer.start()
+        if METRICS.enabled:
+            METRICS.ws_connections.set(len(self._connections[encounter_id]), encounter_id)
 
     def disconnect(self, encounter_id: str, websocket: WebSocket) -> None:
         connections = self._connections.get(encounter_id)
         if connections is None:
             return
-        connections.discard(websocket)
+        writer = connections.pop(websocket, None)
+        if writer is not None:
+            self._writers.pop(websocket, None)
+            writer.stop()
+            # Only a connection that was registered moves the gauge, so repeated disconnects cannot skew it.
+            if METRICS.enabled:
+                if connections:
+                    METRICS.ws_connections.set(len(connections), encounter_id)
+                else:
+                    METRICS.ws_connections.remove(encounter_id)
         if not connections:
             self._connections.pop(encounter_id, None)
+            self._last_states.pop(encounter_id, None)
 
     async def send_state(self, websocket: WebSocket, state: dict[str, Any]) -> None:
-        await websocket.send_json({"type": "state.full", "state": state})
+        frame = _Frame({"type": "state.full", "state": state})
+        writer = self._writers.get(websocket)
+        if writer is None:
+            await websocket.send_text(frame.text())
+            return
+        writer.enqueue(frame=frame, full_frame=frame)
+
+    async def send_reply(self, websocket: WebSocket, message: dict[str, Any]) -> None:
+        """Send a message to one socket, ordered after any state frames already queued for it."""
+        frame = _Frame(message)
+        writer = self._writers.get(websocket)
+        if writer is None:
+            await websocket.send_text(frame.text())
+            return
+        writer.enqueue(frame=frame)
+
+    def is_behind(self, encounter_id: str, version: int) -> bool:
+        """True when local sockets watch the encounter and have not yet been sent `version`."""
+        if not self._connections.get(encounter_id):
+            return False
+        previous = self._last_states.get(encounter_id)
+        return previous is None or previous.get("version", 0) < version
+
+    def remember_state(self, encounter_id: str, state: dict[str, Any]) -> None:
+        previous = self._last_states.get(encounter_id)
+        if previous is None or previous.get("version", 0) < state.get("version", 0):
+            self._last_states[encounter_id] = state
+
+    def _state_message(self, encounter_id: str, state: dict[str, Any]) -> dict[str, Any]:
+        previous = self._last_states.get(encounter_id)
+        version = state.get("version")
+        if version is not None and previous is not None:
+            previous_version = previous.get("version")
+            if previous_version is not None and previous_version == version - 1:
+                return {
+                    "type": "state.patch",
+                    "baseVersion": previous_version,
+                    "version": version,
+                    "ops": diff_states(previous, state),
+                }
+        return {"type": "state.full", "state": state}
 
     async def broadcast_state(self, encounter_id: str, state: dict[str, Any]) -> None:
-        stale_connections: list[WebSocket] = []
-        for websocket in self._connections.get(encounter_id, set()):
-            try:
-                await self.send_state(websocket, state)
-            except RuntimeError:
-                stale_connections.append(websocket)
-        for websocket in stale_connections:
-            self.disconnect(encounter_id=encounter_id, websocket=websocket)
+        with TRACER.span("broadcast_state", "broadcast"):
+            if not METRICS.enabled:
+                self._fan_out(encounter_id=encounter_id, state=state)
+                return
+            started = time.perf_counter()
+            self._fan_out(encounter_id=encounter_id, state=state)
+            METRICS.broadcast_seconds.observe(time.perf_counter() - started)
+
+    def _fan_out(self, encounter_id: str, state: dict[str, Any]) -> None:
+        connections = self._connections.get(encounter_id)
+        if not connections:
+            return
+        previous = self._last_states.get(encounter_id)
+        if previous is not None and previous.get("version", 0) >= state.get("version", 0):
+            # Out-of-order delivery (concurrent requests or another process); clients already have newer state.
+            return
+        # One frame object per version is shared by every writer, so it is encoded at most once.
+        frame = _Frame(self._state_message(encounter_id=encounter_id, state=state))
+        full_frame = frame if frame.is_full else _Frame({"type": "state.full", "state": state})
+        self._last_states[encounter_id] = state
+        for writer in connections.values():
+            writer.enqueue(frame=frame, full_frame=full_frame)
+
+
+def _parse_ws_message(raw: str) -> dict[str, Any]:
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+# Inbound websocket commands: roles allowed to send them and the refusal shared with the HTTP endpoints.
+_WS_COMMANDS: dict[str, tuple[frozenset[str], str]] = {
+    "action": (frozenset({"HOST"}), "Action not allowed"),
+    "roll.submit": (frozenset({"HOST", "PLAYER"}), "Roll not allowed"),
+    "chat.send": (frozenset({"HOST", "PLAYER"}), "Chat not allowed"),
+    "player.register": (frozenset({"PLAYER"}), "Player registration not allowed"),
+}
+
+
+# Renew a socket's session ticket this long before it expires, so no command races its expiry.
+_TICKET_RENEW_MARGIN_S = 10.0
+
+
+def _ticket_is_fresh(ticket: str) -> bool:
+    expires_at = ticket_expires_at(ticket)
+    return expires_at is not None and expires_at - _TICKET_RENEW_MARGIN_S > time.time()
+
+
+def _ws_object(message: dict[str, Any], key: str) -> dict[str, Any]:
+    value = message.get(key)
+    if not isinstance(value, dict):
+        raise HTTPException(status_code=400, detail=f"{key} must be an object")
+    return value
+
+
+def _ws_text(message: dict[str, Any], key: str, max_length: int) -> str:
+    value = message.get(key)
+    if not isinstance(value, str) or not 1 <= len(value) <= max_length:
+        raise HTTPException(status_code=400, detail=f"{key} must be a string of 1 to {max_length} characters")
+    return value
+
+
+def _default_store() -> EncounterActors:
+    settings = load_settings()
+    store = create_async_store(
+        database_url=settings.database_url,
+        server_salt=settings.server_salt,
+        pool_min_size=settings.db_pool_min_size,
+        pool_max_size=settings.db_pool_max_size,
+        pool_max_idle_s=settings.db_pool_max_idle_s,
+        pool_timeout_s=settings.db_pool_timeout_s,
+        snapshot_interval=settings.snapshot_interval,
+        history_limit=settings.history_limit,
+        history_buffer_size=settings.history_buffer_size,
+        state_cache_entries=settings.state_cache_entries,
+        state_cache_bytes=settings.state_cache_bytes,
+        token_cache_ttl_s=settings.token_cache_ttl_s,
+        ticket_ttl_s=settings.ticket_ttl_s,
+        ticket_secret=settings.ticket_secret,
+        write_behind=settings.write_behind,
+        write_behind_window_s=settings.write_behind_window_s,
+        write_behind_max_events=settings.write_behind_max_events,
+        write_behind_max_buffered=settings.write_behind_max_buffered,
+    )
+    return EncounterActors(store=store, max_batch=settings.write_batch_size)
+
+
+def _default_compactor() -> Compactor | None:
+    settings = load_settings()
+    if not settings.database_url or settings.compaction_interval_s <= 0:
+        return None
+    return Compactor(
+        database_url=settings.database_url,
+        policy=RetentionPolicy(
+            keep_every=settings.snapshot_keep_every,
+            keep_round_boundaries=settings.snapshot_keep_round_boundaries,
+        ),
+        archive_dir=settings.archive_dir,
+        archive_after_days=settings.archive_after_days,
+        interval_s=settings.compaction_interval_s,
+    )
+
+
+def _default_websocket_hub() -> EncounterWebSocketHub:
+    settings = load_settings()
+    return EncounterWebSocketHub(
+        send_timeout_s=settings.ws_send_timeout_s,
+        send_queue_size=settings.ws_send_queue_size,
+    )
+
+
+def _default_broadcast() -> BroadcastBackend:
+    settings = load_settings()
+    return create_broadcast(backend=settings.broadcast_backend, database_url=settings.database_url)
 
 
-def _default_store() -> EncounterStore:
+def _default_profiler() -> RequestProfiler | None:
     settings = load_settings()
-    return create_store(database_url=settings.database_url, server_salt=settings.server_salt)
+    if settings.profile_dir is None:
+        return None
+    return RequestProfiler(
+        directory=settings.profile_dir,
+        threshold_ms=settings.profile_threshold_ms,
+        profile_all=settings.profile_all,
+        header_secret=settings.profile_secret,
+    )
+
+
+async def _watch_event_loop(interval_s: float = 0.5) -> None:
+    """Record how much later than asked the loop wakes a sleeper; blocking work shows up as lag."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval_s)
+        METRICS.event_loop_lag_seconds.observe(max(0.0, loop.time() - started - interval_s))
 
 
 def _server_roll(roll: dict[str, Any]) -> dict[str, Any]:
@@ -98,8 +419,64 @@ def _server_roll(roll: dict[str, Any]) -> dict[str, Any]:
     return normalized
 
 
-def create_app(store: EncounterStore | None = None) -> FastAPI:
-    app = FastAPI(title="DND Tracker API", version="0.5.0")
+def create_app(
+    store: EncounterStore | AsyncEncounterStore | None = None,
+    hub: EncounterWebSocketHub | None = None,
+    broadcast: BroadcastBackend | None = None,
+    compactor: Compactor | None = None,
+    metrics: bool | None = None,
+    trace_file: str | None = None,
+    profiler: RequestProfiler | None = None,
+) -> FastAPI:
+    # Writes to one encounter queue behind each other; see EncounterActors.
+    encounter_store = EncounterActors(store=as_async_store(store)) if store is not None else _default_store()
+    websocket_hub = hub if hub is not None else _default_websocket_hub()
+    broadcast_backend = broadcast if broadcast is not None else _default_broadcast()
+    # Background compaction only for the configured database; injected stores bring their own.
+    compaction = compactor if compactor is not None or store is not None else _default_compactor()
+    # Metrics are process-wide; an app only switches them on, never off for another app in the process.
+    if metrics is None:
+        metrics = load_settings().metrics
+    if metrics:
+        METRICS.enable()
+    # Tracing is process-wide as well; profiling is per request and only with a profile directory.
+    trace_settings = load_settings()
+    trace_path = trace_file if trace_file is not None else trace_settings.trace_file
+    if trace_path is not None:
+        TRACER.enable(max_events=trace_settings.trace_max_events)
+    request_profiler = profiler if profiler is not None else _default_profiler()
+
+    async def deliver_remote(update: StateUpdate) -> None:
+        await encounter_store.invalidate(encounter_id=update.encounter_id, version=update.version)
+        if not websocket_hub.is_behind(encounter_id=update.encounter_id, version=update.version):
+            return
+        state = await encounter_store.load_state(encounter_id=update.encounter_id)
+        if state is not None:
+            await websocket_hub.broadcast_state(encounter_id=update.encounter_id, state=state)
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        await encounter_store.open()
+        await broadcast_backend.start(deliver_remote)
+        background = []
+        if compaction is not None:
+            background.append(asyncio.create_task(run_compaction(compaction)))
+        if METRICS.enabled:
+            background.append(asyncio.create_task(_watch_event_loop()))
+        if trace_path is not None:
+            background.append(asyncio.create_task(export_periodically(trace_path)))
+        try:
+            yield
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            if trace_path is not None:
+                TRACER.export(trace_path)
+            await broadcast_backend.stop()
+            await encounter_store.close()
+
+    app = FastAPI(title="DND Tracker API", version="0.5.0", lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -107,26 +484,134 @@ def create_app(store: EncounterStore | None = None) -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    encounter_store = store if store is not None else _default_store()
-    websocket_hub = EncounterWebSocketHub()
     app.state.websocket_hub = websocket_hub
 
+    if METRICS.enabled:
+
+        @app.middleware("http")
+        async def time_requests(request: Request, call_next: Callable[[Request], Any]) -> Response:
+            started = time.perf_counter()
+            response = await call_next(request)
+            # The route template, so encounter ids do not become label values.
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            METRICS.http_request_seconds.observe(time.perf_counter() - started, request.method, route)
+            return response
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics_endpoint() -> Response:
+            return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+    if trace_path is not None or request_profiler is not None:
+
+        @app.middleware("http")
+        async def trace_requests(request: Request, call_next: Callable[[Request], Any]) -> Response:
+            sampler = None
+            if request_profiler is not None and request_profiler.wants(request.headers):
+                sampler = request_profiler.start()
+            started_ns = time.perf_counter_ns()
+            try:
+                return await call_next(request)
+            finally:
+                ended_ns = time.perf_counter_ns()
+                label = f"{request.method} {getattr(request.scope.get('route'), 'path', 'unmatched')}"
+                if TRACER.enabled:
+                    TRACER.record(label, "http", started_ns, ended_ns)
+                if sampler is not None:
+                    # Joining the sampler thread waits out its interval; keep that off the event loop.
+                    await asyncio.to_thread(request_profiler.finish, sampler, label, (ended_ns - started_ns) / 1e9)
+
     async def publish_state(encounter_id: str, state: dict[str, Any]) -> None:
         await websocket_hub.broadcast_state(encounter_id=encounter_id, state=state)
+        await broadcast_backend.publish(encounter_id=encounter_id, state=state)
 
     app.state.publish_state = publish_state
 
-    def get_store() -> EncounterStore:
+    def get_store() -> AsyncEncounterStore:
         return encounter_store
 
+    # Shared by the HTTP endpoints and the websocket commands; refusals surface as HTTPException.
+    async def run_action(
+        local_store: AsyncEncounterStore,
+        encounter_id: str,
+        token: str,
+        action: dict[str, Any],
+    ) -> dict[str, Any]:
+        try:
+            action = validate_action(action)
+        except SchemaError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        state = await local_store.apply_action(encounter_id=encounter_id, raw_token=token, action=action)
+        if state is None:
+            raise HTTPException(status_code=403, detail="Action not allowed")
+        await publish_state(encounter_id=encounter_id, state=state)
+        return state
+
+    async def run_roll(
+        local_store: AsyncEncounterStore,
+        encounter_id: str,
+        token: str,
+        roll: dict[str, Any],
+    ) -> dict[str, Any]:
+        state = await local_store.append_roll(encounter_id=encounter_id, raw_token=token, roll=_server_roll(roll))
+        if state is None:
+            raise HTTPException(status_code=403, detail="Roll not allowed")
+        await publish_state(encounter_id=encounter_id, state=state)
+        return state
+
+    async def run_chat(local_store: AsyncEncounterStore, encounter_id: str, token: str, message: str) -> dict[str, Any]:
+        state = await local_store.append_chat(encounter_id=encounter_id, raw_token=token, message=message)
+        if state is None:
+            raise HTTPException(status_code=403, detail="Chat not allowed")
+        await publish_state(encounter_id=encounter_id, state=state)
+        return state
+
+    async def run_register(
+        local_store: AsyncEncounterStore,
+        encounter_id: str,
+        token: str,
+        name: str,
+    ) -> dict[str, Any]:
+        state = await local_store.register_player(encounter_id=encounter_id, raw_token=token, name=name)
+        if state is None:
+            raise HTTPException(status_code=403, detail="Player registration not allowed")
+        await publish_state(encounter_id=encounter_id, state=state)
+        return state
+
+    async def run_ws_command(
+        local_store: AsyncEncounterStore,
+        encounter_id: str,
+        token: str,
+        role: str,
+        message: dict[str, Any],
+    ) -> dict[str, Any]:
+        command = message["type"]
+        roles, refusal = _WS_COMMANDS[command]
+        if role not in roles:
+            # The role was fixed when the socket connected, so obvious refusals skip the store entirely.
+            raise HTTPException(status_code=403, detail=refusal)
+        try:
+            if command == "action":
+                return await run_action(local_store, encounter_id, token, _ws_object(message, "action"))
+            if command == "roll.submit":
+                return await run_roll(local_store, encounter_id, token, _ws_object(message, "roll"))
+            if command == "chat.send":
+                return await run_chat(local_store, encounter_id, token, _ws_text(message, "message", max_length=1000))
+            return await run_register(local_store, encounter_id, token, _ws_text(message, "name", max_length=200))
+        except HTTPException:
+            raise
+        except Exception as exc:
+            # Over HTTP this would be a 500; on a socket it is one failed ack, not a dropped connection.
+            logger.exception("websocket command %s failed for encounter %s", command, encounter_id)
+            raise HTTPException(status_code=500, detail="Internal server error") from exc
+
     @app.post("/api/encounters", response_model=CreateEncounterResponse)
-    def create_encounter(
+    async def create_encounter(
         payload: CreateEncounterRequest,
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> CreateEncounterResponse:
         host_token = generate_token()
         player_token = generate_token()
-        created = local_store.create_encounter(
+        created = await local_store.create_encounter(
             name=payload.name,
             host_token=host_token,
             player_token=player_token,
@@ -138,87 +623,165 @@ def create_app(store: EncounterStore | None = None) -> FastAPI:
         )
 
     @app.get("/api/encounters/{encounter_id}", response_model=EncounterStateResponse)
-    def get_encounter(
+    async def get_encounter(
         encounter_id: str,
         token: str = Query(min_length=1),
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> EncounterStateResponse:
-        record = local_store.get_encounter_state(encounter_id=encounter_id, raw_token=token)
-        if record is None:
+        access = await local_store.get_encounter_access(encounter_id=encounter_id, raw_token=token)
+        if access is None:
+            raise HTTPException(status_code=404, detail="Encounter not found or token invalid")
+        return EncounterStateResponse(
+            state=access.state,
+            ticket=access.ticket,
+            ticket_expires_at=None if access.ticket is None else ticket_expires_at(access.ticket),
+        )
+
+    @app.get("/api/encounters/{encounter_id}/log", response_model=HistoryPageResponse)
+    async def get_log_page(
+        encounter_id: str,
+        token: str = Query(min_length=1),
+        before: int | None = Query(default=None, ge=1),
+        limit: int = Query(default=50, ge=1, le=500),
+        local_store: AsyncEncounterStore = Depends(get_store),
+    ) -> HistoryPageResponse:
+        page = await local_store.get_log_page(encounter_id=encounter_id, raw_token=token, before=before, limit=limit)
+        if page is None:
             raise HTTPException(status_code=404, detail="Encounter not found or token invalid")
-        return EncounterStateResponse(state=record.state)
+        return HistoryPageResponse(entries=page.entries, next_before=page.next_before)
+
+    @app.get("/api/encounters/{encounter_id}/chat", response_model=HistoryPageResponse)
+    async def get_chat_page(
+        encounter_id: str,
+        token: str = Query(min_length=1),
+        before: int | None = Query(default=None, ge=1),
+        limit: int = Query(default=50, ge=1, le=500),
+        local_store: AsyncEncounterStore = Depends(get_store),
+    ) -> HistoryPageResponse:
+        page = await local_store.get_chat_page(encounter_id=encounter_id, raw_token=token, before=before, limit=limit)
+        if page is None:
+            raise HTTPException(status_code=404, detail="Encounter not found or token invalid")
+        return HistoryPageResponse(entries=page.entries, next_before=page.next_before)
 
     @app.post("/api/encounters/{encounter_id}/actions", response_model=EncounterStateResponse)
     async def post_action(
         encounter_id: str,
         payload: ActionEnvelope,
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> EncounterStateResponse:
-        state = local_store.apply_action(encounter_id=encounter_id, raw_token=payload.token, action=payload.action)
-        if state is None:
-            raise HTTPException(status_code=403, detail="Action not allowed")
-        await publish_state(encounter_id=encounter_id, state=state)
+        state = await run_action(local_store, encounter_id, payload.token, payload.action)
         return EncounterStateResponse(state=state)
 
+    @app.post("/api/encounters/{encounter_id}/actions:batch", response_model=ActionBatchResponse)
+    async def post_action_batch(
+        encounter_id: str,
+        payload: ActionBatchEnvelope,
+        local_store: AsyncEncounterStore = Depends(get_store),
+    ) -> ActionBatchResponse:
+        actions: list[dict[str, Any]] = []
+        for index, action in enumerate(payload.actions):
+            try:
+                actions.append(validate_action(action))
+            except SchemaError as exc:
+                raise HTTPException(status_code=400, detail=f"actions[{index}]: {exc}") from exc
+        result = await local_store.apply_actions(encounter_id=encounter_id, raw_token=payload.token, actions=actions)
+        if result is None:
+            raise HTTPException(status_code=403, detail="Action not allowed")
+        await publish_state(encounter_id=encounter_id, state=result.state)
+        return ActionBatchResponse(state=result.state, engine_events=result.engine_events)
+
     @app.post("/api/encounters/{encounter_id}/rolls", response_model=EncounterStateResponse)
     async def post_roll(
         encounter_id: str,
         payload: RollEnvelope,
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> EncounterStateResponse:
-        roll = _server_roll(payload.roll)
-        state = local_store.append_roll(encounter_id=encounter_id, raw_token=payload.token, roll=roll)
-        if state is None:
-            raise HTTPException(status_code=403, detail="Roll not allowed")
-        await publish_state(encounter_id=encounter_id, state=state)
+        state = await run_roll(local_store, encounter_id, payload.token, payload.roll)
         return EncounterStateResponse(state=state)
 
     @app.post("/api/encounters/{encounter_id}/chat", response_model=EncounterStateResponse)
     async def post_chat(
         encounter_id: str,
         payload: ChatEnvelope,
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> EncounterStateResponse:
-        state = local_store.append_chat(encounter_id=encounter_id, raw_token=payload.token, message=payload.message)
-        if state is None:
-            raise HTTPException(status_code=403, detail="Chat not allowed")
-        await publish_state(encounter_id=encounter_id, state=state)
+        state = await run_chat(local_store, encounter_id, payload.token, payload.message)
         return EncounterStateResponse(state=state)
 
     @app.post("/api/encounters/{encounter_id}/players", response_model=EncounterStateResponse)
     async def register_player(
         encounter_id: str,
         payload: RegisterPlayerRequest,
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> EncounterStateResponse:
-        state = local_store.register_player(encounter_id=encounter_id, raw_token=payload.token, name=payload.name)
-        if state is None:
-            raise HTTPException(status_code=403, detail="Player registration not allowed")
-        await publish_state(encounter_id=encounter_id, state=state)
+        state = await run_register(local_store, encounter_id, payload.token, payload.name)
         return EncounterStateResponse(state=state)
 
     @app.websocket("/ws/encounters/{encounter_id}")
     async def encounter_ws(
         websocket: WebSocket,
         encounter_id: str,
-        local_store: EncounterStore = Depends(get_store),
+        local_store: AsyncEncounterStore = Depends(get_store),
     ) -> None:
         token = websocket.query_params.get("token")
         if token is None or token == "":
             await websocket.close(code=1008)
             return
-        access = local_store.get_encounter_access(encounter_id=encounter_id, raw_token=token)
+        access = await local_store.get_encounter_access(encounter_id=encounter_id, raw_token=token)
         if access is None:
             await websocket.close(code=1008)
             return
 
+        # Authorized once here; commands on this socket act with this role without another access lookup,
+        # and reach the store with the session ticket so it can skip its token check too.
+        role = access.role
+        ticket = access.ticket
         await websocket_hub.connect(encounter_id=encounter_id, websocket=websocket)
-        await websocket_hub.send_state(websocket=websocket, state=access.state)
-
         try:
+            await websocket_hub.send_state(websocket=websocket, state=access.state)
+            websocket_hub.remember_state(encounter_id=encounter_id, state=access.state)
             while True:
-                await websocket.receive_text()
+                message = _parse_ws_message(await websocket.receive_text())
+                message_type = message.get("type")
+                if message_type in _WS_COMMANDS:
+                    request_id = message.get("requestId")
+                    if ticket is not None and not _ticket_is_fresh(ticket):
+                        # Renewing goes through the store with the raw token, which rechecks revocation.
+                        renewed = await local_store.get_encounter_access(encounter_id=encounter_id, raw_token=token)
+                        if renewed is None:
+                            await websocket.close(code=1008)
+                            return
+                        ticket = renewed.ticket
+                    started = time.perf_counter()
+                    try:
+                        state = await run_ws_command(local_store, encounter_id, ticket or token, role, message)
+                    except HTTPException as exc:
+                        reply = {
+                            "type": "ack",
+                            "requestId": request_id,
+                            "ok": False,
+                            "status": exc.status_code,
+                            "error": exc.detail,
+                        }
+                    else:
+                        reply = {"type": "ack", "requestId": request_id, "ok": True, "version": state["version"]}
+                    if METRICS.enabled:
+                        METRICS.ws_command_seconds.observe(time.perf_counter() - started, message_type)
+                    if TRACER.enabled:
+                        TRACER.record(f"ws {message_type}", "ws", int(started * 1e9), time.perf_counter_ns())
+                    # Queued behind the state frame of this change, so the client already holds it on ack.
+                    await websocket_hub.send_reply(websocket=websocket, message=reply)
+                elif message_type == "state.resync":
+                    access = await local_store.get_encounter_access(encounter_id=encounter_id, raw_token=token)
+                    if access is None:
+                        await websocket.close(code=1008)
+                        return
+                    ticket = access.ticket if access.ticket is not None else ticket
+                    await websocket_hub.send_state(websocket=websocket, state=access.state)
         except WebSocketDisconnect:
+            pass
+        finally:
+            # Also after an unexpected error, so the hub and the connection's writer task never outlive the socket.
             websocket_hub.disconnect(encounter_id=encounter_id, websocket=websocket)
 
     return app
@@ -0,0 +1,912 @@
+"""Async persistence interfaces used by the API so store I/O never blocks the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import inspect
+from typing import Any, AsyncIterator, Callable, Protocol
+import uuid
+
+from .cache import EncounterCache
+from .events import (
+    _access_from_row,
+    _action_batch_event,
+    _action_batch_result,
+    _action_event,
+    _cached_access,
+    _chat_event,
+    _chat_page,
+    _log_page,
+    _plan_checkpoint,
+    _plan_event,
+    _player_registered_event,
+    _reduce_each_action,
+    _remember_access,
+    _replay_checkpoint,
+    _roll_event,
+    _with_ticket,
+)
+from .metrics import METRICS
+from .models import ActionBatchResult, CreatedEncounter, EncounterAccess, EncounterRecord, HistoryPage
+from .security import generate_ticket_secret, hash_token
+from .sql import (
+    SELECT_ACCESS_FOR_UPDATE_SQL,
+    SELECT_ACCESS_SQL,
+    SELECT_CHAT_PAGE_SQL,
+    SELECT_LOG_PAGE_SQL,
+    SELECT_STATE_FOR_UPDATE_SQL,
+    SELECT_STATE_SQL,
+    SELECT_TOKEN_ROLE_SQL,
+    SELECT_VERSION_FOR_UPDATE_SQL,
+    Statement,
+    create_encounter_statements,
+    history_page_params,
+)
+from .sqlite_store import SqliteEncounterStore, is_sqlite_url, sqlite_path
+from .state import build_initial_state
+from .store import EncounterStore, InMemoryEncounterStore
+from .tracing import TRACER
+from .writebehind import WriteBehindLog
+
+
+class AsyncEncounterStore(Protocol):
+    async def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
+        """Create encounter and persist initial snapshot plus token hashes."""
+
+    async def get_encounter_state(self, encounter_id: str, raw_token: str) -> EncounterRecord | None:
+        """Return encounter state when token is valid."""
+
+    async def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        """Return encounter role and state when token is valid."""
+
+    async def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        """Return current state without a token check; for server-side fan-out only."""
+
+    async def invalidate(self, encounter_id: str, version: int) -> None:
+        """Forget cached state older than `version`, which another process has committed."""
+
+    async def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        """Apply a host action and return new state when authorized."""
+
+    async def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        """Apply host actions in order as one new version; returns the state and per-action engine events."""
+
+    async def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        """Apply host actions as one version each, persisted together; per action the state, None or its error."""
+
+    async def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
+        """Append a roll entry and return new state when authorized."""
+
+    async def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
+        """Append a chat entry and return new state when authorized."""
+
+    async def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        """Register a player name and return new state when authorized."""
+
+    async def get_log_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        """Return log entries older than version `before`, grouped into at most `limit` versions."""
+
+    async def get_chat_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        """Return chat entries older than version `before`, at most `limit` messages."""
+
+    async def open(self) -> None:
+        """Acquire long-lived resources such as connection pools."""
+
+    async def close(self) -> None:
+        """Release long-lived resources acquired by the store."""
+
+
+@dataclass
+class AsyncInMemoryEncounterStore:
+    """Async facade over the in-memory store; calls run inline because they never wait on I/O."""
+
+    store: InMemoryEncounterStore
+
+    async def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
+        return self.store.create_encounter(name=name, host_token=host_token, player_token=player_token)
+
+    async def get_encounter_state(self, encounter_id: str, raw_token: str) -> EncounterRecord | None:
+        return self.store.get_encounter_state(encounter_id=encounter_id, raw_token=raw_token)
+
+    async def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        return self.store.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
+
+    async def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        return self.store.load_state(encounter_id=encounter_id)
+
+    async def invalidate(self, encounter_id: str, version: int) -> None:
+        self.store.invalidate(encounter_id=encounter_id, version=version)
+
+    async def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        return self.store.apply_action(encounter_id=encounter_id, raw_token=raw_token, action=action)
+
+    async def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        return self.store.apply_actions(encounter_id=encounter_id, raw_token=raw_token, actions=actions)
+
+    async def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        return self.store.apply_each_action(encounter_id=encounter_id, raw_token=raw_token, actions=actions)
+
+    async def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
+        return self.store.append_roll(encounter_id=encounter_id, raw_token=raw_token, roll=roll)
+
+    async def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
+        return self.store.append_chat(encounter_id=encounter_id, raw_token=raw_token, message=message)
+
+    async def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        return self.store.register_player(encounter_id=encounter_id, raw_token=raw_token, name=name)
+
+    async def get_log_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        return self.store.get_log_page(encounter_id=encounter_id, raw_token=raw_token, before=before, limit=limit)
+
+    async def get_chat_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        return self.store.get_chat_page(encounter_id=encounter_id, raw_token=raw_token, before=before, limit=limit)
+
+    async def open(self) -> None:
+        self.store.open()
+
+    async def close(self) -> None:
+        self.store.close()
+
+
+@dataclass
+class ThreadedEncounterStore:
+    """Async facade that runs a blocking EncounterStore in worker threads."""
+
+    store: EncounterStore
+
+    async def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
+        return await asyncio.to_thread(
+            self.store.create_encounter, name=name, host_token=host_token, player_token=player_token
+        )
+
+    async def get_encounter_state(self, encounter_id: str, raw_token: str) -> EncounterRecord | None:
+        return await asyncio.to_thread(self.store.get_encounter_state, encounter_id=encounter_id, raw_token=raw_token)
+
+    async def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        return await asyncio.to_thread(self.store.get_encounter_access, encounter_id=encounter_id, raw_token=raw_token)
+
+    async def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self.store.load_state, encounter_id=encounter_id)
+
+    async def invalidate(self, encounter_id: str, version: int) -> None:
+        # Cache bookkeeping only; not worth a thread hop.
+        self.store.invalidate(encounter_id=encounter_id, version=version)
+
+    async def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        return await asyncio.to_thread(
+            self.store.apply_action, encounter_id=encounter_id, raw_token=raw_token, action=action
+        )
+
+    async def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        return await asyncio.to_thread(
+            self.store.apply_actions, encounter_id=encounter_id, raw_token=raw_token, actions=actions
+        )
+
+    async def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        return await asyncio.to_thread(
+            self.store.apply_each_action, encounter_id=encounter_id, raw_token=raw_token, actions=actions
+        )
+
+    async def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
+        return await asyncio.to_thread(
+            self.store.append_roll, encounter_id=encounter_id, raw_token=raw_token, roll=roll
+        )
+
+    async def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(
+            self.store.append_chat, encounter_id=encounter_id, raw_token=raw_token, message=message
+        )
+
+    async def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(
+            self.store.register_player, encounter_id=encounter_id, raw_token=raw_token, name=name
+        )
+
+    async def get_log_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        return await asyncio.to_thread(
+            self.store.get_log_page, encounter_id=encounter_id, raw_token=raw_token, before=before, limit=limit
+        )
+
+    async def get_chat_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        return await asyncio.to_thread(
+            self.store.get_chat_page, encounter_id=encounter_id, raw_token=raw_token, before=before, limit=limit
+        )
+
+    async def open(self) -> None:
+        await asyncio.to_thread(self.store.open)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.store.close)
+
+
+@dataclass
+class AsyncPostgresEncounterStore:
+    database_url: str
+    server_salt: str
+    pool_min_size: int = 0
+    pool_max_size: int = 0
+    pool_max_idle_s: float = 300.0
+    pool_timeout_s: float = 5.0
+    snapshot_interval: int = 50
+    history_limit: int | None = 100
+    state_cache_entries: int = 256
+    state_cache_bytes: int = 64 * 1024 * 1024
+    token_cache_ttl_s: float = 60.0
+    ticket_ttl_s: float = 0.0
+    ticket_secret: str | None = field(default=None, repr=False)
+    # Write-behind: acknowledge writes from memory and group-commit them within `write_behind_window_s`.
+    # Only for deployments where one process owns each encounter; the window is the data-loss bound on a crash.
+    write_behind: bool = False
+    write_behind_window_s: float = 0.05
+    write_behind_max_events: int = 500
+    write_behind_max_buffered: int = 10_000
+
+    def __post_init__(self) -> None:
+        self._pool: Any = None
+        self._pool_lock = asyncio.Lock()
+        self._ticket_secret = self.ticket_secret or generate_ticket_secret()
+        self._cache = EncounterCache(
+            max_entries=self.state_cache_entries,
+            max_bytes=self.state_cache_bytes,
+            token_ttl_s=self.token_cache_ttl_s,
+            ticket_ttl_s=self.ticket_ttl_s,
+            ticket_secret=self._ticket_secret,
+        )
+        self._write_behind = (
+            WriteBehindLog(
+                write=self._execute_group,
+                window_s=self.write_behind_window_s,
+                max_events=self.write_behind_max_events,
+                max_buffered=self.write_behind_max_buffered,
+                is_permanent=_is_permanent_db_error,
+                # The cached state includes the dropped versions; the next access reloads what is durable.
+                on_dropped=self._cache.states.discard,
+            )
+            if self.write_behind
+            else None
+        )
+
+    @property
+    def pooled(self) -> bool:
+        return self.pool_max_size > 0
+
+    @asynccontextmanager
+    async def _connect(self) -> AsyncIterator[Any]:
+        if self.pooled:
+            pool = await self._get_pool()
+            async with pool.connection() as conn:
+                yield conn
+            return
+
+        import psycopg
+
+        async with await psycopg.AsyncConnection.connect(self.database_url) as conn:
+            yield conn
+
+    async def _get_pool(self) -> Any:
+        if self._pool is not None:
+            return self._pool
+        # Concurrent first callers wait for one pool, and nobody sees it before it is open.
+        async with self._pool_lock:
+            if self._pool is None:
+                from psycopg_pool import AsyncConnectionPool
+
+                pool = AsyncConnectionPool(
+                    self.database_url,
+                    min_size=min(self.pool_min_size, self.pool_max_size),
+                    max_size=self.pool_max_size,
+                    max_idle=self.pool_max_idle_s,
+                    timeout=self.pool_timeout_s,
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                )
+                await pool.open()
+                self._pool = pool
+        return self._pool
+
+    async def open(self) -> None:
+        if self.pooled:
+            await self._get_pool()
+        if self._write_behind is not None:
+            await self._write_behind.start()
+
+    async def close(self) -> None:
+        if self._write_behind is not None:
+            await self._write_behind.stop()
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+
+    async def flush(self) -> None:
+        """Make every write-behind write durable now; a no-op in write-through mode."""
+        if self._write_behind is not None:
+            await self._write_behind.flush()
+
+    async def _execute_group(self, statements: list[Statement]) -> None:
+        stages = METRICS.stages("postgres_write_behind")
+        async with self._connect() as conn:
+            stages.mark("connect")
+            async with conn.cursor() as cur:
+                for sql, params in statements:
+                    with TRACER.sql(sql):
+                        await cur.execute(sql, params)
+            stages.mark("write")
+            await conn.commit()
+            stages.mark("commit")
+
+    def _newest(self, encounter_id: str, state: dict[str, Any]) -> dict[str, Any]:
+        """Prefer a write-behind state that the database has not seen yet."""
+        pending = self._write_behind_state(encounter_id)
+        if pending is not None and int(pending[0]["version"]) > int(state["version"]):
+            return pending[0]
+        return state
+
+    async def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
+        encounter_id = str(uuid.uuid4())
+        state = build_initial_state(encounter_id=encounter_id, name=name)
+        statements = create_encounter_statements(
+            encounter_id=encounter_id,
+            name=name,
+            state=state,
+            host_token_hash=hash_token(host_token, self.server_salt),
+            player_token_hash=hash_token(player_token, self.server_salt),
+            now=datetime.now(timezone.utc),
+        )
+
+        async with self._connect() as conn:
+            async with conn.cursor() as cur:
+                for sql, params in statements:
+                    await cur.execute(sql, params)
+            await conn.commit()
+
+        return CreatedEncounter(encounter_id=encounter_id, host_token=host_token, player_token=player_token)
+
+    async def get_encounter_state(self, encounter_id: str, raw_token: str) -> EncounterRecord | None:
+        access = await self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
+        if access is None:
+            return None
+        return EncounterRecord(encounter_id=encounter_id, state=access.state)
+
+    async def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        access = self._cache.access(encounter_id=encounter_id, token_hash=token_hash, role=role)
+        if access is None:
+            async with self._connect() as conn:
+                async with conn.cursor() as cur:
+                    loaded = await self._fetch_access(
+                        cur=cur,
+                        encounter_id=encounter_id,
+                        token_hash=token_hash,
+                        lock=False,
+                    )
+            if loaded is None:
+                self._cache.refused(token_hash, role)
+                return None
+            access = loaded[0]
+            access = EncounterAccess(
+                encounter_id=encounter_id,
+                role=access.role,
+                state=self._newest(encounter_id, access.state),
+            )
+        return _with_ticket(access, raw_token, token_hash, secret=self._ticket_secret, ttl_s=self.ticket_ttl_s)
+
+    async def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        cached = self._cache.states.get(encounter_id)
+        if cached is not None:
+            return cached.state
+        pending = self._write_behind_state(encounter_id)
+        if pending is not None:
+            return pending[0]
+        async with self._connect() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(SELECT_STATE_SQL, (encounter_id,))
+                row = await cur.fetchone()
+        if row is None:
+            return None
+        state, pending_events = _replay_checkpoint(row, history_limit=self.history_limit)
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=state,
+            checkpoint_version=int(state["version"]) - pending_events,
+        )
+        return state
+
+    async def invalidate(self, encounter_id: str, version: int) -> None:
+        self._cache.states.discard_older(encounter_id=encounter_id, version=version)
+
+    async def checkpoint(self, encounter_id: str) -> int | None:
+        """Write a full snapshot of the current version unless one already exists."""
+        await self.flush()
+        async with self._connect() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(SELECT_STATE_FOR_UPDATE_SQL, (encounter_id,))
+                row = await cur.fetchone()
+                if row is None:
+                    return None
+                state, statements = _plan_checkpoint(encounter_id, row, history_limit=self.history_limit)
+                for sql, params in statements:
+                    await cur.execute(sql, params)
+            await conn.commit()
+        self._cache.remember(encounter_id=encounter_id, state=state, checkpoint_version=int(state["version"]))
+        return int(state["version"])
+
+    async def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        return await self._mutate(encounter_id, raw_token, lambda access: _action_event(access, action))
+
+    async def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        committed = await self._commit(encounter_id, raw_token, lambda access: _action_batch_event(access, actions))
+        return _action_batch_result(committed, action_count=len(actions))
+
+    async def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        """One version per action, all written in a single row-locked transaction or one write-behind entry."""
+        if self._write_behind is not None:
+            return await self._apply_each_behind(self._write_behind, encounter_id, raw_token, actions)
+        stages = METRICS.stages("postgres")
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        async with self._connect() as conn:
+            stages.mark("connect")
+            async with conn.cursor() as cur:
+                loaded = await self._lock_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash)
+                stages.mark("auth")
+                if loaded is None:
+                    self._cache.refused(token_hash, role)
+                    return [None for _ in actions]
+                access, pending_events = loaded
+                run = _reduce_each_action(
+                    access=access,
+                    pending_events=pending_events,
+                    actions=actions,
+                    history_limit=self.history_limit,
+                    snapshot_interval=self.snapshot_interval,
+                )
+                stages.mark("reduce")
+                if not run.statements:
+                    return run.results
+                for sql, params in run.statements:
+                    with TRACER.sql(sql):
+                        await cur.execute(sql, params)
+                stages.mark("write")
+            await conn.commit()
+            stages.mark("commit")
+
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=run.state,
+            checkpoint_version=run.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return run.results
+
+    async def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        return await self._mutate(encounter_id, raw_token, lambda access: _player_registered_event(access, name))
+
+    async def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
+        return await self._mutate(encounter_id, raw_token, lambda access: _roll_event(access, roll))
+
+    async def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
+        return await self._mutate(encounter_id, raw_token, lambda access: _chat_event(access, message))
+
+    async def _fetch_access(
+        self,
+        cur: Any,
+        encounter_id: str,
+        token_hash: str,
+        lock: bool,
+    ) -> tuple[EncounterAccess, int] | None:
+        await cur.execute(SELECT_ACCESS_FOR_UPDATE_SQL if lock else SELECT_ACCESS_SQL, (encounter_id, token_hash))
+        loaded = _access_from_row(encounter_id=encounter_id, row=await cur.fetchone(), history_limit=self.history_limit)
+        _remember_access(self._cache, loaded, token_hash)
+        return loaded
+
+    async def _lock_access(self, cur: Any, encounter_id: str, token_hash: str) -> tuple[EncounterAccess, int] | None:
+        """Row-lock the encounter; reuse the cached state when it is still the current version."""
+        cached = self._cache.states.get(encounter_id)
+        if cached is None:
+            return await self._fetch_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash, lock=True)
+        await cur.execute(SELECT_VERSION_FOR_UPDATE_SQL, (encounter_id, token_hash))
+        row = await cur.fetchone()
+        if row is None:
+            return None
+        role, current_version = row
+        current = _cached_access(encounter_id, role=role, current_version=current_version, cached=cached)
+        if current is None:
+            return await self._fetch_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash, lock=True)
+        return current
+
+    async def get_log_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        rows = await self._fetch_history_rows(SELECT_LOG_PAGE_SQL, encounter_id, raw_token, before, limit)
+        return _log_page(rows, limit)
+
+    async def get_chat_page(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> HistoryPage | None:
+        rows = await self._fetch_history_rows(SELECT_CHAT_PAGE_SQL, encounter_id, raw_token, before, limit)
+        return _chat_page(rows, limit)
+
+    async def _fetch_history_rows(
+        self,
+        sql: str,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> list[tuple[Any, Any]] | None:
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        async with self._connect() as conn:
+            async with conn.cursor() as cur:
+                if role is None:
+                    await cur.execute(SELECT_TOKEN_ROLE_SQL, (encounter_id, token_hash))
+                    if await cur.fetchone() is None:
+                        return None
+                await cur.execute(sql, history_page_params(encounter_id=encounter_id, before=before, limit=limit))
+                return await cur.fetchall()
+
+    async def _mutate(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> dict[str, Any] | None:
+        committed = await self._commit(encounter_id, raw_token, build_event)
+        return None if committed is None else committed[0]
+
+    async def _commit(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> tuple[dict[str, Any], list[dict[str, Any]]] | None:
+        """Authorize, reduce and persist one event inside a single row-locked transaction."""
+        if self._write_behind is not None:
+            return await self._commit_behind(self._write_behind, encounter_id, raw_token, build_event)
+        stages = METRICS.stages("postgres")
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        async with self._connect() as conn:
+            stages.mark("connect")
+            async with conn.cursor() as cur:
+                loaded = await self._lock_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash)
+                stages.mark("auth")
+                if loaded is None:
+                    self._cache.refused(token_hash, role)
+                    return None
+                access, pending_events = loaded
+                event = build_event(access)
+                if event is None:
+                    return None
+                planned = _plan_event(
+                    access=access,
+                    pending_events=pending_events,
+                    event=event,
+                    history_limit=self.history_limit,
+                    snapshot_interval=self.snapshot_interval,
+                )
+                stages.mark("reduce")
+                for sql, params in planned.statements:
+                    with TRACER.sql(sql):
+                        await cur.execute(sql, params)
+                stages.mark("snapshot_write" if planned.write_snapshot else "write")
+            await conn.commit()
+            stages.mark("commit")
+
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=planned.state,
+            checkpoint_version=planned.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return planned.state, planned.log_entries
+
+    async def _base_for_write(
+        self,
+        encounter_id: str,
+        token_hash: str,
+        role: str | None,
+    ) -> tuple[EncounterAccess, int] | None:
+        """Role and newest known state with its checkpoint version; the database is only asked on a cache miss."""
+        candidates: list[tuple[dict[str, Any], int]] = []
+        known_state = self._write_behind_state(encounter_id) or self._cache.states.get(encounter_id)
+        if role is None or known_state is None:
+            async with self._connect() as conn:
+                async with conn.cursor() as cur:
+                    loaded = await self._fetch_access(
+                        cur=cur,
+                        encounter_id=encounter_id,
+                        token_hash=token_hash,
+                        lock=False,
+                    )
+            if loaded is None:
+                self._cache.refused(token_hash, role)
+                return None
+            access, pending_events = loaded
+            role = access.role
+            candidates.append((access.state, int(access.state["version"]) - pending_events))
+        # Looked up after the await above, so a write queued meanwhile is not built upon stale state.
+        pending = self._write_behind_state(encounter_id)
+        if pending is not None:
+            candidates.append(pending)
+        cached = self._cache.states.get(encounter_id)
+        if cached is not None:
+            candidates.append((cached.state, cached.checkpoint_version))
+        state, checkpoint_version = max(candidates, key=lambda candidate: int(candidate[0]["version"]))
+        return EncounterAccess(encounter_id=encounter_id, role=role, state=state), checkpoint_version
+
+    def _write_behind_state(self, encounter_id: str) -> tuple[dict[str, Any], int] | None:
+        return None if self._write_behind is None else self._write_behind.latest(encounter_id)
+
+    async def _commit_behind(
+        self,
+        write_behind: WriteBehindLog,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> tuple[dict[str, Any], list[dict[str, Any]]] | None:
+        """Reduce against the in-memory state and hand the writes to the group-commit log."""
+        await write_behind.wait_for_room()
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        loaded = await self._base_for_write(encounter_id=encounter_id, token_hash=token_hash, role=role)
+        if loaded is None:
+            return None
+        access, checkpoint_version = loaded
+        event = build_event(access)
+        if event is None:
+            return None
+
+        planned = _plan_event(
+            access=access,
+            pending_events=int(access.state["version"]) - checkpoint_version,
+            event=event,
+            history_limit=self.history_limit,
+            snapshot_interval=self.snapshot_interval,
+        )
+        write_behind.add(
+            encounter_id=encounter_id,
+            state=planned.state,
+            checkpoint_version=planned.checkpoint_version,
+            statements=planned.statements,
+        )
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=planned.state,
+            checkpoint_version=planned.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return planned.state, planned.log_entries
+
+    async def _apply_each_behind(
+        self,
+        write_behind: WriteBehindLog,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        await write_behind.wait_for_room()
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        loaded = await self._base_for_write(encounter_id=encounter_id, token_hash=token_hash, role=role)
+        if loaded is None:
+            return [None for _ in actions]
+        access, checkpoint_version = loaded
+        run = _reduce_each_action(
+            access=access,
+            pending_events=int(access.state["version"]) - checkpoint_version,
+            actions=actions,
+            history_limit=self.history_limit,
+            snapshot_interval=self.snapshot_interval,
+        )
+        if not run.statements:
+            return run.results
+        write_behind.add(
+            encounter_id=encounter_id,
+            state=run.state,
+            checkpoint_version=run.checkpoint_version,
+            statements=run.statements,
+        )
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=run.state,
+            checkpoint_version=run.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return run.results
+
+
+def _is_permanent_db_error(exc: Exception) -> bool:
+    """Errors the database will repeat on retry, such as constraint violations; not lost connections."""
+    try:
+        import psycopg
+    except ImportError:
+        return False
+    return isinstance(exc, psycopg.DatabaseError) and not isinstance(
+        exc, (psycopg.OperationalError, psycopg.InterfaceError)
+    )
+
+
+def as_async_store(store: EncounterStore | AsyncEncounterStore) -> AsyncEncounterStore:
+    """Adapt a sync store for use from coroutines; async stores pass through unchanged."""
+    if inspect.iscoroutinefunction(getattr(store, "apply_action", None)):
+        return store  # type: ignore[return-value]
+    if isinstance(store, InMemoryEncounterStore):
+        return AsyncInMemoryEncounterStore(store=store)
+    return ThreadedEncounterStore(store=store)  # type: ignore[arg-type]
+
+
+def create_async_store(
+    database_url: str | None,
+    server_salt: str,
+    pool_min_size: int = 0,
+    pool_max_size: int = 0,
+    pool_max_idle_s: float = 300.0,
+    pool_timeout_s: float = 5.0,
+    snapshot_interval: int = 50,
+    history_limit: int | None = 100,
+    history_buffer_size: int = 1000,
+    state_cache_entries: int = 256,
+    state_cache_bytes: int = 64 * 1024 * 1024,
+    token_cache_ttl_s: float = 60.0,
+    ticket_ttl_s: float = 0.0,
+    ticket_secret: str | None = None,
+    write_behind: bool = False,
+    write_behind_window_s: float = 0.05,
+    write_behind_max_events: int = 500,
+    write_behind_max_buffered: int = 10_000,
+) -> AsyncEncounterStore:
+    if is_sqlite_url(database_url):
+        # SQLite writes take microseconds, so worker threads are cheaper than an async driver.
+        return ThreadedEncounterStore(
+            store=SqliteEncounterStore(
+                database_path=sqlite_path(str(database_url)),
+                server_salt=server_salt,
+                snapshot_interval=snapshot_interval,
+                history_limit=history_limit,
+                state_cache_entries=state_cache_entries,
+                state_cache_bytes=state_cache_bytes,
+                token_cache_ttl_s=token_cache_ttl_s,
+                ticket_ttl_s=ticket_ttl_s,
+                ticket_secret=ticket_secret,
+            )
+        )
+    if database_url:
+        return AsyncPostgresEncounterStore(
+            database_url=database_url,
+            server_salt=server_salt,
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pool_max_idle_s=pool_max_idle_s,
+            pool_timeout_s=pool_timeout_s,
+            snapshot_interval=snapshot_interval,
+            history_limit=history_limit,
+            state_cache_entries=state_cache_entries,
+            state_cache_bytes=state_cache_bytes,
+            token_cache_ttl_s=token_cache_ttl_s,
+            ticket_ttl_s=ticket_ttl_s,
+            ticket_secret=ticket_secret,
+            write_behind=write_behind,
+            write_behind_window_s=write_behind_window_s,
+            write_behind_max_events=write_behind_max_events,
+            write_behind_max_buffered=write_behind_max_buffered,
+        )
+    return AsyncInMemoryEncounterStore(
+        store=InMemoryEncounterStore(
+            server_salt=server_salt,
+            history_limit=history_limit,
+            history_buffer_size=history_buffer_size,
+            ticket_ttl_s=ticket_ttl_s,
+            ticket_secret=ticket_secret,
+        )
+    )
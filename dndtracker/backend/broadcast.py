@@ -0,0 +1,179 @@
+"""Broadcast backends that carry state changes to the websocket hubs of other API processes."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import json
+import logging
+from typing import Any, Awaitable, Callable, Protocol
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StateUpdate:
+    """A version committed by another process; the receiver loads the state itself."""
+
+    encounter_id: str
+    version: int
+
+
+Deliver = Callable[[StateUpdate], Awaitable[None]]
+
+
+class BroadcastBackend(Protocol):
+    async def start(self, deliver: Deliver) -> None:
+        """Begin delivering updates published by other processes."""
+
+    async def publish(self, encounter_id: str, state: dict[str, Any]) -> None:
+        """Announce a committed state change to other processes; the local hub is fed directly."""
+
+    async def stop(self) -> None:
+        """Stop listening and release connections."""
+
+
+class InProcessBroadcast:
+    """Single-process default: the local hub is the only subscriber, so there is nothing to forward."""
+
+    async def start(self, deliver: Deliver) -> None:
+        return None
+
+    async def publish(self, encounter_id: str, state: dict[str, Any]) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+
+@dataclass
+class PostgresBroadcast:
+    """Fan-out across worker processes with LISTEN/NOTIFY.
+
+    NOTIFY payloads are capped at 8000 bytes, so only the encounter id and version travel; other
+    processes reload the state when they hold sockets for that encounter. Publishing only records
+    the version; a background task sends the notifications, so requests never wait on the database.
+    """
+
+    database_url: str
+    channel: str = "dndtracker_state"
+    reconnect_delay_s: float = 1.0
+
+    def __post_init__(self) -> None:
+        self._origin = uuid.uuid4().hex
+        self._deliver: Deliver | None = None
+        self._listener: asyncio.Task[None] | None = None
+        self._sender: asyncio.Task[None] | None = None
+        self._publisher: Any = None
+        # Newest unsent version per encounter; receivers reload the state, so older ones are redundant.
+        self._unsent: dict[str, int] = {}
+        self._wakeup: asyncio.Event | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._wakeup = asyncio.Event()
+        self._listener = asyncio.create_task(self._listen())
+        self._sender = asyncio.create_task(self._send_loop(self._wakeup))
+
+    async def publish(self, encounter_id: str, state: dict[str, Any]) -> None:
+        if self._wakeup is None:
+            return
+        version = int(state["version"])
+        if version > self._unsent.get(encounter_id, 0):
+            self._unsent[encounter_id] = version
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        for task in (self._listener, self._sender):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = self._sender = None
+        # Versions published just before shutdown still reach the other processes.
+        await self._send_unsent()
+        await self._close_publisher()
+        self._deliver = None
+        self._wakeup = None
+
+    async def _send_loop(self, wakeup: asyncio.Event) -> None:
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            await self._send_unsent()
+
+    async def _send_unsent(self) -> None:
+        unsent, self._unsent = self._unsent, {}
+        if not unsent:
+            return
+
+        import psycopg
+
+        try:
+            if self._publisher is None:
+                self._publisher = await psycopg.AsyncConnection.connect(self.database_url, autocommit=True)
+            for encounter_id, version in unsent.items():
+                payload = json.dumps({"encounterId": encounter_id, "version": version, "origin": self._origin})
+                await self._publisher.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+        except Exception:
+            # The changes are committed and local sockets have them; remote ones catch up on the next version.
+            logger.warning("pg_notify failed for %d encounters", len(unsent), exc_info=True)
+            await self._close_publisher()
+
+    async def _close_publisher(self) -> None:
+        publisher, self._publisher = self._publisher, None
+        if publisher is not None:
+            try:
+                await publisher.close()
+            except Exception:
+                logger.warning("closing the NOTIFY connection failed", exc_info=True)
+
+    async def _listen(self) -> None:
+        import psycopg
+        from psycopg import sql
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.database_url, autocommit=True) as conn:
+                    await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    async for notify in conn.notifies():
+                        await self._handle(notify.payload)
+            except psycopg.Error:
+                logger.warning("LISTEN %s connection lost; reconnecting", self.channel, exc_info=True)
+            except Exception:
+                # Whatever went wrong, this process must keep receiving other workers' updates.
+                logger.exception("LISTEN %s failed; reconnecting", self.channel)
+            await asyncio.sleep(self.reconnect_delay_s)
+
+    async def _handle(self, payload: str) -> None:
+        update = parse_notification(payload, origin=self._origin)
+        if update is None or self._deliver is None:
+            return
+        try:
+            await self._deliver(update)
+        except Exception:
+            # One failed fan-out must not cost the listener its connection.
+            logger.exception("delivering update for encounter %s failed", update.encounter_id)
+
+
+def parse_notification(payload: str, origin: str) -> StateUpdate | None:
+    """Decode a NOTIFY payload; notifications sent by `origin` itself are dropped."""
+    try:
+        message = json.loads(payload)
+        if message.get("origin") == origin:
+            return None
+        return StateUpdate(encounter_id=str(message["encounterId"]), version=int(message["version"]))
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def create_broadcast(backend: str, database_url: str | None) -> BroadcastBackend:
+    if backend == "postgres":
+        if not database_url:
+            raise ValueError("DNDTRACKER_BROADCAST_BACKEND=postgres requires DNDTRACKER_DATABASE_URL")
+        return PostgresBroadcast(database_url=database_url)
+    return InProcessBroadcast()
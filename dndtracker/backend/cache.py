@@ -0,0 +1,249 @@
+"""Process-local caches that let the Postgres stores serve hot encounters without a database round trip."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any, Callable
+
+from .models import EncounterAccess
+from .security import hash_token, read_ticket
+from .wire import encode_message
+
+# Versions an encoded-size measurement stands for; see StateCache.put.
+REMEASURE_EVERY = 32
+
+
+@dataclass(frozen=True)
+class CachedState:
+    state: dict[str, Any]
+    version: int
+    # Version of the newest snapshot row, so mutations know when the next checkpoint is due.
+    checkpoint_version: int
+    size: int
+    # Version whose encoding `size` was measured on.
+    measured_version: int
+
+    @property
+    def pending_events(self) -> int:
+        return self.version - self.checkpoint_version
+
+
+class StateCache:
+    """LRU of the current state per encounter, bounded by entry count and encoded size.
+
+    Entries are only replaced by newer versions; `discard_older` drops an entry once another process
+    is known to have committed past it. Encoding a state just to size it would cost every write a full
+    serialization, so a new version inherits its predecessor's size and is only re-measured every
+    `REMEASURE_EVERY` versions; the live history windows are bounded, so sizes drift slowly.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedState] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, encounter_id: str) -> CachedState | None:
+        with self._lock:
+            entry = self._entries.get(encounter_id)
+            if entry is not None:
+                self._entries.move_to_end(encounter_id)
+            return entry
+
+    def put(self, encounter_id: str, state: dict[str, Any], checkpoint_version: int) -> None:
+        if self.max_entries <= 0:
+            return
+        version = int(state["version"])
+        with self._lock:
+            current = self._entries.get(encounter_id)
+        if current is not None and 0 <= version - current.measured_version < REMEASURE_EVERY:
+            size, measured_version = current.size, current.measured_version
+        else:
+            size, measured_version = len(encode_message(state)), version
+        with self._lock:
+            current = self._entries.get(encounter_id)
+            if current is not None and current.version > version:
+                return
+            self._pop(encounter_id)
+            if size > self.max_bytes:
+                return
+            self._entries[encounter_id] = CachedState(
+                state=state,
+                version=version,
+                checkpoint_version=checkpoint_version,
+                size=size,
+                measured_version=measured_version,
+            )
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def discard_older(self, encounter_id: str, version: int) -> None:
+        with self._lock:
+            current = self._entries.get(encounter_id)
+            if current is not None and current.version < version:
+                self._pop(encounter_id)
+
+    def discard(self, encounter_id: str) -> None:
+        with self._lock:
+            self._pop(encounter_id)
+
+    def _pop(self, encounter_id: str) -> None:
+        entry = self._entries.pop(encounter_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+
+class TokenCache:
+    """Maps token hashes to (encounter_id, role) for `ttl_s` seconds so revocations still take effect."""
+
+    def __init__(self, max_entries: int, ttl_s: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token_hash: str) -> tuple[str, str] | None:
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            encounter_id, role, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return encounter_id, role
+
+    def put(self, token_hash: str, encounter_id: str, role: str) -> None:
+        if self.max_entries <= 0 or self.ttl_s <= 0:
+            return
+        with self._lock:
+            self._entries[token_hash] = (encounter_id, role, self._clock() + self.ttl_s)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token_hash: str) -> None:
+        with self._lock:
+            self._entries.pop(token_hash, None)
+
+
+class RevocationCache:
+    """Token hashes the database refused although this process still trusted them.
+
+    Session tickets are verified without the database, so a ticket outliving its token's revocation
+    would keep working until it expires; an entry here rejects it early. Entries only need to outlive
+    the tickets that may still carry them.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, token_hash: object) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(token_hash)  # type: ignore[call-overload]
+            if expires_at is None:
+                return False
+            if expires_at <= self._clock():
+                del self._entries[token_hash]  # type: ignore[arg-type]
+                return False
+            return True
+
+    def add(self, token_hash: str) -> None:
+        if self.max_entries <= 0 or self.ttl_s <= 0:
+            return
+        with self._lock:
+            self._entries[token_hash] = self._clock() + self.ttl_s
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class EncounterCache:
+    """State and token caches used together by the sync and async Postgres stores."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        token_ttl_s: float,
+        ticket_ttl_s: float = 0.0,
+        ticket_secret: str = "",
+    ) -> None:
+        # Tickets are only read while they are also issued.
+        self.ticket_secret = ticket_secret if ticket_ttl_s > 0 else ""
+        self.states = StateCache(max_entries=max_entries, max_bytes=max_bytes)
+        # A handful of tokens per encounter; the bound only guards against token spraying.
+        self.tokens = TokenCache(max_entries=max_entries * 8, ttl_s=token_ttl_s)
+        self.revoked = RevocationCache(max_entries=max(64, max_entries), ttl_s=ticket_ttl_s)
+
+    def credentials(self, encounter_id: str, raw_token: str, server_salt: str) -> tuple[str, str | None]:
+        """Token hash of a raw token or session ticket, plus its role when known without the database.
+
+        A ticket only saves hashing: its role comes from the token cache like a raw token's, so once that
+        entry expires the database rechecks `revoked_at`.
+        """
+        ticket = read_ticket(raw_token, self.ticket_secret)
+        if ticket is not None and ticket.encounter_id == encounter_id and ticket.token_hash not in self.revoked:
+            return ticket.token_hash, self.role(encounter_id=encounter_id, token_hash=ticket.token_hash)
+        token_hash = hash_token(raw_token, server_salt)
+        return token_hash, self.role(encounter_id=encounter_id, token_hash=token_hash)
+
+    def revoke(self, token_hash: str) -> None:
+        """Forget a token the database no longer accepts and refuse tickets issued for it."""
+        self.tokens.discard(token_hash)
+        self.revoked.add(token_hash)
+
+    def refused(self, token_hash: str, role: str | None) -> None:
+        """The database refused a token; revoke it when `role` shows the cache still vouched for it."""
+        if role is not None:
+            self.revoke(token_hash)
+
+    def role(self, encounter_id: str, token_hash: str) -> str | None:
+        entry = self.tokens.get(token_hash)
+        if entry is None or entry[0] != encounter_id:
+            return None
+        return entry[1]
+
+    def access(self, encounter_id: str, token_hash: str, role: str | None = None) -> EncounterAccess | None:
+        if role is None:
+            role = self.role(encounter_id=encounter_id, token_hash=token_hash)
+        if role is None:
+            return None
+        cached = self.states.get(encounter_id)
+        if cached is None:
+            return None
+        return EncounterAccess(encounter_id=encounter_id, role=role, state=cached.state)
+
+    def remember(
+        self,
+        encounter_id: str,
+        state: dict[str, Any],
+        checkpoint_version: int,
+        token_hash: str | None = None,
+        role: str | None = None,
+    ) -> None:
+        self.states.put(encounter_id=encounter_id, state=state, checkpoint_version=checkpoint_version)
+        if token_hash is not None and role is not None:
+            self.tokens.put(token_hash=token_hash, encounter_id=encounter_id, role=role)
@@ -0,0 +1,317 @@
+"""Snapshot retention and archiving of idle encounters.
+
+Run once with `python -m dndtracker.backend.compact`, or let the API run it in the background by
+setting DNDTRACKER_COMPACTION_INTERVAL_S. Events, rolls and chat rows are never thinned, so history
+pages stay complete; only snapshots beyond what the retention policy keeps are deleted.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+from typing import Any, Iterator
+
+from .config import load_settings
+from .sqlite_store import _sqlite_sql, _sqlite_statement, is_sqlite_url, sqlite_path
+
+
+logger = logging.getLogger(__name__)
+
+
+# `{round}` and `{lock}` are filled in per dialect.
+SELECT_ENCOUNTER_PAGE_SQL = """
+    SELECT id, current_version, updated_at
+    FROM encounters
+    WHERE (%s::text IS NULL OR CAST(id AS TEXT) > %s::text)
+    ORDER BY CAST(id AS TEXT)
+    LIMIT %s
+"""
+
+LOCK_ENCOUNTER_SQL = "SELECT current_version, updated_at FROM encounters WHERE id = %s{lock}"
+
+SELECT_SNAPSHOT_ROUNDS_SQL = """
+    SELECT version, {round}
+    FROM encounter_snapshots
+    WHERE encounter_id = %s
+    ORDER BY version
+"""
+
+DELETE_SNAPSHOT_SQL = "DELETE FROM encounter_snapshots WHERE encounter_id = %s AND version = %s"
+
+# Child tables first so foreign keys hold while deleting.
+ARCHIVED_TABLES = (
+    ("tokens", "encounter_tokens", "created_at"),
+    ("snapshots", "encounter_snapshots", "version"),
+    ("events", "encounter_events", "version"),
+    ("rolls", "encounter_rolls", "created_at"),
+    ("chat", "encounter_chat", "created_at"),
+)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Which snapshots of an encounter survive compaction.
+
+    Kept are the newest `keep_latest` snapshots, the oldest snapshot in every span of `keep_every`
+    versions and, with `keep_round_boundaries`, the first snapshot taken in each round. Each rule
+    picks the same snapshots again after a run, so compaction is idempotent.
+    """
+
+    keep_every: int = 500
+    keep_latest: int = 1
+    keep_round_boundaries: bool = True
+
+
+def prunable_snapshots(
+    snapshots: list[tuple[int, Any]],
+    current_version: int,
+    policy: RetentionPolicy,
+) -> list[int]:
+    """Versions the policy lets go; `snapshots` are (version, round) pairs, oldest first."""
+    live = [(int(version), round_) for version, round_ in snapshots if int(version) <= current_version]
+    keep: set[int] = set()
+    if policy.keep_latest > 0:
+        # The newest one is what every replay starts from.
+        keep.update(version for version, _ in live[-policy.keep_latest :])
+    spans: set[int] = set()
+    previous_round: Any = object()
+    for version, round_ in live:
+        span = version // max(1, policy.keep_every)
+        if span not in spans:
+            spans.add(span)
+            keep.add(version)
+        if policy.keep_round_boundaries and round_ != previous_round:
+            keep.add(version)
+        previous_round = round_
+    return [version for version, _ in live if version not in keep]
+
+
+@dataclass
+class CompactionStats:
+    encounters: int = 0
+    snapshots_pruned: int = 0
+    archived: list[str] = field(default_factory=list)
+
+
+class _Session:
+    """One connection to Postgres or SQLite, speaking the Postgres flavour of the queries above."""
+
+    def __init__(self, conn: Any, sqlite: bool) -> None:
+        self.conn = conn
+        self.sqlite = sqlite
+
+    def sql(self, template: str) -> str:
+        if self.sqlite:
+            return _sqlite_sql(template.format(round="json_extract(state_json, '$.round')", lock=""))
+        return template.format(round="state_json->>'round'", lock=" FOR UPDATE")
+
+    def rows(self, template: str, params: tuple[Any, ...]) -> list[tuple[Any, ...]]:
+        if self.sqlite:
+            sql, values = _sqlite_statement((self.sql(template), params))
+            return self.conn.execute(sql, values).fetchall()
+        with self.conn.cursor() as cur:
+            cur.execute(self.sql(template), params)
+            return cur.fetchall()
+
+    def execute_many(self, template: str, params: list[tuple[Any, ...]]) -> None:
+        if self.sqlite:
+            self.conn.executemany(self.sql(template), params)
+            return
+        with self.conn.cursor() as cur:
+            cur.executemany(self.sql(template), params)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        if not self.sqlite:
+            with self.conn.transaction():
+                yield
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+
+def _as_datetime(value: Any) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def _archive_row(columns: list[str], row: tuple[Any, ...]) -> dict[str, Any]:
+    record: dict[str, Any] = {}
+    for column, value in zip(columns, row):
+        if column.endswith("_json") and isinstance(value, str):
+            value = json.loads(value)
+        record[column] = value
+    return record
+
+
+@dataclass
+class Compactor:
+    """Thins snapshots and archives idle encounters a page of encounters at a time.
+
+    `step()` handles the next `batch_size` encounters and remembers where it stopped, so a
+    background task can spread a pass over many short transactions. Encounters untouched for
+    `archive_after_days` are written to `<archive_dir>/<id>.json.gz` and removed from the database;
+    without an `archive_dir` nothing is archived.
+    """
+
+    database_url: str
+    policy: RetentionPolicy = field(default_factory=RetentionPolicy)
+    archive_dir: str | None = None
+    archive_after_days: float = 30.0
+    batch_size: int = 100
+    interval_s: float = 3600.0
+
+    def __post_init__(self) -> None:
+        self._cursor: str | None = None
+
+    @contextmanager
+    def _connect(self) -> Iterator[_Session]:
+        if is_sqlite_url(self.database_url):
+            conn = sqlite3.connect(sqlite_path(self.database_url), isolation_level=None)
+            try:
+                conn.execute("PRAGMA foreign_keys=ON")
+                yield _Session(conn, sqlite=True)
+            finally:
+                conn.close()
+            return
+
+        import psycopg
+
+        with psycopg.connect(self.database_url, autocommit=True) as conn:
+            yield _Session(conn, sqlite=False)
+
+    def run(self) -> CompactionStats:
+        """One full pass over every encounter."""
+        self._cursor = None
+        total = CompactionStats()
+        while True:
+            stats, done = self.step()
+            total.encounters += stats.encounters
+            total.snapshots_pruned += stats.snapshots_pruned
+            total.archived.extend(stats.archived)
+            if done:
+                return total
+
+    def step(self) -> tuple[CompactionStats, bool]:
+        """Compact the next page of encounters; returns the stats and whether the pass is complete."""
+        stats = CompactionStats()
+        now = datetime.now(timezone.utc)
+        with self._connect() as session:
+            page = session.rows(SELECT_ENCOUNTER_PAGE_SQL, (self._cursor, self._cursor, self.batch_size))
+            for encounter_id, _, _ in page:
+                encounter_id = str(encounter_id)
+                with session.transaction():
+                    self._compact(session, encounter_id=encounter_id, now=now, stats=stats)
+                stats.encounters += 1
+        done = len(page) < self.batch_size
+        self._cursor = None if done else str(page[-1][0])
+        return stats, done
+
+    def _compact(self, session: _Session, encounter_id: str, now: datetime, stats: CompactionStats) -> None:
+        locked = session.rows(LOCK_ENCOUNTER_SQL, (encounter_id,))
+        if not locked:
+            return
+        current_version, updated_at = locked[0]
+        if self.archive_dir is not None and now - _as_datetime(updated_at) >= timedelta(days=self.archive_after_days):
+            self._archive(session, encounter_id=encounter_id)
+            stats.archived.append(encounter_id)
+            return
+        snapshots = session.rows(SELECT_SNAPSHOT_ROUNDS_SQL, (encounter_id,))
+        pruned = prunable_snapshots(snapshots, current_version=int(current_version), policy=self.policy)
+        if pruned:
+            session.execute_many(DELETE_SNAPSHOT_SQL, [(encounter_id, version) for version in pruned])
+            stats.snapshots_pruned += len(pruned)
+
+    def _archive(self, session: _Session, encounter_id: str) -> None:
+        """Write everything stored for the encounter to a compressed file, then delete it."""
+        archive: dict[str, Any] = {}
+        for key, table, order in (("encounter", "encounters", "id"), *ARCHIVED_TABLES):
+            column = "id" if table == "encounters" else "encounter_id"
+            rows = session.rows(f"SELECT * FROM {table} WHERE {column} = %s ORDER BY {order}", (encounter_id,))
+            columns = self._columns(session, table)
+            records = [_archive_row(columns, row) for row in rows]
+            archive[key] = records[0] if key == "encounter" else records
+
+        directory = Path(str(self.archive_dir))
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{encounter_id}.json.gz"
+        partial = target.with_name(target.name + ".partial")
+        with gzip.open(partial, "wt", encoding="utf-8") as handle:
+            json.dump(archive, handle, default=str)
+        os.replace(partial, target)
+
+        for _, table, _ in ARCHIVED_TABLES:
+            session.execute_many(f"DELETE FROM {table} WHERE encounter_id = %s", [(encounter_id,)])
+        session.execute_many("DELETE FROM encounters WHERE id = %s", [(encounter_id,)])
+
+    @staticmethod
+    def _columns(session: _Session, table: str) -> list[str]:
+        if session.sqlite:
+            return [row[1] for row in session.conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        sql = "SELECT column_name FROM information_schema.columns WHERE table_name = %s ORDER BY ordinal_position"
+        return [str(row[0]) for row in session.rows(sql, (table,))]
+
+
+async def run_compaction(compactor: Compactor) -> None:
+    """Background loop: a page per thread hop, a full pass every `compactor.interval_s` seconds."""
+    while True:
+        try:
+            while True:
+                stats, done = await asyncio.to_thread(compactor.step)
+                if stats.snapshots_pruned or stats.archived:
+                    logger.info(
+                        "compaction pruned %d snapshots and archived %d encounters",
+                        stats.snapshots_pruned,
+                        len(stats.archived),
+                    )
+                if done:
+                    break
+        except Exception:
+            logger.warning("compaction pass failed", exc_info=True)
+        await asyncio.sleep(compactor.interval_s)
+
+
+def main(argv: list[str] | None = None) -> None:
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description="Thin old snapshots and archive idle encounters")
+    parser.add_argument("--keep-every", type=int, default=settings.snapshot_keep_every)
+    parser.add_argument("--no-round-boundaries", action="store_true")
+    parser.add_argument("--archive-dir", default=settings.archive_dir)
+    parser.add_argument("--archive-after-days", type=float, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+    if not settings.database_url:
+        raise RuntimeError("DNDTRACKER_DATABASE_URL is required for compaction")
+
+    compactor = Compactor(
+        database_url=settings.database_url,
+        policy=RetentionPolicy(
+            keep_every=max(1, args.keep_every),
+            keep_round_boundaries=settings.snapshot_keep_round_boundaries and not args.no_round_boundaries,
+        ),
+        archive_dir=args.archive_dir,
+        archive_after_days=args.archive_after_days,
+        batch_size=max(1, args.batch_size),
+    )
+    stats = compactor.run()
+    print(
+        f"compacted {stats.encounters} encounters: "
+        f"{stats.snapshots_pruned} snapshots pruned, {len(stats.archived)} encounters archived"
+    )
+
+
+if __name__ == "__main__":
+    main()
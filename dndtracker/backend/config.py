@@ -12,13 +12,91 @@ class BackendSettings:
     database_url: str | None
     host: str
     port: int
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_max_idle_s: float = 300.0
+    db_pool_timeout_s: float = 5.0
+    snapshot_interval: int = 50
+    history_limit: int = 100
+    history_buffer_size: int = 1000
+    ws_send_timeout_s: float = 5.0
+    ws_send_queue_size: int = 8
+    broadcast_backend: str = "local"
+    state_cache_entries: int = 256
+    state_cache_bytes: int = 64 * 1024 * 1024
+    token_cache_ttl_s: float = 60.0
+    ticket_ttl_s: float = 300.0
+    ticket_secret: str | None = None
+    write_batch_size: int = 100
+    write_behind: bool = False
+    write_behind_window_s: float = 0.05
+    write_behind_max_events: int = 500
+    write_behind_max_buffered: int = 10_000
+    snapshot_keep_every: int = 500
+    snapshot_keep_round_boundaries: bool = True
+    archive_dir: str | None = None
+    archive_after_days: float = 30.0
+    compaction_interval_s: float = 0.0
+    metrics: bool = False
+    trace_file: str | None = None
+    trace_max_events: int = 100_000
+    profile_dir: str | None = None
+    profile_all: bool = False
+    profile_threshold_ms: float = 100.0
+    profile_secret: str | None = None
 
 
 def load_settings() -> BackendSettings:
     port_raw = os.getenv("DNDTRACKER_PORT", "8000")
-    return BackendSettings(
+    ticket_secret = os.getenv("DNDTRACKER_TICKET_SECRET") or None
+    settings = BackendSettings(
         server_salt=os.getenv("DNDTRACKER_SERVER_SALT", "dev-salt"),
         database_url=os.getenv("DNDTRACKER_DATABASE_URL"),
         host=os.getenv("DNDTRACKER_HOST", "127.0.0.1"),
         port=int(port_raw),
+        db_pool_min_size=int(os.getenv("DNDTRACKER_DB_POOL_MIN_SIZE", "1")),
+        db_pool_max_size=int(os.getenv("DNDTRACKER_DB_POOL_MAX_SIZE", "10")),
+        db_pool_max_idle_s=float(os.getenv("DNDTRACKER_DB_POOL_MAX_IDLE_S", "300")),
+        db_pool_timeout_s=float(os.getenv("DNDTRACKER_DB_POOL_TIMEOUT_S", "5")),
+        snapshot_interval=max(1, int(os.getenv("DNDTRACKER_SNAPSHOT_INTERVAL", "50"))),
+        history_limit=max(1, int(os.getenv("DNDTRACKER_HISTORY_LIMIT", "100"))),
+        history_buffer_size=max(1, int(os.getenv("DNDTRACKER_HISTORY_BUFFER_SIZE", "1000"))),
+        ws_send_timeout_s=float(os.getenv("DNDTRACKER_WS_SEND_TIMEOUT_S", "5")),
+        ws_send_queue_size=max(1, int(os.getenv("DNDTRACKER_WS_SEND_QUEUE_SIZE", "8"))),
+        broadcast_backend=os.getenv("DNDTRACKER_BROADCAST_BACKEND", "local").strip().lower(),
+        state_cache_entries=max(0, int(os.getenv("DNDTRACKER_STATE_CACHE_ENTRIES", "256"))),
+        state_cache_bytes=max(0, int(os.getenv("DNDTRACKER_STATE_CACHE_BYTES", str(64 * 1024 * 1024)))),
+        token_cache_ttl_s=float(os.getenv("DNDTRACKER_TOKEN_CACHE_TTL_S", "60")),
+        # Without a shared secret a ticket only verifies in the process that issued it, which breaks as soon as
+        # another worker or a restarted server sees it; tickets stay off until one is configured.
+        ticket_ttl_s=max(0.0, float(os.getenv("DNDTRACKER_TICKET_TTL_S", "300"))) if ticket_secret else 0.0,
+        ticket_secret=ticket_secret,
+        write_batch_size=max(1, int(os.getenv("DNDTRACKER_WRITE_BATCH_SIZE", "100"))),
+        write_behind=os.getenv("DNDTRACKER_WRITE_BEHIND", "").strip().lower() in ("1", "true", "yes", "on"),
+        write_behind_window_s=max(0.0, float(os.getenv("DNDTRACKER_WRITE_BEHIND_WINDOW_S", "0.05"))),
+        write_behind_max_events=max(1, int(os.getenv("DNDTRACKER_WRITE_BEHIND_MAX_EVENTS", "500"))),
+        write_behind_max_buffered=max(1, int(os.getenv("DNDTRACKER_WRITE_BEHIND_MAX_BUFFERED", "10000"))),
+        snapshot_keep_every=max(1, int(os.getenv("DNDTRACKER_SNAPSHOT_KEEP_EVERY", "500"))),
+        snapshot_keep_round_boundaries=os.getenv("DNDTRACKER_SNAPSHOT_KEEP_ROUND_BOUNDARIES", "1").strip().lower()
+        in ("1", "true", "yes", "on"),
+        archive_dir=os.getenv("DNDTRACKER_ARCHIVE_DIR") or None,
+        archive_after_days=float(os.getenv("DNDTRACKER_ARCHIVE_AFTER_DAYS", "30")),
+        compaction_interval_s=max(0.0, float(os.getenv("DNDTRACKER_COMPACTION_INTERVAL_S", "0"))),
+        metrics=os.getenv("DNDTRACKER_METRICS", "").strip().lower() in ("1", "true", "yes", "on"),
+        trace_file=os.getenv("DNDTRACKER_TRACE_FILE") or None,
+        trace_max_events=max(1, int(os.getenv("DNDTRACKER_TRACE_MAX_EVENTS", "100000"))),
+        profile_dir=os.getenv("DNDTRACKER_PROFILE_DIR") or None,
+        profile_all=os.getenv("DNDTRACKER_PROFILE", "").strip().lower() in ("1", "true", "yes", "on"),
+        profile_threshold_ms=max(0.0, float(os.getenv("DNDTRACKER_PROFILE_THRESHOLD_MS", "100"))),
+        profile_secret=os.getenv("DNDTRACKER_PROFILE_SECRET") or None,
     )
+    # Write-behind acknowledges from process memory, so another writer would commit conflicting versions.
+    # WEB_CONCURRENCY is uvicorn's default for --workers.
+    if settings.write_behind and (
+        settings.broadcast_backend == "postgres" or int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+    ):
+        raise ValueError(
+            "DNDTRACKER_WRITE_BEHIND needs one process owning all writes; "
+            "it cannot be combined with DNDTRACKER_BROADCAST_BACKEND=postgres or several workers"
+        )
+    return settings
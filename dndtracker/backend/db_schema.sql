@@ -25,6 +25,16 @@ CREATE TABLE IF NOT EXISTS encounter_snapshots (
     UNIQUE(encounter_id, version)
 );
 
+CREATE TABLE IF NOT EXISTS encounter_events (
+    id UUID PRIMARY KEY,
+    encounter_id UUID NOT NULL REFERENCES encounters(id),
+    version INTEGER NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    event_json JSONB NOT NULL,
+    log_json JSONB NOT NULL DEFAULT '[]'::jsonb,
+    UNIQUE(encounter_id, version)
+);
+
 CREATE TABLE IF NOT EXISTS encounter_rolls (
     id UUID PRIMARY KEY,
     encounter_id UUID NOT NULL REFERENCES encounters(id),
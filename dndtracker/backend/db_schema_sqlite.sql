@@ -0,0 +1,67 @@
+-- SQLite counterpart of db_schema.sql for the embedded desktop store.
+-- UUIDs and timestamps are TEXT (ISO 8601, UTC); JSON columns hold serialized JSON text.
+
+CREATE TABLE IF NOT EXISTS encounters (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    current_version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS encounter_tokens (
+    id TEXT PRIMARY KEY,
+    encounter_id TEXT NOT NULL REFERENCES encounters(id),
+    role TEXT NOT NULL CHECK (role IN ('HOST', 'PLAYER')),
+    token_hash TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL,
+    revoked_at TEXT NULL
+);
+
+CREATE TABLE IF NOT EXISTS encounter_snapshots (
+    id TEXT PRIMARY KEY,
+    encounter_id TEXT NOT NULL REFERENCES encounters(id),
+    version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    state_json TEXT NOT NULL,
+    UNIQUE(encounter_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS encounter_events (
+    id TEXT PRIMARY KEY,
+    encounter_id TEXT NOT NULL REFERENCES encounters(id),
+    version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    event_json TEXT NOT NULL,
+    log_json TEXT NOT NULL DEFAULT '[]',
+    UNIQUE(encounter_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS encounter_rolls (
+    id TEXT PRIMARY KEY,
+    encounter_id TEXT NOT NULL REFERENCES encounters(id),
+    created_at TEXT NOT NULL,
+    actor_id TEXT NULL,
+    who_label TEXT NOT NULL,
+    roll_json TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS encounter_chat (
+    id TEXT PRIMARY KEY,
+    encounter_id TEXT NOT NULL REFERENCES encounters(id),
+    created_at TEXT NOT NULL,
+    who_label TEXT NOT NULL,
+    actor_id TEXT NULL,
+    text TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS encounter_tokens_encounter_idx
+    ON encounter_tokens (encounter_id);
+CREATE INDEX IF NOT EXISTS encounter_rolls_encounter_created_idx
+    ON encounter_rolls (encounter_id, created_at);
+CREATE INDEX IF NOT EXISTS encounter_chat_encounter_created_idx
+    ON encounter_chat (encounter_id, created_at);
+CREATE INDEX IF NOT EXISTS encounter_events_chat_idx
+    ON encounter_events (encounter_id, version DESC)
+    WHERE json_extract(event_json, '$.kind') = 'chat';
@@ -3,7 +3,26 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any
+import time
+from typing import Any, Callable
+
+from .indexes import EffectIndex, IndexCache
+from .metrics import METRICS
+
+# Indexes of the last state reduced per encounter, so lookups by id skip scanning the lists.
+_INDEXES = IndexCache(max_entries=1024)
+
+HOST_ACTION_TYPES = frozenset(
+    {
+        "NEXT_TURN",
+        "ADD_EFFECT",
+        "REMOVE_EFFECT",
+        "APPLY_DAMAGE",
+        "RESOLVE_CONCENTRATION_SAVE",
+        "APPLY_SAVE_RESULT",
+        "SET_INITIATIVE",
+    }
+)
 
 
 @dataclass(frozen=True)
@@ -13,8 +32,24 @@ class ActionResult:
 
 
 def apply_host_action(state: dict[str, Any], action: dict[str, Any]) -> ActionResult:
-    """Apply a host action according to the V0 reducer baseline."""
+    """Apply a host action according to the V0 reducer baseline.
+
+    `state` must match the wire shape in `schema.py`; it is validated where it enters the process,
+    so players and effects are not re-checked here.
+    """
     action_type = str(action.get("type", "")).upper()
+    if not METRICS.enabled:
+        return _dispatch_host_action(state=state, action=action, action_type=action_type)
+    started = time.perf_counter()
+    try:
+        return _dispatch_host_action(state=state, action=action, action_type=action_type)
+    finally:
+        # Unknown types share one label so clients cannot grow the metric without bound.
+        label = action_type if action_type in HOST_ACTION_TYPES else "OTHER"
+        METRICS.action_seconds.observe(time.perf_counter() - started, label)
+
+
+def _dispatch_host_action(state: dict[str, Any], action: dict[str, Any], action_type: str) -> ActionResult:
     if action_type == "NEXT_TURN":
         return _apply_next_turn(state=state, action=action)
     if action_type == "ADD_EFFECT":
@@ -41,7 +76,7 @@ def _with_running_status(state: dict[str, Any]) -> dict[str, Any]:
 
 def _apply_next_turn(state: dict[str, Any], action: dict[str, Any]) -> ActionResult:
     next_state = _with_running_status(state)
-    turn_order = list(next_state.get("turnOrder", []))
+    turn_order = next_state.get("turnOrder", [])
     if not turn_order:
         return ActionResult(
             state=next_state,
@@ -62,7 +97,7 @@ def _apply_next_turn(state: dict[str, Any], action: dict[str, Any]) -> ActionRes
 
     if wrapped:
         events.append({"kind": "timing", "timing": "round_end", "action": action})
-        next_state["effects"] = _tick_round_end_effects(list(next_state.get("effects", [])))
+        next_state["effects"] = _tick_round_end_effects(next_state.get("effects", []))
         next_state["round"] = int(next_state.get("round", 1)) + 1
         events.append({"kind": "timing", "timing": "round_start", "action": action})
 
@@ -74,16 +109,18 @@ def _apply_next_turn(state: dict[str, Any], action: dict[str, Any]) -> ActionRes
 
 def _apply_add_effect(state: dict[str, Any], action: dict[str, Any]) -> ActionResult:
     next_state = _with_running_status(state)
-    effects = list(next_state.get("effects", []))
     effect = action.get("effect")
     if isinstance(effect, dict):
+        # States are never mutated in place, so the stored effect and the logged one can be the same object.
         effect_copy = dict(effect)
-        effects.append(effect_copy)
-        next_state["effects"] = effects
+        encounter_id = next_state.get("id")
+        index = _INDEXES.effects.take(encounter_id, next_state.get("effects", []))
+        next_state["effects"] = index.with_added(effect_copy)
+        _INDEXES.effects.keep(encounter_id, index)
         next_state = _ensure_concentration_for_effect(state=next_state, effect=effect_copy)
         return ActionResult(
             state=next_state,
-            engine_events=[{"kind": "effect_added", "effect": dict(effect), "action": action}],
+            engine_events=[{"kind": "effect_added", "effect": effect_copy, "action": action}],
         )
     return ActionResult(state=next_state, engine_events=[])
 
@@ -101,23 +138,17 @@ def _ensure_concentration_for_effect(state: dict[str, Any], effect: dict[str, An
     if actor_id is None:
         return state
 
-    concentration = dict(state.get("concentration", {}))
-    current_entry = concentration.get(actor_id)
-    if current_entry is None or not isinstance(current_entry, dict) or not current_entry:
-        concentration[actor_id] = {"checkNeeded": False}
-        next_state = dict(state)
-        next_state["concentration"] = concentration
-        return next_state
-
-    if "checkNeeded" not in current_entry:
-        updated_entry = dict(current_entry)
-        updated_entry["checkNeeded"] = False
-        concentration[actor_id] = updated_entry
-        next_state = dict(state)
-        next_state["concentration"] = concentration
-        return next_state
+    current_entry = state.get("concentration", {}).get(actor_id)
+    if not current_entry:
+        updated_entry: dict[str, Any] = {"checkNeeded": False}
+    elif "checkNeeded" not in current_entry:
+        updated_entry = {**current_entry, "checkNeeded": False}
+    else:
+        return state
 
-    return state
+    next_state = dict(state)
+    next_state["concentration"] = {**state.get("concentration", {}), actor_id: updated_entry}
+    return next_state
 
 
 def _apply_remove_effect(state: dict[str, Any], action: dict[str, Any]) -> ActionResult:
@@ -126,28 +157,24 @@ def _apply_remove_effect(state: dict[str, Any], action: dict[str, Any]) -> Actio
     if not isinstance(effect_id, str) or effect_id == "":
         return ActionResult(state=next_state, engine_events=[])
 
-    effects = list(next_state.get("effects", []))
-    filtered = [effect for effect in effects if not (isinstance(effect, dict) and effect.get("id") == effect_id)]
-    if len(filtered) == len(effects):
+    if not _remove_effects(next_state, lambda index: index.by_id.get(effect_id)):
         return ActionResult(state=next_state, engine_events=[])
 
-    next_state["effects"] = filtered
     return ActionResult(
         state=next_state,
         engine_events=[{"kind": "effect_removed", "effectId": effect_id, "action": action}],
     )
 
 
-def _build_turn_order(players: list[dict[str, Any]]) -> list[str]:
-    ranked: list[tuple[int, dict[str, Any]]] = []
-    for idx, player in enumerate(players):
-        if not isinstance(player, dict):
-            continue
-        initiative = player.get("initiative")
-        if isinstance(initiative, int):
-            ranked.append((idx, player))
-    ranked.sort(key=lambda item: (-item[1]["initiative"], item[0]))
-    return [player["id"] for _, player in ranked if isinstance(player.get("id"), str)]
+def _remove_effects(state: dict[str, Any], select: Callable[[EffectIndex], list[dict[str, Any]] | None]) -> bool:
+    """Drop the effects `select` picks from the index; `state` is the caller's fresh copy."""
+    encounter_id = state.get("id")
+    index = _INDEXES.effects.take(encounter_id, state.get("effects", []))
+    removed = select(index)
+    if removed:
+        state["effects"] = index.without(list(removed))
+    _INDEXES.effects.keep(encounter_id, index)
+    return bool(removed)
 
 
 def _apply_set_initiative(state: dict[str, Any], action: dict[str, Any]) -> ActionResult:
@@ -159,23 +186,16 @@ def _apply_set_initiative(state: dict[str, Any], action: dict[str, Any]) -> Acti
     if not isinstance(initiative_raw, int) or initiative_raw < 1 or initiative_raw > 99:
         return ActionResult(state=next_state, engine_events=[])
 
-    players = list(next_state.get("players", []))
-    updated = False
-    for idx, player in enumerate(players):
-        if not isinstance(player, dict) or player.get("id") != player_id:
-            continue
-        updated_player = dict(player)
-        updated_player["initiative"] = initiative_raw
-        players[idx] = updated_player
-        updated = True
-        break
-
-    if not updated:
+    encounter_id = next_state.get("id")
+    roster = _INDEXES.rosters.take(encounter_id, next_state.get("players", []))
+    position = roster.positions.get(player_id)
+    if position is None:
+        _INDEXES.rosters.keep(encounter_id, roster)
         return ActionResult(state=next_state, engine_events=[])
 
-    next_state["players"] = players
-    next_state["turnOrder"] = _build_turn_order(players)
+    next_state["players"], next_state["turnOrder"] = roster.with_initiative(position, initiative_raw)
     next_state["turnIndex"] = 0
+    _INDEXES.rosters.keep(encounter_id, roster)
     return ActionResult(
         state=next_state,
         engine_events=[
@@ -191,17 +211,13 @@ def _apply_damage(state: dict[str, Any], action: dict[str, Any]) -> ActionResult
     if not isinstance(actor_id, str) or actor_id == "" or damage_taken <= 0:
         return ActionResult(state=next_state, engine_events=[])
 
-    concentration = dict(next_state.get("concentration", {}))
-    current_entry = concentration.get(actor_id)
+    current_entry = next_state.get("concentration", {}).get(actor_id)
     if not current_entry:
         return ActionResult(state=next_state, engine_events=[])
 
+    concentration = dict(next_state["concentration"])
     dc = max(10, damage_taken // 2)
-    updated_entry: dict[str, Any]
-    if isinstance(current_entry, dict):
-        updated_entry = dict(current_entry)
-    else:
-        updated_entry = {}
+    updated_entry = dict(current_entry)
     updated_entry["checkNeeded"] = True
     updated_entry["dc"] = dc
     updated_entry["lastDamageTaken"] = damage_taken
@@ -220,13 +236,13 @@ def _apply_resolve_concentration_save(state: dict[str, Any], action: dict[str, A
     if not isinstance(actor_id, str) or actor_id == "":
         return ActionResult(state=next_state, engine_events=[])
 
-    concentration = dict(next_state.get("concentration", {}))
-    current_entry = concentration.get(actor_id)
+    current_entry = next_state.get("concentration", {}).get(actor_id)
     if current_entry is None:
         return ActionResult(state=next_state, engine_events=[])
 
+    concentration = dict(next_state["concentration"])
     if success:
-        updated_entry = dict(current_entry) if isinstance(current_entry, dict) else {}
+        updated_entry = dict(current_entry)
         updated_entry["checkNeeded"] = False
         updated_entry["lastResult"] = "success"
         concentration[actor_id] = updated_entry
@@ -238,19 +254,7 @@ def _apply_resolve_concentration_save(state: dict[str, Any], action: dict[str, A
 
     concentration[actor_id] = None
     next_state["concentration"] = concentration
-    effects = list(next_state.get("effects", []))
-    filtered_effects = [
-        effect
-        for effect in effects
-        if not (
-            isinstance(effect, dict)
-            and (
-                effect.get("concentrationActorId") == actor_id
-                or (effect.get("sourceActorId") == actor_id and effect.get("requiresConcentration") is True)
-            )
-        )
-    ]
-    next_state["effects"] = filtered_effects
+    _remove_effects(next_state, lambda index: index.dependents.get(actor_id))
     return ActionResult(
         state=next_state,
         engine_events=[{"kind": "concentration_resolved", "actorId": actor_id, "success": False, "action": action}],
@@ -264,16 +268,13 @@ def _apply_save_result(state: dict[str, Any], action: dict[str, Any]) -> ActionR
     if not isinstance(effect_id, str) or effect_id == "":
         return ActionResult(state=next_state, engine_events=[])
 
-    effects = list(next_state.get("effects", []))
     if not success:
         return ActionResult(
             state=next_state,
             engine_events=[{"kind": "save_applied", "effectId": effect_id, "success": False, "action": action}],
         )
 
-    filtered = [effect for effect in effects if not (isinstance(effect, dict) and effect.get("id") == effect_id)]
-    if len(filtered) != len(effects):
-        next_state["effects"] = filtered
+    _remove_effects(next_state, lambda index: index.by_id.get(effect_id))
     return ActionResult(
         state=next_state,
         engine_events=[{"kind": "save_applied", "effectId": effect_id, "success": True, "action": action}],
@@ -281,17 +282,16 @@ def _apply_save_result(state: dict[str, Any], action: dict[str, Any]) -> ActionR
 
 
 def _tick_round_end_effects(effects: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Count down timed effects; effects without a duration, and the list itself if nothing ticks, are reused."""
     next_effects: list[dict[str, Any]] = []
+    changed = False
     for effect in effects:
-        if not isinstance(effect, dict):
+        rounds_remaining = effect.get("roundsRemaining")
+        if rounds_remaining is None:
             next_effects.append(effect)
             continue
-        updated_effect = dict(effect)
-        rounds_remaining = updated_effect.get("roundsRemaining")
-        if isinstance(rounds_remaining, int):
-            rounds_remaining -= 1
-            if rounds_remaining <= 0:
-                continue
-            updated_effect["roundsRemaining"] = rounds_remaining
-        next_effects.append(updated_effect)
-    return next_effects
+        changed = True
+        if rounds_remaining - 1 <= 0:
+            continue
+        next_effects.append({**effect, "roundsRemaining": rounds_remaining - 1})
+    return next_effects if changed else effects
@@ -0,0 +1,396 @@
+"""Event building, reduction and commit planning shared by every encounter store.
+
+A store authorizes, runs the planned statements on its own driver and commits; what an event does to
+the state, which rows it writes and when a snapshot is due is decided here, once for all of them.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+import json
+from typing import Any, Iterable, Iterator
+import uuid
+
+from .cache import CachedState, EncounterCache
+from .engine import apply_host_action
+from .models import ActionBatchResult, EncounterAccess, HistoryPage
+from .schema import validate_state
+from .security import is_ticket, issue_ticket
+from .sql import Statement, event_statements, parse_checkpoint, snapshot_statement
+from .tracing import TRACER
+
+
+def _role_label(role: str) -> str:
+    return role.capitalize()
+
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _chat_entry(event: dict[str, Any], version: int) -> dict[str, Any]:
+    return {
+        "role": event["role"],
+        "text": event["message"],
+        "whoLabel": event["whoLabel"],
+        "actorId": event.get("actorId"),
+        "version": version,
+    }
+
+
+def _append_window(
+    entries: list[dict[str, Any]],
+    additions: list[dict[str, Any]],
+    limit: int | None,
+) -> list[dict[str, Any]]:
+    """Return `entries + additions` trimmed to the newest `limit`, building at most one new list."""
+    if limit is None:
+        return [*entries, *additions]
+    drop = len(entries) + len(additions) - limit
+    if drop <= 0:
+        return [*entries, *additions]
+    if drop >= len(entries):
+        return additions[len(additions) - limit :]
+    window = entries[drop:]
+    window.extend(additions)
+    return window
+
+
+def _reduce_event(
+    state: dict[str, Any],
+    event: dict[str, Any],
+    history_limit: int | None = None,
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """Apply one event; returns the next state and the log entries it appended.
+
+    `history_limit` bounds the live `log` and `chat` windows; older entries stay reachable through
+    the store's paged history.
+    """
+    with TRACER.span("reduce_event", "reduce"):
+        version = int(state["version"]) + 1
+        next_state = dict(state)
+        next_state["version"] = version
+        next_meta = dict(state["meta"])
+        next_meta["updatedAt"] = event.get("at") or _utc_now_iso()
+        next_state["meta"] = next_meta
+
+        log_entries = [{**event, "version": version}]
+
+        if event["kind"] == "chat":
+            next_state["chat"] = _append_window(
+                state.get("chat", []),
+                [_chat_entry(event=event, version=version)],
+                history_limit,
+            )
+
+        if event["kind"] == "player_registered":
+            next_state["players"] = [*state.get("players", []), dict(event["player"])]
+
+        if event["kind"] == "action":
+            reduced = apply_host_action(state=next_state, action=event["action"])
+            next_state = reduced.state
+            log_entries.extend({**engine_event, "version": version} for engine_event in reduced.engine_events)
+
+        if event["kind"] == "action_batch":
+            for action_index, action in enumerate(event["actions"]):
+                reduced = apply_host_action(state=next_state, action=action)
+                next_state = reduced.state
+                log_entries.extend(
+                    {**engine_event, "version": version, "actionIndex": action_index}
+                    for engine_event in reduced.engine_events
+                )
+
+        next_state["log"] = _append_window(state.get("log", []), log_entries, history_limit)
+        return next_state, log_entries
+
+
+def _next_state_with_event(
+    state: dict[str, Any],
+    event: dict[str, Any],
+    history_limit: int | None = None,
+) -> dict[str, Any]:
+    return _reduce_event(state=state, event=event, history_limit=history_limit)[0]
+
+
+def _history_page(entries: Iterable[dict[str, Any]], before: int | None, limit: int) -> HistoryPage:
+    """Page newest-first entries into at most `limit` versions older than `before`, returned oldest first."""
+    page: list[dict[str, Any]] = []
+    versions = 0
+    last_version: int | None = None
+    for entry in entries:
+        version = int(entry["version"])
+        if before is not None and version >= before:
+            continue
+        if version != last_version:
+            if versions == limit:
+                page.reverse()
+                return HistoryPage(entries=page, next_before=last_version)
+            versions += 1
+            last_version = version
+        page.append(entry)
+    page.reverse()
+    return HistoryPage(entries=page, next_before=None)
+
+
+def _log_rows_newest_first(rows: Iterable[tuple[Any, Any]]) -> Iterator[dict[str, Any]]:
+    for _, log_json in rows:
+        entries = log_json if isinstance(log_json, list) else json.loads(log_json)
+        yield from reversed(entries)
+
+
+def _chat_rows_newest_first(rows: Iterable[tuple[Any, Any]]) -> Iterator[dict[str, Any]]:
+    for version, event_json in rows:
+        event = event_json if isinstance(event_json, dict) else json.loads(event_json)
+        yield _chat_entry(event=event, version=int(version))
+
+
+def _action_event(access: EncounterAccess, action: dict[str, Any]) -> dict[str, Any] | None:
+    if access.role != "HOST":
+        return None
+    return {"kind": "action", "role": "HOST", "action": action, "at": _utc_now_iso()}
+
+
+def _action_batch_event(access: EncounterAccess, actions: list[dict[str, Any]]) -> dict[str, Any] | None:
+    if access.role != "HOST":
+        return None
+    return {"kind": "action_batch", "role": "HOST", "actions": actions, "at": _utc_now_iso()}
+
+
+def _action_batch_result(
+    committed: tuple[dict[str, Any], list[dict[str, Any]]] | None,
+    action_count: int,
+) -> ActionBatchResult | None:
+    if committed is None:
+        return None
+    next_state, log_entries = committed
+    engine_events: list[list[dict[str, Any]]] = [[] for _ in range(action_count)]
+    # The first entry is the batch event itself.
+    for entry in log_entries[1:]:
+        engine_events[entry["actionIndex"]].append(entry)
+    return ActionBatchResult(state=next_state, engine_events=engine_events)
+
+
+@dataclass
+class _ReducedRun:
+    """Actions reduced one after another, each as its own event, ready to persist in one transaction."""
+
+    state: dict[str, Any]
+    # Events since the last snapshot once the run is persisted.
+    pending_events: int
+    statements: list[Statement]
+    # Per action: the state after it, None when refused, or the exception its reduction raised.
+    results: list[dict[str, Any] | None | Exception]
+
+    @property
+    def checkpoint_version(self) -> int:
+        return int(self.state["version"]) - self.pending_events
+
+
+@dataclass
+class _PlannedEvent:
+    """One event reduced against the current state, with the writes that persist it."""
+
+    state: dict[str, Any]
+    log_entries: list[dict[str, Any]]
+    statements: list[Statement]
+    write_snapshot: bool
+    # Version of the newest snapshot once the statements are committed.
+    checkpoint_version: int
+
+
+def _plan_event(
+    access: EncounterAccess,
+    pending_events: int,
+    event: dict[str, Any],
+    history_limit: int | None,
+    snapshot_interval: int,
+) -> _PlannedEvent:
+    """Reduce `event` on the access state; a snapshot is due once `snapshot_interval` events follow the last one."""
+    next_state, log_entries = _reduce_event(state=access.state, event=event, history_limit=history_limit)
+    next_version = int(next_state["version"])
+    write_snapshot = pending_events + 1 >= snapshot_interval
+    statements = event_statements(
+        encounter_id=access.encounter_id,
+        event=event,
+        log_entries=log_entries,
+        next_state=next_state,
+        now=datetime.now(timezone.utc),
+        write_snapshot=write_snapshot,
+    )
+    return _PlannedEvent(
+        state=next_state,
+        log_entries=log_entries,
+        statements=statements,
+        write_snapshot=write_snapshot,
+        checkpoint_version=next_version if write_snapshot else next_version - pending_events - 1,
+    )
+
+
+def _reduce_each_action(
+    access: EncounterAccess,
+    pending_events: int,
+    actions: list[dict[str, Any]],
+    history_limit: int | None,
+    snapshot_interval: int,
+) -> _ReducedRun:
+    """Give every action its own event and version; one that fails to reduce is skipped without its neighbours."""
+    state = access.state
+    statements: list[Statement] = []
+    results: list[dict[str, Any] | None | Exception] = []
+    now = datetime.now(timezone.utc)
+    for action in actions:
+        event = _action_event(access, action)
+        if event is None:
+            results.append(None)
+            continue
+        try:
+            next_state, log_entries = _reduce_event(state=state, event=event, history_limit=history_limit)
+        except Exception as exc:
+            results.append(exc)
+            continue
+        pending_events += 1
+        write_snapshot = pending_events >= snapshot_interval
+        statements.extend(
+            event_statements(
+                encounter_id=access.encounter_id,
+                event=event,
+                log_entries=log_entries,
+                next_state=next_state,
+                now=now,
+                write_snapshot=write_snapshot,
+            )
+        )
+        if write_snapshot:
+            pending_events = 0
+        state = next_state
+        results.append(next_state)
+    return _ReducedRun(state=state, pending_events=pending_events, statements=statements, results=results)
+
+
+def _player_registered_event(access: EncounterAccess, name: str) -> dict[str, Any] | None:
+    if access.role != "PLAYER":
+        return None
+    return {
+        "kind": "player_registered",
+        "role": access.role,
+        "player": {"id": str(uuid.uuid4()), "name": name, "initiative": None},
+        "at": _utc_now_iso(),
+    }
+
+
+def _roll_event(access: EncounterAccess, roll: dict[str, Any]) -> dict[str, Any]:
+    actor_id = roll.get("actorId") if isinstance(roll.get("actorId"), str) else None
+    who_label_raw = roll.get("whoLabel")
+    who_label = str(who_label_raw).strip() if who_label_raw else _role_label(access.role)
+    return {
+        "kind": "roll",
+        "role": access.role,
+        "roll": roll,
+        "whoLabel": who_label,
+        "actorId": actor_id,
+        "at": _utc_now_iso(),
+    }
+
+
+def _chat_event(access: EncounterAccess, message: str) -> dict[str, Any]:
+    return {
+        "kind": "chat",
+        "role": access.role,
+        "message": message,
+        "whoLabel": _role_label(access.role),
+        "actorId": None,
+        "at": _utc_now_iso(),
+    }
+
+
+def _replay_checkpoint(values: tuple[Any, ...], history_limit: int | None = None) -> tuple[dict[str, Any], int]:
+    """Rebuild current state from a checkpoint row; returns the state and events replayed since the checkpoint."""
+    state, checkpoint_version, events = parse_checkpoint(values)
+    state = validate_state(state)
+    for event in events:
+        state = _next_state_with_event(state=state, event=event, history_limit=history_limit)
+    return state, int(state["version"]) - checkpoint_version
+
+
+def _with_ticket(
+    access: EncounterAccess,
+    raw_token: str,
+    token_hash: str,
+    secret: str,
+    ttl_s: float,
+) -> EncounterAccess:
+    """Attach a fresh session ticket when the caller authenticated with the raw token itself."""
+    if ttl_s <= 0 or is_ticket(raw_token):
+        return access
+    ticket = issue_ticket(
+        encounter_id=access.encounter_id,
+        role=access.role,
+        token_hash=token_hash,
+        secret=secret,
+        ttl_s=ttl_s,
+    )
+    return replace(access, ticket=ticket)
+
+
+def _access_from_row(
+    encounter_id: str,
+    row: tuple[Any, ...] | None,
+    history_limit: int | None = None,
+) -> tuple[EncounterAccess, int] | None:
+    if row is None:
+        return None
+    state, pending_events = _replay_checkpoint(row[1:], history_limit=history_limit)
+    return EncounterAccess(encounter_id=encounter_id, role=row[0], state=state), pending_events
+
+
+def _plan_checkpoint(
+    encounter_id: str,
+    values: tuple[Any, ...],
+    history_limit: int | None,
+) -> tuple[dict[str, Any], list[Statement]]:
+    """Current state from a checkpoint row, plus the snapshot write unless that version already has one."""
+    state, pending_events = _replay_checkpoint(values, history_limit=history_limit)
+    if pending_events == 0:
+        return state, []
+    return state, [snapshot_statement(encounter_id=encounter_id, state=state, now=datetime.now(timezone.utc))]
+
+
+def _cached_access(
+    encounter_id: str,
+    role: str,
+    current_version: int,
+    cached: CachedState | None,
+) -> tuple[EncounterAccess, int] | None:
+    """The cached state as access for `role` while it is still `current_version`; None means replay."""
+    if cached is None or cached.version != int(current_version):
+        return None
+    return EncounterAccess(encounter_id=encounter_id, role=role, state=cached.state), cached.pending_events
+
+
+def _remember_access(cache: EncounterCache, loaded: tuple[EncounterAccess, int] | None, token_hash: str) -> None:
+    """Keep state and token of an access loaded from the database; `loaded` is (access, pending events)."""
+    if loaded is None:
+        return
+    access, pending_events = loaded
+    cache.remember(
+        encounter_id=access.encounter_id,
+        state=access.state,
+        checkpoint_version=int(access.state["version"]) - pending_events,
+        token_hash=token_hash,
+        role=access.role,
+    )
+
+
+def _log_page(rows: list[tuple[Any, Any]] | None, limit: int) -> HistoryPage | None:
+    """Page of (version, log_json) rows selected newest first; None when the token was refused."""
+    if rows is None:
+        return None
+    return _history_page(_log_rows_newest_first(rows), before=None, limit=limit)
+
+
+def _chat_page(rows: list[tuple[Any, Any]] | None, limit: int) -> HistoryPage | None:
+    """Page of (version, event_json) chat rows selected newest first; None when the token was refused."""
+    if rows is None:
+        return None
+    return _history_page(_chat_rows_newest_first(rows), before=None, limit=limit)
@@ -0,0 +1,155 @@
+"""Id-keyed indexes over the effects and players of an encounter state.
+
+States are never mutated, so an index describes one particular `effects` or `players` list and is
+only reused while the state being reduced still holds that very list. The reducer updates the index
+together with the list it produces; any other list (a snapshot replay, a retried action, a player
+who just joined) gets a fresh index built in a single pass.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import OrderedDict
+import threading
+from typing import Any, Generic, TypeVar
+
+
+def _concentration_actors(effect: dict[str, Any]) -> tuple[str, ...]:
+    """Actors whose failed concentration save ends `effect`."""
+    actors: list[str] = []
+    concentration_actor_id = effect.get("concentrationActorId")
+    if isinstance(concentration_actor_id, str) and concentration_actor_id:
+        actors.append(concentration_actor_id)
+    source_actor_id = effect.get("sourceActorId")
+    if (
+        isinstance(source_actor_id, str)
+        and source_actor_id
+        and source_actor_id != concentration_actor_id
+        and effect.get("requiresConcentration") is True
+    ):
+        actors.append(source_actor_id)
+    return tuple(actors)
+
+
+def _drop(entries: dict[str, list[dict[str, Any]]], key: str, effect: dict[str, Any]) -> None:
+    bucket = entries[key]
+    del bucket[next(position for position, entry in enumerate(bucket) if entry is effect)]
+    if not bucket:
+        del entries[key]
+
+
+class EffectIndex:
+    """Effects by id and by the actor whose concentration keeps them alive."""
+
+    __slots__ = ("effects", "by_id", "dependents")
+
+    def __init__(self, effects: list[dict[str, Any]]) -> None:
+        self.effects = effects
+        self.by_id: dict[str, list[dict[str, Any]]] = {}
+        self.dependents: dict[str, list[dict[str, Any]]] = {}
+        for effect in effects:
+            self._register(effect)
+
+    def with_added(self, effect: dict[str, Any]) -> list[dict[str, Any]]:
+        self.effects = [*self.effects, effect]
+        self._register(effect)
+        return self.effects
+
+    def without(self, removed: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        effects = list(self.effects)
+        for effect in removed:
+            # `list.index` compares identity before equality, and equal effects are interchangeable.
+            del effects[effects.index(effect)]
+            self._unregister(effect)
+        self.effects = effects
+        return effects
+
+    def _register(self, effect: dict[str, Any]) -> None:
+        effect_id = effect.get("id")
+        if isinstance(effect_id, str):
+            self.by_id.setdefault(effect_id, []).append(effect)
+        for actor_id in _concentration_actors(effect):
+            self.dependents.setdefault(actor_id, []).append(effect)
+
+    def _unregister(self, effect: dict[str, Any]) -> None:
+        effect_id = effect.get("id")
+        if isinstance(effect_id, str):
+            _drop(self.by_id, effect_id, effect)
+        for actor_id in _concentration_actors(effect):
+            _drop(self.dependents, actor_id, effect)
+
+
+class RosterIndex:
+    """Player positions plus the initiative ranking that `turnOrder` is derived from."""
+
+    __slots__ = ("players", "turn_order", "positions", "_ranks")
+
+    def __init__(self, players: list[dict[str, Any]]) -> None:
+        self.players = players
+        self.positions: dict[str, int] = {}
+        for position, player in enumerate(players):
+            self.positions.setdefault(player["id"], position)
+        # (-initiative, position), kept sorted; ties keep roster order.
+        self._ranks = sorted(
+            (-player["initiative"], position)
+            for position, player in enumerate(players)
+            if isinstance(player.get("initiative"), int)
+        )
+        self.turn_order = [players[position]["id"] for _, position in self._ranks]
+
+    def with_initiative(self, position: int, initiative: int) -> tuple[list[dict[str, Any]], list[str]]:
+        """Set one player's initiative and move only that player within the turn order."""
+        player = self.players[position]
+        turn_order = list(self.turn_order)
+        previous = player.get("initiative")
+        if isinstance(previous, int):
+            rank = bisect_left(self._ranks, (-previous, position))
+            del self._ranks[rank]
+            del turn_order[rank]
+        rank = bisect_left(self._ranks, (-initiative, position))
+        self._ranks.insert(rank, (-initiative, position))
+        turn_order.insert(rank, player["id"])
+
+        players = list(self.players)
+        players[position] = {**player, "initiative": initiative}
+        self.players = players
+        self.turn_order = turn_order
+        return players, turn_order
+
+
+IndexT = TypeVar("IndexT", EffectIndex, RosterIndex)
+
+
+class _IndexSlots(Generic[IndexT]):
+    def __init__(self, build: type[IndexT], attribute: str, max_entries: int) -> None:
+        self._build = build
+        self._attribute = attribute
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, IndexT] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, encounter_id: Any, items: list[dict[str, Any]]) -> IndexT:
+        # Taking the entry out means two concurrent reductions never update the same index.
+        index = None
+        if isinstance(encounter_id, str):
+            with self._lock:
+                index = self._entries.pop(encounter_id, None)
+        if index is None or getattr(index, self._attribute) is not items:
+            index = self._build(items)
+        return index
+
+    def keep(self, encounter_id: Any, index: IndexT) -> None:
+        if not isinstance(encounter_id, str) or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[encounter_id] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class IndexCache:
+    """Indexes for the most recently reduced encounters, LRU-bounded per kind."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.effects: _IndexSlots[EffectIndex] = _IndexSlots(EffectIndex, "effects", max_entries)
+        self.rosters: _IndexSlots[RosterIndex] = _IndexSlots(RosterIndex, "players", max_entries)
@@ -0,0 +1,212 @@
+"""In-process metrics in the Prometheus text format.
+
+Everything is off until `METRICS.enable()` (the API does that for DNDTRACKER_METRICS=1). Hot paths
+check `METRICS.enabled` before reading a clock, so disabled instrumentation costs one attribute
+lookup per call site.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+import threading
+import time
+from typing import Iterable, Iterator
+
+# Seconds: from sub-millisecond reducer steps up to slow database commits.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [count per bucket (last is +Inf), sum]
+        self._series: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][position] += 1
+            series[1][0] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = {labels: (list(counts), total[0]) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                label_text = _label_text(self.labels, labels, extra=f'le="{le}"')
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labels, labels)} {_number(total)}"
+            yield f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}"
+
+
+class Gauge:
+    """Last value set per label combination; removed label sets disappear from the output."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def remove(self, *labels: str) -> None:
+        with self._lock:
+            self._values.pop(labels, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_label_text(self.labels, labels)} {_number(value)}"
+
+
+class _Stages:
+    """Times the consecutive stages of one store operation; each `mark` closes the stage just run."""
+
+    __slots__ = ("store", "_last")
+
+    def __init__(self, store: str) -> None:
+        self.store = store
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        METRICS.store_stage_seconds.observe(now - self._last, self.store, stage)
+        self._last = now
+
+
+class _NoStages:
+    __slots__ = ()
+
+    def mark(self, stage: str) -> None:
+        pass
+
+
+_NO_STAGES = _NoStages()
+
+
+class Metrics:
+    """The process-wide instruments."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.http_request_seconds = Histogram(
+            "dndtracker_http_request_seconds", "HTTP request latency by route.", ("method", "route")
+        )
+        self.ws_command_seconds = Histogram(
+            "dndtracker_ws_command_seconds", "WebSocket command latency by command type.", ("type",)
+        )
+        self.action_seconds = Histogram(
+            "dndtracker_action_seconds", "Time spent in apply_host_action by action type.", ("type",)
+        )
+        self.store_stage_seconds = Histogram(
+            "dndtracker_store_stage_seconds",
+            "Store write stages: connect, auth lookup, reduce, write or snapshot_write, commit.",
+            ("store", "stage"),
+        )
+        self.broadcast_seconds = Histogram(
+            "dndtracker_broadcast_seconds", "Time broadcast_state takes to diff and fan a state out to local sockets."
+        )
+        self.ws_frame_bytes = Histogram(
+            "dndtracker_ws_frame_bytes", "Serialized size of outbound state frames.", ("type",), SIZE_BUCKETS
+        )
+        self.ws_connections = Gauge(
+            "dndtracker_ws_connections", "Open WebSocket connections per encounter.", ("encounter_id",)
+        )
+        self.event_loop_lag_seconds = Histogram(
+            "dndtracker_event_loop_lag_seconds", "How late the event loop woke a periodic sleeper."
+        )
+
+    @property
+    def instruments(self) -> Iterable[Histogram | Gauge]:
+        return (
+            self.http_request_seconds,
+            self.ws_command_seconds,
+            self.action_seconds,
+            self.store_stage_seconds,
+            self.broadcast_seconds,
+            self.ws_frame_bytes,
+            self.ws_connections,
+            self.event_loop_lag_seconds,
+        )
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        for instrument in self.instruments:
+            instrument.reset()
+
+    def stages(self, store: str) -> _Stages | _NoStages:
+        """A stage timer for one store operation, or a no-op one while metrics are off."""
+        return _Stages(store) if self.enabled else _NO_STAGES
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for instrument in self.instruments:
+            lines.append(f"# HELP {instrument.name} {instrument.documentation}")
+            lines.append(f"# TYPE {instrument.name} {instrument.kind}")
+            lines.extend(instrument.samples())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
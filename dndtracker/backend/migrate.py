@@ -1,26 +1,241 @@
-"""Apply SQL schema for local PostgreSQL setup."""
+"""Apply SQL schema for local PostgreSQL setup.
+
+Migrations are numbered and recorded in `schema_migrations`; running the module again only applies
+what is missing. Each migration runs in its own transaction under an advisory lock, so two
+processes migrating at once do not race.
+"""
 
 from __future__ import annotations
 
-from pathlib import Path
+import argparse
+from dataclasses import dataclass
+from typing import Any, Callable
 
 from .config import load_settings
+from .sqlite_store import SqliteEncounterStore, is_sqlite_url, sqlite_path
+
+
+MIGRATIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+# Arbitrary key shared by every migrator of this schema.
+MIGRATION_LOCK_SQL = "SELECT pg_advisory_xact_lock(4711020)"
+
+SELECT_APPLIED_SQL = "SELECT version FROM schema_migrations"
+
+RECORD_MIGRATION_SQL = "INSERT INTO schema_migrations (version, name) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+
+# Frozen as first shipped: an applied migration must not change with later edits to db_schema.sql.
+BASE_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS encounters (
+        id UUID PRIMARY KEY,
+        name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        current_version INTEGER NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS encounter_tokens (
+        id UUID PRIMARY KEY,
+        encounter_id UUID NOT NULL REFERENCES encounters(id),
+        role TEXT NOT NULL CHECK (role IN ('HOST', 'PLAYER')),
+        token_hash TEXT NOT NULL UNIQUE,
+        created_at TIMESTAMPTZ NOT NULL,
+        revoked_at TIMESTAMPTZ NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS encounter_snapshots (
+        id UUID PRIMARY KEY,
+        encounter_id UUID NOT NULL REFERENCES encounters(id),
+        version INTEGER NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL,
+        state_json JSONB NOT NULL,
+        UNIQUE(encounter_id, version)
+    );
+
+    CREATE TABLE IF NOT EXISTS encounter_events (
+        id UUID PRIMARY KEY,
+        encounter_id UUID NOT NULL REFERENCES encounters(id),
+        version INTEGER NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL,
+        event_json JSONB NOT NULL,
+        log_json JSONB NOT NULL DEFAULT '[]'::jsonb,
+        UNIQUE(encounter_id, version)
+    );
+
+    CREATE TABLE IF NOT EXISTS encounter_rolls (
+        id UUID PRIMARY KEY,
+        encounter_id UUID NOT NULL REFERENCES encounters(id),
+        created_at TIMESTAMPTZ NOT NULL,
+        actor_id TEXT NULL,
+        who_label TEXT NOT NULL,
+        roll_json JSONB NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS encounter_chat (
+        id UUID PRIMARY KEY,
+        encounter_id UUID NOT NULL REFERENCES encounters(id),
+        created_at TIMESTAMPTZ NOT NULL,
+        who_label TEXT NOT NULL,
+        actor_id TEXT NULL,
+        text TEXT NOT NULL
+    );
+"""
+
+# The access lookup resolves the token by hash and then needs only these columns, so it can be
+# answered from the index alone; uniqueness is already enforced by the column's own constraint
+# index, so this one is not unique. Rolls and chat are read per encounter in time order; chat pages
+# read only chat events, newest first.
+HISTORY_INDEXES_SQL = """
+    CREATE INDEX IF NOT EXISTS encounter_tokens_hash_covering_idx
+        ON encounter_tokens (token_hash) INCLUDE (encounter_id, role, revoked_at);
+    CREATE INDEX IF NOT EXISTS encounter_tokens_encounter_idx
+        ON encounter_tokens (encounter_id);
+    CREATE INDEX IF NOT EXISTS encounter_rolls_encounter_created_idx
+        ON encounter_rolls (encounter_id, created_at);
+    CREATE INDEX IF NOT EXISTS encounter_chat_encounter_created_idx
+        ON encounter_chat (encounter_id, created_at);
+    CREATE INDEX IF NOT EXISTS encounter_events_chat_idx
+        ON encounter_events (encounter_id, version DESC)
+        WHERE event_json->>'kind' = 'chat';
+"""
+
+# Databases that ran migration 2 before it was fixed got a second unique index on token_hash,
+# which every token insert had to maintain; rebuild it as a plain covering index.
+TOKEN_COVERING_INDEX_NOT_UNIQUE_SQL = """
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = 'encounter_tokens_hash_covering_idx' AND i.indisunique
+        ) THEN
+            DROP INDEX encounter_tokens_hash_covering_idx;
+            CREATE INDEX encounter_tokens_hash_covering_idx
+                ON encounter_tokens (token_hash) INCLUDE (encounter_id, role, revoked_at);
+        END IF;
+    END $$;
+"""
+
+SNAPSHOT_PARTITIONING_VERSION = 3
+
 
+def partition_snapshots_sql(partitions: int) -> str:
+    """Rebuild `encounter_snapshots` hash-partitioned by encounter and move the rows over."""
+    parts = [
+        "ALTER TABLE encounter_snapshots RENAME TO encounter_snapshots_unpartitioned;",
+        """
+        CREATE TABLE encounter_snapshots (
+            id UUID NOT NULL,
+            encounter_id UUID NOT NULL REFERENCES encounters(id),
+            version INTEGER NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL,
+            state_json JSONB NOT NULL,
+            PRIMARY KEY (encounter_id, id),
+            UNIQUE (encounter_id, version)
+        ) PARTITION BY HASH (encounter_id);
+        """,
+    ]
+    for remainder in range(partitions):
+        parts.append(
+            f"CREATE TABLE encounter_snapshots_p{remainder} PARTITION OF encounter_snapshots "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder});"
+        )
+    parts.append(
+        "INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json) "
+        "SELECT id, encounter_id, version, created_at, state_json FROM encounter_snapshots_unpartitioned;"
+    )
+    parts.append("DROP TABLE encounter_snapshots_unpartitioned;")
+    return "\n".join(parts)
 
-def main() -> None:
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: Callable[[], str]
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "base schema", lambda: BASE_SCHEMA_SQL),
+    Migration(2, "token, history and chat indexes", lambda: HISTORY_INDEXES_SQL),
+    # 3 is the opt-in snapshot partitioning below.
+    Migration(4, "non-unique token covering index", lambda: TOKEN_COVERING_INDEX_NOT_UNIQUE_SQL),
+)
+
+
+def pending_migrations(applied: set[int], snapshot_partitions: int = 0) -> list[Migration]:
+    """Migrations still to run, in order; partitioning is opt-in because it rewrites the table."""
+    migrations = list(MIGRATIONS)
+    if snapshot_partitions > 0:
+        migrations.append(
+            Migration(
+                SNAPSHOT_PARTITIONING_VERSION,
+                f"hash-partition encounter_snapshots into {snapshot_partitions}",
+                lambda: partition_snapshots_sql(snapshot_partitions),
+            )
+        )
+    return sorted(
+        (migration for migration in migrations if migration.version not in applied),
+        key=lambda migration: migration.version,
+    )
+
+
+def migrate(conn: Any, snapshot_partitions: int = 0) -> list[int]:
+    """Apply every pending migration on a psycopg connection; returns the versions applied."""
+    with conn.cursor() as cur:
+        cur.execute(MIGRATIONS_TABLE_SQL)
+    conn.commit()
+
+    applied_now: list[int] = []
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(MIGRATION_LOCK_SQL)
+            # Read under the lock: another migrator may have finished in the meantime.
+            cur.execute(SELECT_APPLIED_SQL)
+            applied = {int(row[0]) for row in cur.fetchall()}
+            pending = pending_migrations(applied, snapshot_partitions=snapshot_partitions)
+            if not pending:
+                conn.commit()
+                return applied_now
+            migration = pending[0]
+            cur.execute(migration.sql())
+            cur.execute(RECORD_MIGRATION_SQL, (migration.version, migration.name))
+        conn.commit()
+        applied_now.append(migration.version)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply pending database migrations")
+    parser.add_argument(
+        "--snapshot-partitions",
+        type=int,
+        default=0,
+        help="hash-partition encounter_snapshots into this many partitions (Postgres only, once)",
+    )
+    args = parser.parse_args(argv)
     settings = load_settings()
     if not settings.database_url:
         raise RuntimeError("DNDTRACKER_DATABASE_URL is required for migration")
+    if is_sqlite_url(settings.database_url):
+        # The embedded store creates its schema when it opens the file.
+        store = SqliteEncounterStore(database_path=sqlite_path(settings.database_url), server_salt=settings.server_salt)
+        store.open()
+        store.close()
+        return
 
     import psycopg
 
-    schema_path = Path(__file__).with_name("db_schema.sql")
-    schema_sql = schema_path.read_text(encoding="utf-8")
-
     with psycopg.connect(settings.database_url) as conn:
-        with conn.cursor() as cur:
-            cur.execute(schema_sql)
-        conn.commit()
+        applied = migrate(conn, snapshot_partitions=max(0, args.snapshot_partitions))
+    print(f"applied migrations: {applied}" if applied else "schema is up to date")
 
 
 if __name__ == "__main__":
@@ -17,6 +17,8 @@ class EncounterAccess:
     encounter_id: str
     role: str
     state: dict[str, Any]
+    # Session ticket issued when a raw token was presented; see security.issue_ticket.
+    ticket: str | None = None
 
 
 @dataclass(frozen=True)
@@ -30,3 +32,16 @@ class CreatedEncounter:
     encounter_id: str
     host_token: str
     player_token: str
+
+
+@dataclass(frozen=True)
+class ActionBatchResult:
+    state: dict[str, Any]
+    # Engine events per submitted action, in submission order.
+    engine_events: list[list[dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class HistoryPage:
+    entries: list[dict[str, Any]]
+    next_before: int | None
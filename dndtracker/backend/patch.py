@@ -0,0 +1,116 @@
+"""JSON patch (RFC 6902 add/remove/replace subset) between consecutive encounter states."""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+
+def diff_states(old: Any, new: Any) -> list[dict[str, Any]]:
+    """Return patch operations that turn `old` into `new`."""
+    ops: list[dict[str, Any]] = []
+    _diff(old=old, new=new, path="", ops=ops)
+    return ops
+
+
+def apply_patch(document: Any, ops: list[dict[str, Any]]) -> Any:
+    """Return a patched copy of `document`; the input is left untouched."""
+    result = copy.deepcopy(document)
+    for op in ops:
+        result = _apply_op(document=result, op=op)
+    return result
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _same(old: Any, new: Any) -> bool:
+    # `type` guards against True == 1 style equality collapsing distinct JSON values.
+    return old is new or (type(old) is type(new) and old == new)
+
+
+def _diff(old: Any, new: Any, path: str, ops: list[dict[str, Any]]) -> None:
+    if old is new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(str(key))}"})
+        for key, value in new.items():
+            child_path = f"{path}/{_escape(str(key))}"
+            if key not in old:
+                ops.append({"op": "add", "path": child_path, "value": value})
+            else:
+                _diff(old=old[key], new=value, path=child_path, ops=ops)
+        return
+    if isinstance(old, list) and isinstance(new, list):
+        _diff_list(old=old, new=new, path=path, ops=ops)
+        return
+    if not _same(old, new):
+        ops.append({"op": "replace", "path": path, "value": new})
+
+
+def _find_shift(old: list[Any], new: list[Any]) -> int | None:
+    """Return how many leading items were dropped when `new` continues `old` (append plus window trim)."""
+    if not new:
+        return None
+    for shift in range(len(old)):
+        kept = len(old) - shift
+        if kept > len(new) or not _same(old[shift], new[0]):
+            continue
+        if all(_same(old[shift + index], new[index]) for index in range(kept)):
+            return shift
+    return None
+
+
+def _diff_list(old: list[Any], new: list[Any], path: str, ops: list[dict[str, Any]]) -> None:
+    shift = _find_shift(old=old, new=new)
+    if shift is not None:
+        ops.extend({"op": "remove", "path": f"{path}/0"} for _ in range(shift))
+        kept = len(old) - shift
+        ops.extend({"op": "add", "path": f"{path}/-", "value": value} for value in new[kept:])
+        return
+
+    overlap = min(len(old), len(new))
+    for index in range(overlap):
+        _diff(old=old[index], new=new[index], path=f"{path}/{index}", ops=ops)
+    for value in new[overlap:]:
+        ops.append({"op": "add", "path": f"{path}/-", "value": value})
+    for index in range(len(old) - 1, overlap - 1, -1):
+        ops.append({"op": "remove", "path": f"{path}/{index}"})
+
+
+def _apply_op(document: Any, op: dict[str, Any]) -> Any:
+    tokens = [_unescape(token) for token in op["path"].split("/")[1:]]
+    if not tokens:
+        return copy.deepcopy(op["value"])
+
+    parent = document
+    for token in tokens[:-1]:
+        parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+
+    last = tokens[-1]
+    kind = op["op"]
+    if isinstance(parent, list):
+        if kind == "add":
+            value = copy.deepcopy(op["value"])
+            if last == "-":
+                parent.append(value)
+            else:
+                parent.insert(int(last), value)
+        elif kind == "remove":
+            del parent[int(last)]
+        else:
+            parent[int(last)] = copy.deepcopy(op["value"])
+        return document
+
+    if kind == "remove":
+        del parent[last]
+    else:
+        parent[last] = copy.deepcopy(op["value"])
+    return document
@@ -0,0 +1,106 @@
+"""Sampling profiler for slow requests, writing flamegraph-ready folded stacks.
+
+Set DNDTRACKER_PROFILE_DIR to allow it. Every request is then sampled with DNDTRACKER_PROFILE=1;
+otherwise only requests whose `X-Dndtracker-Profile` header carries DNDTRACKER_PROFILE_SECRET, so
+anonymous clients cannot start sampler threads or write files. Only requests slower than
+DNDTRACKER_PROFILE_THRESHOLD_MS leave a `.folded` file; feed it to `flamegraph.pl` or speedscope.
+Samples cover every thread of the process, so concurrent requests show up in each other's profile.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timezone
+import hmac
+import os
+from pathlib import Path
+import re
+import sys
+import threading
+from types import FrameType
+from typing import Mapping
+
+PROFILE_HEADER = "x-dndtracker-profile"
+
+
+def fold_stack(frame: FrameType | None) -> str:
+    """Root-first `function (file:line)` frames joined by `;`, as flame graph tools expect."""
+    names: list[str] = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples the Python stack of every other thread from a background thread."""
+
+    def __init__(self, interval_s: float = 0.005) -> None:
+        self.interval_s = interval_s
+        self.counts: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dndtracker-profiler", daemon=True)
+
+    def start(self) -> StackSampler:
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.counts[f"{names.get(ident, ident)};{fold_stack(frame)}"] += 1
+
+
+def folded(counts: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class RequestProfiler:
+    """Decides which requests to sample and keeps the profiles of the slow ones."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        threshold_ms: float = 100.0,
+        profile_all: bool = False,
+        interval_s: float = 0.005,
+        header_secret: str | None = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.threshold_ms = threshold_ms
+        self.profile_all = profile_all
+        self.interval_s = interval_s
+        # The profile header is ignored unless it carries this secret.
+        self.header_secret = header_secret
+
+    def wants(self, headers: Mapping[str, str]) -> bool:
+        if self.profile_all:
+            return True
+        if not self.header_secret:
+            return False
+        return hmac.compare_digest(headers.get(PROFILE_HEADER, "").strip().encode(), self.header_secret.encode())
+
+    def start(self) -> StackSampler:
+        return StackSampler(interval_s=self.interval_s).start()
+
+    def finish(self, sampler: StackSampler, label: str, duration_s: float) -> Path | None:
+        """Stop sampling; returns the written profile, or None when the request was fast enough."""
+        counts = sampler.stop()
+        duration_ms = duration_s * 1000
+        if duration_ms < self.threshold_ms or not counts:
+            return None
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-") or "request"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / f"{stamp}-{slug}-{duration_ms:.0f}ms.folded"
+        target.write_text(folded(counts), encoding="utf-8")
+        return target
@@ -0,0 +1,320 @@
+"""Typed encounter model and the codec that maps it to and from the JSON wire shape.
+
+Every state and action that crosses the process boundary goes through the model: snapshots are
+decoded when they are read back and written from the encoded model, and host actions are decoded
+when the API receives them. The reducer then works on plain dicts that are known to be well formed.
+Decoding followed by encoding reproduces the input exactly: keys the model does not know are kept
+in `extra`, and optional keys that were absent stay absent.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+class SchemaError(ValueError):
+    """Raised when JSON does not match the encounter wire shape."""
+
+
+class _Unset:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "UNSET"
+
+    def __bool__(self) -> bool:
+        return False
+
+
+UNSET: Any = _Unset()
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check(value: Any, ok: bool, where: str, expected: str) -> Any:
+    if not ok:
+        raise SchemaError(f"{where}: expected {expected}, got {type(value).__name__}")
+    return value
+
+
+def _str(value: Any, where: str) -> str:
+    return _check(value, isinstance(value, str), where, "string")
+
+
+def _int(value: Any, where: str) -> int:
+    return _check(value, _is_int(value), where, "integer")
+
+
+def _bool(value: Any, where: str) -> bool:
+    return _check(value, isinstance(value, bool), where, "boolean")
+
+
+def _optional(check: Callable[[Any, str], Any]) -> Callable[[Any, str], Any]:
+    def optional_check(value: Any, where: str) -> Any:
+        return None if value is None else check(value, where)
+
+    return optional_check
+
+
+def _object(value: Any, where: str) -> dict[str, Any]:
+    return _check(value, isinstance(value, dict), where, "object")
+
+
+def _array(value: Any, where: str) -> list[Any]:
+    return _check(value, isinstance(value, list), where, "array")
+
+
+# (attribute, wire key, validator, required)
+_FieldSpec = tuple[str, str, Callable[[Any, str], Any], bool]
+
+
+def _decode_fields(raw: Any, where: str, specs: tuple[_FieldSpec, ...]) -> dict[str, Any]:
+    payload = _object(raw, where)
+    known = {key for _, key, _, _ in specs}
+    values: dict[str, Any] = {}
+    for attribute, key, check, required in specs:
+        if key in payload:
+            values[attribute] = check(payload[key], f"{where}.{key}")
+        elif required:
+            raise SchemaError(f"{where}.{key}: required")
+        else:
+            values[attribute] = UNSET
+    values["extra"] = {key: value for key, value in payload.items() if key not in known}
+    return values
+
+
+def _encode_fields(
+    model: Any,
+    specs: tuple[_FieldSpec, ...],
+    convert: dict[str, Callable[[Any], Any]],
+) -> dict[str, Any]:
+    wire: dict[str, Any] = {}
+    for attribute, key, _, _ in specs:
+        value = getattr(model, attribute)
+        if value is UNSET:
+            continue
+        wire[key] = convert[attribute](value) if attribute in convert else value
+    wire.update(model.extra)
+    return wire
+
+
+@dataclass(frozen=True, slots=True)
+class Player:
+    id: str
+    name: Any = UNSET
+    initiative: Any = UNSET
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+_PLAYER_FIELDS: tuple[_FieldSpec, ...] = (
+    ("id", "id", _str, True),
+    ("name", "name", _str, False),
+    ("initiative", "initiative", _optional(_int), False),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Effect:
+    id: Any = UNSET
+    name: Any = UNSET
+    rounds_remaining: Any = UNSET
+    requires_concentration: Any = UNSET
+    source_actor_id: Any = UNSET
+    concentration_actor_id: Any = UNSET
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+_EFFECT_FIELDS: tuple[_FieldSpec, ...] = (
+    ("id", "id", _str, False),
+    ("name", "name", _optional(_str), False),
+    ("rounds_remaining", "roundsRemaining", _optional(_int), False),
+    ("requires_concentration", "requiresConcentration", _optional(_bool), False),
+    ("source_actor_id", "sourceActorId", _optional(_str), False),
+    ("concentration_actor_id", "concentrationActorId", _optional(_str), False),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class ConcentrationEntry:
+    check_needed: Any = UNSET
+    dc: Any = UNSET
+    last_damage_taken: Any = UNSET
+    last_result: Any = UNSET
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+_CONCENTRATION_FIELDS: tuple[_FieldSpec, ...] = (
+    ("check_needed", "checkNeeded", _bool, False),
+    ("dc", "dc", _int, False),
+    ("last_damage_taken", "lastDamageTaken", _int, False),
+    ("last_result", "lastResult", _str, False),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Meta:
+    name: str
+    created_at: Any = UNSET
+    updated_at: Any = UNSET
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+_META_FIELDS: tuple[_FieldSpec, ...] = (
+    ("name", "name", _str, True),
+    ("created_at", "createdAt", _str, False),
+    ("updated_at", "updatedAt", _str, False),
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Encounter:
+    id: str
+    version: int
+    status: str
+    round: int
+    turn_index: int
+    meta: Meta
+    turn_order: Any = UNSET
+    players: Any = UNSET
+    actors: Any = UNSET
+    effects: Any = UNSET
+    concentration: Any = UNSET
+    chat: Any = UNSET
+    log: Any = UNSET
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+def _turn_order(value: Any, where: str) -> tuple[str, ...]:
+    return tuple(_str(item, f"{where}[{index}]") for index, item in enumerate(_array(value, where)))
+
+
+def _players(value: Any, where: str) -> tuple[Player, ...]:
+    return tuple(decode_player(item, f"{where}[{index}]") for index, item in enumerate(_array(value, where)))
+
+
+def _effects(value: Any, where: str) -> tuple[Effect, ...]:
+    return tuple(decode_effect(item, f"{where}[{index}]") for index, item in enumerate(_array(value, where)))
+
+
+def _concentration(value: Any, where: str) -> dict[str, ConcentrationEntry | None]:
+    return {
+        actor_id: None if entry is None else decode_concentration_entry(entry, f"{where}.{actor_id}")
+        for actor_id, entry in _object(value, where).items()
+    }
+
+
+def _entries(value: Any, where: str) -> tuple[dict[str, Any], ...]:
+    return tuple(_object(item, f"{where}[{index}]") for index, item in enumerate(_array(value, where)))
+
+
+_ENCOUNTER_FIELDS: tuple[_FieldSpec, ...] = (
+    ("id", "id", _str, True),
+    ("version", "version", _int, True),
+    ("status", "status", _str, True),
+    ("round", "round", _int, True),
+    ("turn_index", "turnIndex", _int, True),
+    ("turn_order", "turnOrder", _turn_order, False),
+    ("players", "players", _players, False),
+    ("actors", "actors", _object, False),
+    ("effects", "effects", _effects, False),
+    ("concentration", "concentration", _concentration, False),
+    ("chat", "chat", _entries, False),
+    ("log", "log", _entries, False),
+    ("meta", "meta", lambda value, where: decode_meta(value, where), True),
+)
+
+
+def decode_player(raw: Any, where: str = "player") -> Player:
+    return Player(**_decode_fields(raw, where, _PLAYER_FIELDS))
+
+
+def decode_effect(raw: Any, where: str = "effect") -> Effect:
+    return Effect(**_decode_fields(raw, where, _EFFECT_FIELDS))
+
+
+def decode_concentration_entry(raw: Any, where: str = "concentration") -> ConcentrationEntry:
+    return ConcentrationEntry(**_decode_fields(raw, where, _CONCENTRATION_FIELDS))
+
+
+def decode_meta(raw: Any, where: str = "meta") -> Meta:
+    return Meta(**_decode_fields(raw, where, _META_FIELDS))
+
+
+def decode_state(raw: Any) -> Encounter:
+    return Encounter(**_decode_fields(raw, "state", _ENCOUNTER_FIELDS))
+
+
+def encode_player(player: Player) -> dict[str, Any]:
+    return _encode_fields(player, _PLAYER_FIELDS, {})
+
+
+def encode_effect(effect: Effect) -> dict[str, Any]:
+    return _encode_fields(effect, _EFFECT_FIELDS, {})
+
+
+def encode_concentration_entry(entry: ConcentrationEntry) -> dict[str, Any]:
+    return _encode_fields(entry, _CONCENTRATION_FIELDS, {})
+
+
+def encode_meta(meta: Meta) -> dict[str, Any]:
+    return _encode_fields(meta, _META_FIELDS, {})
+
+
+_ENCOUNTER_CONVERTERS: dict[str, Callable[[Any], Any]] = {
+    "turn_order": list,
+    "players": lambda players: [encode_player(player) for player in players],
+    "effects": lambda effects: [encode_effect(effect) for effect in effects],
+    "concentration": lambda entries: {
+        actor_id: None if entry is None else encode_concentration_entry(entry) for actor_id, entry in entries.items()
+    },
+    "chat": list,
+    "log": list,
+    "meta": encode_meta,
+}
+
+
+def encode_state(encounter: Encounter) -> dict[str, Any]:
+    return _encode_fields(encounter, _ENCOUNTER_FIELDS, _ENCOUNTER_CONVERTERS)
+
+
+def validate_state(raw: Any) -> dict[str, Any]:
+    """Round-trip a state through the model; the wire form that comes back is what the process keeps or stores."""
+    return encode_state(decode_state(raw))
+
+
+def _int_between(low: int, high: int | None = None) -> Callable[[Any, str], int]:
+    def check_range(value: Any, where: str) -> int:
+        _int(value, where)
+        if value < low or (high is not None and value > high):
+            bounds = f"from {low} to {high}" if high is not None else f"of at least {low}"
+            raise SchemaError(f"{where}: expected integer {bounds}, got {value}")
+        return value
+
+    return check_range
+
+
+# Fields of each host action, as the reducer in engine.py reads them; ADD_EFFECT's effect is decoded as a model.
+_ACTION_FIELDS: dict[str, tuple[_FieldSpec, ...]] = {
+    "NEXT_TURN": (),
+    "ADD_EFFECT": (("effect", "effect", _object, True),),
+    "REMOVE_EFFECT": (("effect_id", "effectId", _str, True),),
+    "APPLY_DAMAGE": (("actor_id", "actorId", _str, True), ("damage_taken", "damageTaken", _int_between(0), True)),
+    "RESOLVE_CONCENTRATION_SAVE": (("actor_id", "actorId", _str, True), ("success", "success", _bool, True)),
+    "APPLY_SAVE_RESULT": (("effect_id", "effectId", _str, True), ("success", "success", _bool, True)),
+    "SET_INITIATIVE": (("player_id", "playerId", _str, True), ("initiative", "initiative", _int_between(1, 99), True)),
+}
+
+
+def validate_action(action: dict[str, Any]) -> dict[str, Any]:
+    """Decode the parts of a host action that end up inside the state; returns the action rebuilt from them."""
+    action_type = _str(_object(action, "action").get("type"), "action.type").upper()
+    specs = _ACTION_FIELDS.get(action_type)
+    if specs is None:
+        raise SchemaError(f"action.type: unknown action {action_type!r}")
+    _decode_fields(action, "action", specs)
+    if action_type == "ADD_EFFECT":
+        return {**action, "effect": encode_effect(decode_effect(action.get("effect"), "action.effect"))}
+    return action
@@ -2,12 +2,20 @@
 
 from __future__ import annotations
 
+import base64
+from dataclasses import dataclass
+from functools import lru_cache
 import hashlib
+import hmac
+import json
 import secrets
+import time
 
 
 TOKEN_BYTES = 24
 
+TICKET_PREFIX = "st1."
+
 
 def generate_token() -> str:
     """Generate a URL-safe token for encounter access."""
@@ -23,3 +31,91 @@ def hash_token(token: str, server_salt: str) -> str:
 def verify_token(raw_token: str, expected_hash: str, server_salt: str) -> bool:
     """Compare raw token against a stored hash."""
     return hash_token(raw_token, server_salt) == expected_hash
+
+
+@dataclass(frozen=True)
+class SessionTicket:
+    encounter_id: str
+    role: str
+    token_hash: str
+    expires_at: float
+
+
+def generate_ticket_secret() -> str:
+    """Random signing secret for processes started without DNDTRACKER_TICKET_SECRET."""
+    return secrets.token_urlsafe(32)
+
+
+@lru_cache(maxsize=8)
+def _ticket_key(secret: str) -> bytes:
+    # Never the token salt: that one is often left at its default and would let anyone mint tickets.
+    return hashlib.sha256(b"dndtracker-session-ticket\x00" + secret.encode("utf-8")).digest()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload: str, secret: str) -> str:
+    return _b64encode(hmac.new(_ticket_key(secret), payload.encode("utf-8"), hashlib.sha256).digest())
+
+
+def is_ticket(value: str) -> bool:
+    return value.startswith(TICKET_PREFIX)
+
+
+def issue_ticket(
+    encounter_id: str,
+    role: str,
+    token_hash: str,
+    secret: str,
+    ttl_s: float,
+    now: float | None = None,
+) -> str:
+    """Sign a short-lived ticket that stands in for the raw token of one encounter."""
+    if not secret or ttl_s <= 0:
+        raise ValueError("session tickets need a secret and a positive ttl_s")
+    expires_at = int((time.time() if now is None else now) + ttl_s)
+    claims = {"e": encounter_id, "r": role, "h": token_hash, "x": expires_at}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{TICKET_PREFIX}{payload}.{_signature(payload, secret)}"
+
+
+def read_ticket(value: str, secret: str, now: float | None = None) -> SessionTicket | None:
+    """Claims of a correctly signed, unexpired ticket; None for anything else, including raw tokens.
+
+    The claims only say which token the ticket was issued for; callers still check that token.
+    """
+    if not secret or not is_ticket(value):
+        return None
+    payload, _, signature = value[len(TICKET_PREFIX) :].partition(".")
+    if not hmac.compare_digest(signature, _signature(payload, secret)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+        ticket = SessionTicket(
+            encounter_id=str(claims["e"]),
+            role=str(claims["r"]),
+            token_hash=str(claims["h"]),
+            expires_at=float(claims["x"]),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    if ticket.expires_at <= (time.time() if now is None else now):
+        return None
+    return ticket
+
+
+def ticket_expires_at(value: str) -> float | None:
+    """Expiry claimed by a ticket, without checking its signature; for clients deciding when to renew."""
+    if not is_ticket(value):
+        return None
+    payload = value[len(TICKET_PREFIX) :].partition(".")[0]
+    try:
+        return float(json.loads(_b64decode(payload))["x"])
+    except (ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,237 @@
+"""SQL statements shared by the sync and async Postgres stores."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import json
+from typing import Any
+import uuid
+
+from .schema import validate_state
+from .tracing import TRACER
+
+
+Statement = tuple[str, tuple[Any, ...]]
+
+
+# Latest checkpoint at or below current_version plus the events recorded after it.
+_CHECKPOINT_COLUMNS = """
+        s.state_json,
+        s.version,
+        COALESCE(
+            (
+                SELECT json_agg(ev.event_json ORDER BY ev.version)
+                FROM encounter_events ev
+                WHERE ev.encounter_id = e.id
+                  AND ev.version > s.version
+                  AND ev.version <= e.current_version
+            ),
+            '[]'::json
+        )
+"""
+
+_CHECKPOINT_JOIN = """
+    JOIN LATERAL (
+        SELECT cs.version, cs.state_json
+        FROM encounter_snapshots cs
+        WHERE cs.encounter_id = e.id AND cs.version <= e.current_version
+        ORDER BY cs.version DESC
+        LIMIT 1
+    ) s ON TRUE
+"""
+
+SELECT_ACCESS_SQL = (
+    "SELECT t.role,"
+    + _CHECKPOINT_COLUMNS
+    + "FROM encounters e"
+    + _CHECKPOINT_JOIN
+    + """
+    JOIN encounter_tokens t
+      ON t.encounter_id = e.id
+    WHERE e.id = %s
+      AND t.token_hash = %s
+      AND t.revoked_at IS NULL
+"""
+)
+
+SELECT_ACCESS_FOR_UPDATE_SQL = SELECT_ACCESS_SQL + "FOR UPDATE OF e"
+
+SELECT_STATE_SQL = (
+    "SELECT"
+    + _CHECKPOINT_COLUMNS
+    + "FROM encounters e"
+    + _CHECKPOINT_JOIN
+    + """
+    WHERE e.id = %s
+"""
+)
+
+SELECT_STATE_FOR_UPDATE_SQL = SELECT_STATE_SQL + "FOR UPDATE OF e"
+
+# Token check plus current version, for callers that may already hold the state at that version.
+SELECT_VERSION_SQL = """
+    SELECT t.role, e.current_version
+    FROM encounters e
+    JOIN encounter_tokens t
+      ON t.encounter_id = e.id
+    WHERE e.id = %s
+      AND t.token_hash = %s
+      AND t.revoked_at IS NULL
+"""
+
+# Lock plus token check for mutations whose state is already cached at this version.
+SELECT_VERSION_FOR_UPDATE_SQL = SELECT_VERSION_SQL + "FOR UPDATE OF e"
+
+INSERT_ENCOUNTER_SQL = """
+    INSERT INTO encounters (id, name, status, current_version, created_at, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_TOKENS_SQL = """
+    INSERT INTO encounter_tokens (id, encounter_id, role, token_hash, created_at, revoked_at)
+    VALUES (%s, %s, 'HOST', %s, %s, NULL), (%s, %s, 'PLAYER', %s, %s, NULL)
+"""
+
+INSERT_SNAPSHOT_SQL = """
+    INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json)
+    VALUES (%s, %s, %s, %s, %s::jsonb)
+"""
+
+UPDATE_ENCOUNTER_SQL = """
+    UPDATE encounters
+    SET current_version = %s, status = %s, updated_at = %s
+    WHERE id = %s
+"""
+
+INSERT_EVENT_SQL = """
+    INSERT INTO encounter_events (id, encounter_id, version, created_at, event_json, log_json)
+    VALUES (%s, %s, %s, %s, %s::jsonb, %s::jsonb)
+"""
+
+SELECT_TOKEN_ROLE_SQL = """
+    SELECT role
+    FROM encounter_tokens
+    WHERE encounter_id = %s
+      AND token_hash = %s
+      AND revoked_at IS NULL
+"""
+
+SELECT_LOG_PAGE_SQL = """
+    SELECT version, log_json
+    FROM encounter_events
+    WHERE encounter_id = %s
+      AND (%s::integer IS NULL OR version < %s)
+    ORDER BY version DESC
+    LIMIT %s
+"""
+
+SELECT_CHAT_PAGE_SQL = """
+    SELECT version, event_json
+    FROM encounter_events
+    WHERE encounter_id = %s
+      AND event_json->>'kind' = 'chat'
+      AND (%s::integer IS NULL OR version < %s)
+    ORDER BY version DESC
+    LIMIT %s
+"""
+
+INSERT_ROLL_SQL = """
+    INSERT INTO encounter_rolls (id, encounter_id, created_at, actor_id, who_label, roll_json)
+    VALUES (%s, %s, %s, %s, %s, %s::jsonb)
+"""
+
+INSERT_CHAT_SQL = """
+    INSERT INTO encounter_chat (id, encounter_id, created_at, who_label, actor_id, text)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def parse_checkpoint(values: tuple[Any, ...]) -> tuple[dict[str, Any], int, list[dict[str, Any]]]:
+    """Decode (state_json, version, events_json) as selected by the checkpoint queries."""
+    state_json, checkpoint_version, events_json = values
+    state = state_json if isinstance(state_json, dict) else json.loads(state_json)
+    events = events_json if isinstance(events_json, list) else json.loads(events_json)
+    return state, int(checkpoint_version), events
+
+
+def create_encounter_statements(
+    encounter_id: str,
+    name: str,
+    state: dict[str, Any],
+    host_token_hash: str,
+    player_token_hash: str,
+    now: datetime,
+) -> list[Statement]:
+    return [
+        (INSERT_ENCOUNTER_SQL, (encounter_id, name, state["status"], state["version"], now, now)),
+        (
+            INSERT_TOKENS_SQL,
+            (
+                str(uuid.uuid4()),
+                encounter_id,
+                host_token_hash,
+                now,
+                str(uuid.uuid4()),
+                encounter_id,
+                player_token_hash,
+                now,
+            ),
+        ),
+        snapshot_statement(encounter_id=encounter_id, state=state, now=now),
+    ]
+
+
+def snapshot_statement(encounter_id: str, state: dict[str, Any], now: datetime) -> Statement:
+    # Snapshots are written from the typed model, so a malformed state never reaches the database.
+    with TRACER.span("json.dumps snapshot", "serialize"):
+        state_json = json.dumps(validate_state(state))
+    return (INSERT_SNAPSHOT_SQL, (str(uuid.uuid4()), encounter_id, state["version"], now, state_json))
+
+
+def history_page_params(encounter_id: str, before: int | None, limit: int) -> tuple[Any, ...]:
+    # One extra version tells the caller whether an older page exists.
+    return (encounter_id, before, before, limit + 1)
+
+
+def event_statements(
+    encounter_id: str,
+    event: dict[str, Any],
+    log_entries: list[dict[str, Any]],
+    next_state: dict[str, Any],
+    now: datetime,
+    write_snapshot: bool,
+) -> list[Statement]:
+    """Return the writes that append one event, optionally checkpoint, and advance the encounter version."""
+    statements: list[Statement] = [
+        (
+            INSERT_EVENT_SQL,
+            (
+                str(uuid.uuid4()),
+                encounter_id,
+                next_state["version"],
+                now,
+                json.dumps(event),
+                json.dumps(log_entries),
+            ),
+        ),
+    ]
+    if event["kind"] == "roll":
+        statements.append(
+            (
+                INSERT_ROLL_SQL,
+                (str(uuid.uuid4()), encounter_id, now, event["actorId"], event["whoLabel"], json.dumps(event["roll"])),
+            )
+        )
+    elif event["kind"] == "chat":
+        statements.append(
+            (
+                INSERT_CHAT_SQL,
+                (str(uuid.uuid4()), encounter_id, now, event["whoLabel"], event["actorId"], event["message"]),
+            )
+        )
+    if write_snapshot:
+        statements.append(snapshot_statement(encounter_id=encounter_id, state=next_state, now=now))
+    statements.append(
+        (UPDATE_ENCOUNTER_SQL, (next_state["version"], next_state.get("status", "setup"), now, encounter_id))
+    )
+    return statements
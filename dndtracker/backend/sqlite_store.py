@@ -0,0 +1,436 @@
+"""Embedded SQLite persistence for the local desktop mode."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+import json
+from pathlib import Path
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Iterator
+import uuid
+
+from .cache import EncounterCache
+from .events import (
+    _action_batch_event,
+    _action_batch_result,
+    _action_event,
+    _cached_access,
+    _chat_event,
+    _chat_page,
+    _log_page,
+    _plan_checkpoint,
+    _plan_event,
+    _player_registered_event,
+    _reduce_each_action,
+    _remember_access,
+    _replay_checkpoint,
+    _roll_event,
+    _with_ticket,
+)
+from .metrics import METRICS
+from .models import ActionBatchResult, CreatedEncounter, EncounterAccess, EncounterRecord, HistoryPage
+from .security import generate_ticket_secret, hash_token
+from .sql import (
+    SELECT_LOG_PAGE_SQL,
+    SELECT_TOKEN_ROLE_SQL,
+    SELECT_VERSION_SQL,
+    Statement,
+    create_encounter_statements,
+    history_page_params,
+)
+from .state import build_initial_state
+from .tracing import TRACER
+
+
+SQLITE_URL_PREFIX = "sqlite:///"
+
+SELECT_CURRENT_VERSION_SQL = "SELECT current_version FROM encounters WHERE id = ?"
+
+SELECT_CHECKPOINT_SQL = """
+    SELECT state_json, version
+    FROM encounter_snapshots
+    WHERE encounter_id = ? AND version <= ?
+    ORDER BY version DESC
+    LIMIT 1
+"""
+
+SELECT_EVENTS_SINCE_SQL = """
+    SELECT event_json
+    FROM encounter_events
+    WHERE encounter_id = ? AND version > ? AND version <= ?
+    ORDER BY version
+"""
+
+# Chat rows are filtered with json_extract, which predates SQLite's `->>` operator.
+SELECT_CHAT_PAGE_SQL = """
+    SELECT version, event_json
+    FROM encounter_events
+    WHERE encounter_id = ?
+      AND json_extract(event_json, '$.kind') = 'chat'
+      AND (? IS NULL OR version < ?)
+    ORDER BY version DESC
+    LIMIT ?
+"""
+
+_PLACEHOLDER = re.compile(r"%s(?:::\w+)?")
+
+
+def is_sqlite_url(database_url: str | None) -> bool:
+    return bool(database_url) and str(database_url).startswith(SQLITE_URL_PREFIX)
+
+
+def sqlite_path(database_url: str) -> str:
+    """`sqlite:///tracker.db` is relative to the working directory, `sqlite:////abs/tracker.db` is absolute."""
+    if not is_sqlite_url(database_url):
+        raise ValueError(f"not a sqlite URL: {database_url!r}")
+    return database_url[len(SQLITE_URL_PREFIX) :] or ":memory:"
+
+
+@lru_cache(maxsize=64)
+def _sqlite_sql(sql: str) -> str:
+    # The shared builders emit psycopg placeholders with Postgres casts; SQLite takes plain `?`.
+    return _PLACEHOLDER.sub("?", sql)
+
+
+def _sqlite_statement(statement: Statement) -> Statement:
+    sql, params = statement
+    values = tuple(value.isoformat() if isinstance(value, datetime) else value for value in params)
+    return _sqlite_sql(sql), values
+
+
+@dataclass
+class SqliteEncounterStore:
+    """EncounterStore on a single SQLite file in WAL mode, for sessions that run without a database server.
+
+    One connection is shared by all threads and serialized by a lock; sqlite3 keeps its compiled
+    statements in a per-connection cache, so every query here is prepared once and reused. Writes
+    take the database lock up front (`BEGIN IMMEDIATE`), which keeps a second process opening the
+    same file from interleaving a read-modify-write.
+    """
+
+    database_path: str
+    server_salt: str
+    snapshot_interval: int = 50
+    history_limit: int | None = 100
+    state_cache_entries: int = 256
+    state_cache_bytes: int = 64 * 1024 * 1024
+    token_cache_ttl_s: float = 60.0
+    ticket_ttl_s: float = 0.0
+    busy_timeout_s: float = 5.0
+    ticket_secret: str | None = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self._ticket_secret = self.ticket_secret or generate_ticket_secret()
+        self._cache = EncounterCache(
+            max_entries=self.state_cache_entries,
+            max_bytes=self.state_cache_bytes,
+            token_ttl_s=self.token_cache_ttl_s,
+            ticket_ttl_s=self.ticket_ttl_s,
+            ticket_secret=self._ticket_secret,
+        )
+
+    def open(self) -> None:
+        self._connection()
+
+    def close(self) -> None:
+        with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is not None:
+                conn.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(
+                    self.database_path,
+                    timeout=self.busy_timeout_s,
+                    isolation_level=None,
+                    check_same_thread=False,
+                    cached_statements=256,
+                )
+                # WAL lets readers run alongside the writer; NORMAL only syncs at checkpoints, which in WAL
+                # mode still survives an application crash.
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA foreign_keys=ON")
+                schema_path = Path(__file__).with_name("db_schema_sqlite.sql")
+                conn.executescript(schema_path.read_text(encoding="utf-8"))
+                self._conn = conn
+            return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
+        encounter_id = str(uuid.uuid4())
+        state = build_initial_state(encounter_id=encounter_id, name=name)
+        statements = create_encounter_statements(
+            encounter_id=encounter_id,
+            name=name,
+            state=state,
+            host_token_hash=hash_token(host_token, self.server_salt),
+            player_token_hash=hash_token(player_token, self.server_salt),
+            now=datetime.now(timezone.utc),
+        )
+        with self._transaction() as conn:
+            for statement in statements:
+                conn.execute(*_sqlite_statement(statement))
+        return CreatedEncounter(encounter_id=encounter_id, host_token=host_token, player_token=player_token)
+
+    def get_encounter_state(self, encounter_id: str, raw_token: str) -> EncounterRecord | None:
+        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
+        if access is None:
+            return None
+        return EncounterRecord(encounter_id=encounter_id, state=access.state)
+
+    def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        access = self._cache.access(encounter_id=encounter_id, token_hash=token_hash, role=role)
+        if access is None:
+            with self._lock:
+                loaded = self._fetch_access(self._connection(), encounter_id=encounter_id, token_hash=token_hash)
+            if loaded is None:
+                self._cache.refused(token_hash, role)
+                return None
+            access = loaded[0]
+        return _with_ticket(access, raw_token, token_hash, secret=self._ticket_secret, ttl_s=self.ticket_ttl_s)
+
+    def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        cached = self._cache.states.get(encounter_id)
+        if cached is not None:
+            return cached.state
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(SELECT_CURRENT_VERSION_SQL, (encounter_id,)).fetchone()
+            if row is None:
+                return None
+            values = self._checkpoint_values(conn, encounter_id=encounter_id, current_version=int(row[0]))
+        state, pending_events = _replay_checkpoint(values, history_limit=self.history_limit)
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=state,
+            checkpoint_version=int(state["version"]) - pending_events,
+        )
+        return state
+
+    def invalidate(self, encounter_id: str, version: int) -> None:
+        self._cache.states.discard_older(encounter_id=encounter_id, version=version)
+
+    def checkpoint(self, encounter_id: str) -> int | None:
+        """Write a full snapshot of the current version unless one already exists."""
+        with self._transaction() as conn:
+            row = conn.execute(SELECT_CURRENT_VERSION_SQL, (encounter_id,)).fetchone()
+            if row is None:
+                return None
+            values = self._checkpoint_values(conn, encounter_id=encounter_id, current_version=int(row[0]))
+            state, statements = _plan_checkpoint(encounter_id, values, history_limit=self.history_limit)
+            for statement in statements:
+                conn.execute(*_sqlite_statement(statement))
+        self._cache.remember(encounter_id=encounter_id, state=state, checkpoint_version=int(state["version"]))
+        return int(state["version"])
+
+    def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        return self._mutate(encounter_id, raw_token, lambda access: _action_event(access, action))
+
+    def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        committed = self._commit(encounter_id, raw_token, lambda access: _action_batch_event(access, actions))
+        return _action_batch_result(committed, action_count=len(actions))
+
+    def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        """One version per action, all written in a single write transaction."""
+        stages = METRICS.stages("sqlite")
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        with self._transaction() as conn:
+            stages.mark("connect")
+            loaded = self._fetch_access(conn, encounter_id=encounter_id, token_hash=token_hash)
+            stages.mark("auth")
+            if loaded is None:
+                self._cache.refused(token_hash, role)
+                return [None for _ in actions]
+            access, pending_events = loaded
+            run = _reduce_each_action(
+                access=access,
+                pending_events=pending_events,
+                actions=actions,
+                history_limit=self.history_limit,
+                snapshot_interval=self.snapshot_interval,
+            )
+            stages.mark("reduce")
+            if not run.statements:
+                return run.results
+            for statement in run.statements:
+                with TRACER.sql(statement[0]):
+                    conn.execute(*_sqlite_statement(statement))
+            stages.mark("write")
+        stages.mark("commit")
+
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=run.state,
+            checkpoint_version=run.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return run.results
+
+    def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        return self._mutate(encounter_id, raw_token, lambda access: _player_registered_event(access, name))
+
+    def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
+        return self._mutate(encounter_id, raw_token, lambda access: _roll_event(access, roll))
+
+    def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
+        return self._mutate(encounter_id, raw_token, lambda access: _chat_event(access, message))
+
+    def get_log_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        return _log_page(self._fetch_history_rows(SELECT_LOG_PAGE_SQL, encounter_id, raw_token, before, limit), limit)
+
+    def get_chat_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        return _chat_page(self._fetch_history_rows(SELECT_CHAT_PAGE_SQL, encounter_id, raw_token, before, limit), limit)
+
+    def _fetch_history_rows(
+        self,
+        sql: str,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> list[tuple[Any, Any]] | None:
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        with self._lock:
+            conn = self._connection()
+            if role is None:
+                if conn.execute(_sqlite_sql(SELECT_TOKEN_ROLE_SQL), (encounter_id, token_hash)).fetchone() is None:
+                    return None
+            params = history_page_params(encounter_id=encounter_id, before=before, limit=limit)
+            return conn.execute(_sqlite_sql(sql), params).fetchall()
+
+    def _checkpoint_values(
+        self,
+        conn: sqlite3.Connection,
+        encounter_id: str,
+        current_version: int,
+    ) -> tuple[Any, ...]:
+        """(state_json, version, events) as the Postgres checkpoint queries select them in one round trip."""
+        state_json, checkpoint_version = conn.execute(SELECT_CHECKPOINT_SQL, (encounter_id, current_version)).fetchone()
+        events = [
+            json.loads(event_json)
+            for (event_json,) in conn.execute(
+                SELECT_EVENTS_SINCE_SQL,
+                (encounter_id, checkpoint_version, current_version),
+            )
+        ]
+        return state_json, checkpoint_version, events
+
+    def _fetch_access(
+        self,
+        conn: sqlite3.Connection,
+        encounter_id: str,
+        token_hash: str,
+    ) -> tuple[EncounterAccess, int] | None:
+        row = conn.execute(_sqlite_sql(SELECT_VERSION_SQL), (encounter_id, token_hash)).fetchone()
+        if row is None:
+            return None
+        role, current_version = row
+        cached = self._cache.states.get(encounter_id)
+        loaded = _cached_access(encounter_id, role=role, current_version=current_version, cached=cached)
+        if loaded is None:
+            values = self._checkpoint_values(conn, encounter_id=encounter_id, current_version=int(current_version))
+            state, pending_events = _replay_checkpoint(values, history_limit=self.history_limit)
+            loaded = EncounterAccess(encounter_id=encounter_id, role=role, state=state), pending_events
+        _remember_access(self._cache, loaded, token_hash)
+        return loaded
+
+    def _mutate(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> dict[str, Any] | None:
+        committed = self._commit(encounter_id, raw_token, build_event)
+        return None if committed is None else committed[0]
+
+    def _commit(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> tuple[dict[str, Any], list[dict[str, Any]]] | None:
+        """Authorize, reduce and persist one event inside a single write transaction."""
+        stages = METRICS.stages("sqlite")
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        with self._transaction() as conn:
+            stages.mark("connect")
+            loaded = self._fetch_access(conn, encounter_id=encounter_id, token_hash=token_hash)
+            stages.mark("auth")
+            if loaded is None:
+                self._cache.refused(token_hash, role)
+                return None
+            access, pending_events = loaded
+            event = build_event(access)
+            if event is None:
+                return None
+            planned = _plan_event(
+                access=access,
+                pending_events=pending_events,
+                event=event,
+                history_limit=self.history_limit,
+                snapshot_interval=self.snapshot_interval,
+            )
+            stages.mark("reduce")
+            for statement in planned.statements:
+                with TRACER.sql(statement[0]):
+                    conn.execute(*_sqlite_statement(statement))
+            stages.mark("snapshot_write" if planned.write_snapshot else "write")
+        stages.mark("commit")
+
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=planned.state,
+            checkpoint_version=planned.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return planned.state, planned.log_entries
@@ -2,57 +2,51 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-import json
-from typing import Any, Protocol
+import threading
+from typing import Any, Callable, Protocol
 import uuid
 
-from .engine import apply_host_action
-from .models import CreatedEncounter, EncounterAccess, EncounterRecord
-from .security import hash_token
+from .cache import EncounterCache
+from .events import (
+    _access_from_row,
+    _action_batch_event,
+    _action_batch_result,
+    _action_event,
+    _cached_access,
+    _chat_event,
+    _chat_page,
+    _history_page,
+    _log_page,
+    _plan_checkpoint,
+    _plan_event,
+    _player_registered_event,
+    _reduce_each_action,
+    _reduce_event,
+    _remember_access,
+    _replay_checkpoint,
+    _roll_event,
+    _with_ticket,
+)
+from .metrics import METRICS
+from .models import ActionBatchResult, CreatedEncounter, EncounterAccess, EncounterRecord, HistoryPage
+from .security import generate_ticket_secret, hash_token, read_ticket
+from .sql import (
+    SELECT_ACCESS_FOR_UPDATE_SQL,
+    SELECT_ACCESS_SQL,
+    SELECT_CHAT_PAGE_SQL,
+    SELECT_LOG_PAGE_SQL,
+    SELECT_STATE_FOR_UPDATE_SQL,
+    SELECT_STATE_SQL,
+    SELECT_TOKEN_ROLE_SQL,
+    SELECT_VERSION_FOR_UPDATE_SQL,
+    create_encounter_statements,
+    history_page_params,
+)
 from .state import build_initial_state
-
-
-def _role_label(role: str) -> str:
-    return role.capitalize()
-
-
-def _next_state_with_event(state: dict[str, Any], event: dict[str, Any]) -> dict[str, Any]:
-    next_state = dict(state)
-    next_state["version"] = int(state["version"]) + 1
-    next_meta = dict(state["meta"])
-    next_meta["updatedAt"] = datetime.now(timezone.utc).isoformat()
-    next_state["meta"] = next_meta
-
-    next_log = list(state.get("log", []))
-    next_log.append(event)
-    next_state["log"] = next_log
-
-    if event["kind"] == "chat":
-        next_chat = list(state.get("chat", []))
-        next_chat.append(
-            {
-                "role": event["role"],
-                "text": event["message"],
-                "whoLabel": event["whoLabel"],
-                "actorId": event.get("actorId"),
-            }
-        )
-        next_state["chat"] = next_chat
-
-    if event["kind"] == "player_registered":
-        next_players = list(state.get("players", []))
-        next_players.append(dict(event["player"]))
-        next_state["players"] = next_players
-
-    if event["kind"] == "action":
-        reduced = apply_host_action(state=next_state, action=event["action"])
-        next_state = reduced.state
-        next_log.extend(reduced.engine_events)
-        next_state["log"] = next_log
-
-    return next_state
+from .tracing import TRACER
 
 
 class EncounterStore(Protocol):
@@ -65,9 +59,31 @@ class EncounterStore(Protocol):
     def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
         """Return encounter role and state when token is valid."""
 
+    def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        """Return current state without a token check; for server-side fan-out only."""
+
+    def invalidate(self, encounter_id: str, version: int) -> None:
+        """Forget cached state older than `version`, which another process has committed."""
+
     def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
         """Apply a host action and return new state when authorized."""
 
+    def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        """Apply host actions in order as one new version; returns the state and per-action engine events."""
+
+    def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        """Apply host actions as one version each, persisted together; per action the state, None or its error."""
+
     def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
         """Append a roll entry and return new state when authorized."""
 
@@ -77,26 +93,48 @@ class EncounterStore(Protocol):
     def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
         """Register a player name and return new state when authorized."""
 
+    def get_log_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        """Return log entries older than version `before`, grouped into at most `limit` versions."""
+
+    def get_chat_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        """Return chat entries older than version `before`, at most `limit` messages."""
+
+    def open(self) -> None:
+        """Acquire long-lived resources such as connection pools."""
+
+    def close(self) -> None:
+        """Release long-lived resources acquired by the store."""
+
 
 @dataclass
 class InMemoryEncounterStore:
     server_salt: str
+    history_limit: int | None = 100
+    history_buffer_size: int = 1000
+    ticket_ttl_s: float = 0.0
+    # Signs session tickets; a random one per process when unset, so tickets only work where issued.
+    ticket_secret: str | None = field(default=None, repr=False)
 
     def __post_init__(self) -> None:
+        self._ticket_secret = self.ticket_secret or generate_ticket_secret()
         self._encounters: dict[str, dict] = {}
+        # Token hash -> (encounter id, role) across all encounters.
+        self._tokens: dict[str, tuple[str, str]] = {}
+        # Guards read-modify-write of an encounter when the store is driven from worker threads.
+        self._lock = threading.Lock()
 
     def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
         encounter_id = str(uuid.uuid4())
         state = build_initial_state(encounter_id=encounter_id, name=name)
         now = datetime.now(timezone.utc).isoformat()
+        self._tokens[hash_token(host_token, self.server_salt)] = (encounter_id, "HOST")
+        self._tokens[hash_token(player_token, self.server_salt)] = (encounter_id, "PLAYER")
         self._encounters[encounter_id] = {
             "state": state,
-            "tokens": {
-                "HOST": hash_token(host_token, self.server_salt),
-                "PLAYER": hash_token(player_token, self.server_salt),
-            },
             "createdAt": now,
             "updatedAt": now,
+            "log": deque(maxlen=self.history_buffer_size),
+            "chat": deque(maxlen=self.history_buffer_size),
         }
         return CreatedEncounter(encounter_id=encounter_id, host_token=host_token, player_token=player_token)
 
@@ -107,120 +145,209 @@ class InMemoryEncounterStore:
         return EncounterRecord(encounter_id=encounter_id, state=access.state)
 
     def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        authorized = self._authorize_token(encounter_id=encounter_id, raw_token=raw_token)
+        if authorized is None:
+            return None
+        access, token_hash = authorized
+        return _with_ticket(
+            access,
+            raw_token=raw_token,
+            token_hash=token_hash,
+            secret=self._ticket_secret,
+            ttl_s=self.ticket_ttl_s,
+        )
+
+    def _authorize(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
+        authorized = self._authorize_token(encounter_id=encounter_id, raw_token=raw_token)
+        return None if authorized is None else authorized[0]
+
+    def _authorize_token(self, encounter_id: str, raw_token: str) -> tuple[EncounterAccess, str] | None:
+        """Access plus the token hash it was granted for; a valid ticket supplies the hash without hashing."""
         payload = self._encounters.get(encounter_id)
         if payload is None:
             return None
+        ticket = read_ticket(raw_token, self._ticket_secret) if self.ticket_ttl_s > 0 else None
+        # A ticket only replaces hashing; the token it was issued for must still be valid here.
+        token_hash = ticket.token_hash if ticket is not None else hash_token(raw_token, self.server_salt)
+        entry = self._tokens.get(token_hash)
+        if entry is None or entry[0] != encounter_id:
+            return None
+        return EncounterAccess(encounter_id=encounter_id, role=entry[1], state=payload["state"]), token_hash
 
-        raw_hash = hash_token(raw_token, self.server_salt)
-        role: str | None = None
-        for candidate_role, token_hash in payload["tokens"].items():
-            if raw_hash == token_hash:
-                role = candidate_role
-                break
+    def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        payload = self._encounters.get(encounter_id)
+        return None if payload is None else payload["state"]
 
-        if role is None:
-            return None
-        return EncounterAccess(encounter_id=encounter_id, role=role, state=payload["state"])
+    def invalidate(self, encounter_id: str, version: int) -> None:
+        return None
 
     def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None or access.role != "HOST":
-            return None
-        payload = self._encounters[encounter_id]
-        payload["state"] = self._next_state_with_event(
-            state=payload["state"],
-            event={"kind": "action", "role": "HOST", "action": action},
-        )
-        return payload["state"]
+        return self._mutate(encounter_id, raw_token, lambda access: _action_event(access, action))
+
+    def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        committed = self._commit(encounter_id, raw_token, lambda access: _action_batch_event(access, actions))
+        return _action_batch_result(committed, action_count=len(actions))
+
+    def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        # Nothing to persist, so there is nothing to batch either.
+        results: list[dict[str, Any] | None | Exception] = []
+        for action in actions:
+            try:
+                results.append(self.apply_action(encounter_id=encounter_id, raw_token=raw_token, action=action))
+            except Exception as exc:
+                results.append(exc)
+        return results
 
     def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None:
-            return None
-        payload = self._encounters[encounter_id]
-        payload["state"] = self._next_state_with_event(
-            state=payload["state"],
-            event={"kind": "roll", "role": access.role, "roll": roll},
-        )
-        return payload["state"]
+        return self._mutate(encounter_id, raw_token, lambda access: _roll_event(access, roll))
 
     def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None:
-            return None
-        payload = self._encounters[encounter_id]
-        payload["state"] = self._next_state_with_event(
-            state=payload["state"],
-            event={"kind": "chat", "role": access.role, "message": message, "whoLabel": _role_label(access.role), "actorId": None},
-        )
-        return payload["state"]
+        return self._mutate(encounter_id, raw_token, lambda access: _chat_event(access, message))
 
     def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None or access.role != "PLAYER":
+        return self._mutate(encounter_id, raw_token, lambda access: _player_registered_event(access, name))
+
+    def _mutate(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> dict[str, Any] | None:
+        committed = self._commit(encounter_id, raw_token, build_event)
+        return None if committed is None else committed[0]
+
+    def _commit(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> tuple[dict[str, Any], list[dict[str, Any]]] | None:
+        with self._lock:
+            stages = METRICS.stages("memory")
+            access = self._authorize(encounter_id=encounter_id, raw_token=raw_token)
+            stages.mark("auth")
+            event = None if access is None else build_event(access)
+            if event is None:
+                return None
+            payload = self._encounters[encounter_id]
+            next_state, log_entries = _reduce_event(
+                state=payload["state"],
+                event=event,
+                history_limit=self.history_limit,
+            )
+            stages.mark("reduce")
+            payload["state"] = next_state
+            payload["log"].extend(log_entries)
+            if event["kind"] == "chat":
+                payload["chat"].append(next_state["chat"][-1])
+        return next_state, log_entries
+
+    def get_log_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        if self._authorize(encounter_id=encounter_id, raw_token=raw_token) is None:
             return None
-        payload = self._encounters[encounter_id]
-        payload["state"] = self._next_state_with_event(
-            state=payload["state"],
-            event={
-                "kind": "player_registered",
-                "role": access.role,
-                "player": {"id": str(uuid.uuid4()), "name": name, "initiative": None},
-            },
-        )
-        return payload["state"]
+        return _history_page(reversed(self._encounters[encounter_id]["log"]), before=before, limit=limit)
+
+    def get_chat_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        if self._authorize(encounter_id=encounter_id, raw_token=raw_token) is None:
+            return None
+        return _history_page(reversed(self._encounters[encounter_id]["chat"]), before=before, limit=limit)
+
+    def open(self) -> None:
+        return None
 
-    def _next_state_with_event(self, state: dict[str, Any], event: dict[str, Any]) -> dict[str, Any]:
-        return _next_state_with_event(state=state, event=event)
+    def close(self) -> None:
+        return None
 
 
 @dataclass
 class PostgresEncounterStore:
     database_url: str
     server_salt: str
+    pool_min_size: int = 0
+    pool_max_size: int = 0
+    pool_max_idle_s: float = 300.0
+    pool_timeout_s: float = 5.0
+    snapshot_interval: int = 50
+    history_limit: int | None = 100
+    state_cache_entries: int = 256
+    state_cache_bytes: int = 64 * 1024 * 1024
+    token_cache_ttl_s: float = 60.0
+    ticket_ttl_s: float = 0.0
+    ticket_secret: str | None = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        self._pool: Any = None
+        self._ticket_secret = self.ticket_secret or generate_ticket_secret()
+        self._cache = EncounterCache(
+            max_entries=self.state_cache_entries,
+            max_bytes=self.state_cache_bytes,
+            token_ttl_s=self.token_cache_ttl_s,
+            ticket_ttl_s=self.ticket_ttl_s,
+            ticket_secret=self._ticket_secret,
+        )
+
+    @property
+    def pooled(self) -> bool:
+        return self.pool_max_size > 0
 
     def _connect(self) -> Any:
+        if self.pooled:
+            return self._get_pool().connection()
+
         import psycopg
 
         return psycopg.connect(self.database_url)
 
+    def _get_pool(self) -> Any:
+        if self._pool is None:
+            from psycopg_pool import ConnectionPool
+
+            self._pool = ConnectionPool(
+                self.database_url,
+                min_size=min(self.pool_min_size, self.pool_max_size),
+                max_size=self.pool_max_size,
+                max_idle=self.pool_max_idle_s,
+                timeout=self.pool_timeout_s,
+                check=ConnectionPool.check_connection,
+                open=True,
+            )
+        return self._pool
+
+    def open(self) -> None:
+        if self.pooled:
+            self._get_pool()
+
+    def close(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
     def create_encounter(self, name: str, host_token: str, player_token: str) -> CreatedEncounter:
         encounter_id = str(uuid.uuid4())
         state = build_initial_state(encounter_id=encounter_id, name=name)
-        now = datetime.now(timezone.utc)
+        statements = create_encounter_statements(
+            encounter_id=encounter_id,
+            name=name,
+            state=state,
+            host_token_hash=hash_token(host_token, self.server_salt),
+            player_token_hash=hash_token(player_token, self.server_salt),
+            now=datetime.now(timezone.utc),
+        )
 
         with self._connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO encounters (id, name, status, current_version, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (encounter_id, name, state["status"], state["version"], now, now),
-                )
-                cur.execute(
-                    """
-                    INSERT INTO encounter_tokens (id, encounter_id, role, token_hash, created_at, revoked_at)
-                    VALUES (%s, %s, 'HOST', %s, %s, NULL), (%s, %s, 'PLAYER', %s, %s, NULL)
-                    """,
-                    (
-                        str(uuid.uuid4()),
-                        encounter_id,
-                        hash_token(host_token, self.server_salt),
-                        now,
-                        str(uuid.uuid4()),
-                        encounter_id,
-                        hash_token(player_token, self.server_salt),
-                        now,
-                    ),
-                )
-                cur.execute(
-                    """
-                    INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json)
-                    VALUES (%s, %s, %s, %s, %s::jsonb)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, state["version"], now, json.dumps(state)),
-                )
+                for sql, params in statements:
+                    cur.execute(sql, params)
             conn.commit()
 
         return CreatedEncounter(encounter_id=encounter_id, host_token=host_token, player_token=player_token)
@@ -232,187 +359,291 @@ class PostgresEncounterStore:
         return EncounterRecord(encounter_id=encounter_id, state=access.state)
 
     def get_encounter_access(self, encounter_id: str, raw_token: str) -> EncounterAccess | None:
-        token_hash = hash_token(raw_token, self.server_salt)
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        access = self._cache.access(encounter_id=encounter_id, token_hash=token_hash, role=role)
+        if access is None:
+            with self._connect() as conn:
+                with conn.cursor() as cur:
+                    loaded = self._fetch_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash, lock=False)
+            if loaded is None:
+                self._cache.refused(token_hash, role)
+                return None
+            access = loaded[0]
+        return _with_ticket(access, raw_token, token_hash, secret=self._ticket_secret, ttl_s=self.ticket_ttl_s)
+
+    def load_state(self, encounter_id: str) -> dict[str, Any] | None:
+        cached = self._cache.states.get(encounter_id)
+        if cached is not None:
+            return cached.state
         with self._connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT t.role, s.state_json
-                    FROM encounters e
-                    JOIN encounter_snapshots s
-                      ON s.encounter_id = e.id AND s.version = e.current_version
-                    JOIN encounter_tokens t
-                      ON t.encounter_id = e.id
-                    WHERE e.id = %s
-                      AND t.token_hash = %s
-                      AND t.revoked_at IS NULL
-                    """,
-                    (encounter_id, token_hash),
-                )
+                cur.execute(SELECT_STATE_SQL, (encounter_id,))
                 row = cur.fetchone()
-
         if row is None:
             return None
+        state, pending_events = _replay_checkpoint(row, history_limit=self.history_limit)
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=state,
+            checkpoint_version=int(state["version"]) - pending_events,
+        )
+        return state
 
-        role, state_json = row
-        state = state_json if isinstance(state_json, dict) else json.loads(state_json)
-        return EncounterAccess(encounter_id=encounter_id, role=role, state=state)
-
-    def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None or access.role != "HOST":
-            return None
-
-        event = {"kind": "action", "role": "HOST", "action": action}
-        next_state = _next_state_with_event(state=access.state, event=event)
+    def invalidate(self, encounter_id: str, version: int) -> None:
+        self._cache.states.discard_older(encounter_id=encounter_id, version=version)
 
-        now = datetime.now(timezone.utc)
+    def checkpoint(self, encounter_id: str) -> int | None:
+        """Write a full snapshot of the current version unless one already exists."""
         with self._connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json)
-                    VALUES (%s, %s, %s, %s, %s::jsonb)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, next_state["version"], now, json.dumps(next_state)),
-                )
-                cur.execute(
-                    """
-                    UPDATE encounters
-                    SET current_version = %s, status = %s, updated_at = %s
-                    WHERE id = %s
-                    """,
-                    (next_state["version"], next_state.get("status", "setup"), now, encounter_id),
-                )
+                cur.execute(SELECT_STATE_FOR_UPDATE_SQL, (encounter_id,))
+                row = cur.fetchone()
+                if row is None:
+                    return None
+                state, statements = _plan_checkpoint(encounter_id, row, history_limit=self.history_limit)
+                for sql, params in statements:
+                    cur.execute(sql, params)
             conn.commit()
+        self._cache.remember(encounter_id=encounter_id, state=state, checkpoint_version=int(state["version"]))
+        return int(state["version"])
 
-        return next_state
-
-    def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None or access.role != "PLAYER":
-            return None
-
-        event = {
-            "kind": "player_registered",
-            "role": access.role,
-            "player": {"id": str(uuid.uuid4()), "name": name, "initiative": None},
-        }
-        next_state = _next_state_with_event(state=access.state, event=event)
-
-        now = datetime.now(timezone.utc)
+    def apply_action(self, encounter_id: str, raw_token: str, action: dict[str, Any]) -> dict[str, Any] | None:
+        return self._mutate(encounter_id, raw_token, lambda access: _action_event(access, action))
+
+    def apply_actions(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> ActionBatchResult | None:
+        committed = self._commit(encounter_id, raw_token, lambda access: _action_batch_event(access, actions))
+        return _action_batch_result(committed, action_count=len(actions))
+
+    def apply_each_action(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        actions: list[dict[str, Any]],
+    ) -> list[dict[str, Any] | None | Exception]:
+        """One version per action, all written in a single row-locked transaction."""
+        stages = METRICS.stages("postgres")
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
         with self._connect() as conn:
+            stages.mark("connect")
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json)
-                    VALUES (%s, %s, %s, %s, %s::jsonb)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, next_state["version"], now, json.dumps(next_state)),
-                )
-                cur.execute(
-                    """
-                    UPDATE encounters
-                    SET current_version = %s, status = %s, updated_at = %s
-                    WHERE id = %s
-                    """,
-                    (next_state["version"], next_state.get("status", "setup"), now, encounter_id),
+                loaded = self._lock_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash)
+                stages.mark("auth")
+                if loaded is None:
+                    self._cache.refused(token_hash, role)
+                    return [None for _ in actions]
+                access, pending_events = loaded
+                run = _reduce_each_action(
+                    access=access,
+                    pending_events=pending_events,
+                    actions=actions,
+                    history_limit=self.history_limit,
+                    snapshot_interval=self.snapshot_interval,
                 )
+                stages.mark("reduce")
+                if not run.statements:
+                    return run.results
+                for sql, params in run.statements:
+                    with TRACER.sql(sql):
+                        cur.execute(sql, params)
+                stages.mark("write")
             conn.commit()
+            stages.mark("commit")
+
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=run.state,
+            checkpoint_version=run.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return run.results
 
-        return next_state
+    def register_player(self, encounter_id: str, raw_token: str, name: str) -> dict[str, Any] | None:
+        return self._mutate(encounter_id, raw_token, lambda access: _player_registered_event(access, name))
 
     def append_roll(self, encounter_id: str, raw_token: str, roll: dict[str, Any]) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None:
-            return None
-
-        actor_id = roll.get("actorId") if isinstance(roll.get("actorId"), str) else None
-        who_label_raw = roll.get("whoLabel")
-        who_label = str(who_label_raw).strip() if who_label_raw else _role_label(access.role)
-        event = {
-            "kind": "roll",
-            "role": access.role,
-            "roll": roll,
-            "whoLabel": who_label,
-            "actorId": actor_id,
-        }
-        next_state = _next_state_with_event(state=access.state, event=event)
-
-        now = datetime.now(timezone.utc)
-        with self._connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO encounter_rolls (id, encounter_id, created_at, actor_id, who_label, roll_json)
-                    VALUES (%s, %s, %s, %s, %s, %s::jsonb)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, now, actor_id, who_label, json.dumps(roll)),
-                )
-                cur.execute(
-                    """
-                    INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json)
-                    VALUES (%s, %s, %s, %s, %s::jsonb)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, next_state["version"], now, json.dumps(next_state)),
-                )
-                cur.execute(
-                    """
-                    UPDATE encounters
-                    SET current_version = %s, status = %s, updated_at = %s
-                    WHERE id = %s
-                    """,
-                    (next_state["version"], next_state.get("status", "setup"), now, encounter_id),
-                )
-            conn.commit()
-
-        return next_state
+        return self._mutate(encounter_id, raw_token, lambda access: _roll_event(access, roll))
 
     def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict[str, Any] | None:
-        access = self.get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
-        if access is None:
+        return self._mutate(encounter_id, raw_token, lambda access: _chat_event(access, message))
+
+    def _fetch_access(
+        self,
+        cur: Any,
+        encounter_id: str,
+        token_hash: str,
+        lock: bool,
+    ) -> tuple[EncounterAccess, int] | None:
+        cur.execute(SELECT_ACCESS_FOR_UPDATE_SQL if lock else SELECT_ACCESS_SQL, (encounter_id, token_hash))
+        loaded = _access_from_row(encounter_id=encounter_id, row=cur.fetchone(), history_limit=self.history_limit)
+        _remember_access(self._cache, loaded, token_hash)
+        return loaded
+
+    def _lock_access(self, cur: Any, encounter_id: str, token_hash: str) -> tuple[EncounterAccess, int] | None:
+        """Row-lock the encounter; reuse the cached state when it is still the current version."""
+        cached = self._cache.states.get(encounter_id)
+        if cached is None:
+            return self._fetch_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash, lock=True)
+        cur.execute(SELECT_VERSION_FOR_UPDATE_SQL, (encounter_id, token_hash))
+        row = cur.fetchone()
+        if row is None:
             return None
-
-        event = {
-            "kind": "chat",
-            "role": access.role,
-            "message": message,
-            "whoLabel": _role_label(access.role),
-            "actorId": None,
-        }
-        next_state = _next_state_with_event(state=access.state, event=event)
-
-        now = datetime.now(timezone.utc)
+        role, current_version = row
+        current = _cached_access(encounter_id, role=role, current_version=current_version, cached=cached)
+        if current is None:
+            return self._fetch_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash, lock=True)
+        return current
+
+    def get_log_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        return _log_page(self._fetch_history_rows(SELECT_LOG_PAGE_SQL, encounter_id, raw_token, before, limit), limit)
+
+    def get_chat_page(self, encounter_id: str, raw_token: str, before: int | None, limit: int) -> HistoryPage | None:
+        return _chat_page(self._fetch_history_rows(SELECT_CHAT_PAGE_SQL, encounter_id, raw_token, before, limit), limit)
+
+    def _fetch_history_rows(
+        self,
+        sql: str,
+        encounter_id: str,
+        raw_token: str,
+        before: int | None,
+        limit: int,
+    ) -> list[tuple[Any, Any]] | None:
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
         with self._connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO encounter_chat (id, encounter_id, created_at, who_label, actor_id, text)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, now, _role_label(access.role), None, message),
-                )
-                cur.execute(
-                    """
-                    INSERT INTO encounter_snapshots (id, encounter_id, version, created_at, state_json)
-                    VALUES (%s, %s, %s, %s, %s::jsonb)
-                    """,
-                    (str(uuid.uuid4()), encounter_id, next_state["version"], now, json.dumps(next_state)),
-                )
-                cur.execute(
-                    """
-                    UPDATE encounters
-                    SET current_version = %s, status = %s, updated_at = %s
-                    WHERE id = %s
-                    """,
-                    (next_state["version"], next_state.get("status", "setup"), now, encounter_id),
+                if role is None:
+                    cur.execute(SELECT_TOKEN_ROLE_SQL, (encounter_id, token_hash))
+                    if cur.fetchone() is None:
+                        return None
+                cur.execute(sql, history_page_params(encounter_id=encounter_id, before=before, limit=limit))
+                return cur.fetchall()
+
+    def _mutate(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> dict[str, Any] | None:
+        committed = self._commit(encounter_id, raw_token, build_event)
+        return None if committed is None else committed[0]
+
+    def _commit(
+        self,
+        encounter_id: str,
+        raw_token: str,
+        build_event: Callable[[EncounterAccess], dict[str, Any] | None],
+    ) -> tuple[dict[str, Any], list[dict[str, Any]]] | None:
+        """Authorize, reduce and persist one event inside a single row-locked transaction."""
+        stages = METRICS.stages("postgres")
+        token_hash, role = self._cache.credentials(
+            encounter_id=encounter_id,
+            raw_token=raw_token,
+            server_salt=self.server_salt,
+        )
+        with self._connect() as conn:
+            stages.mark("connect")
+            with conn.cursor() as cur:
+                loaded = self._lock_access(cur=cur, encounter_id=encounter_id, token_hash=token_hash)
+                stages.mark("auth")
+                if loaded is None:
+                    self._cache.refused(token_hash, role)
+                    return None
+                access, pending_events = loaded
+                event = build_event(access)
+                if event is None:
+                    return None
+                planned = _plan_event(
+                    access=access,
+                    pending_events=pending_events,
+                    event=event,
+                    history_limit=self.history_limit,
+                    snapshot_interval=self.snapshot_interval,
                 )
+                stages.mark("reduce")
+                for sql, params in planned.statements:
+                    with TRACER.sql(sql):
+                        cur.execute(sql, params)
+                stages.mark("snapshot_write" if planned.write_snapshot else "write")
             conn.commit()
-
-        return next_state
-
-
-def create_store(database_url: str | None, server_salt: str) -> EncounterStore:
+            stages.mark("commit")
+
+        self._cache.remember(
+            encounter_id=encounter_id,
+            state=planned.state,
+            checkpoint_version=planned.checkpoint_version,
+            token_hash=token_hash,
+            role=access.role,
+        )
+        return planned.state, planned.log_entries
+
+
+def create_store(
+    database_url: str | None,
+    server_salt: str,
+    pool_min_size: int = 0,
+    pool_max_size: int = 0,
+    pool_max_idle_s: float = 300.0,
+    pool_timeout_s: float = 5.0,
+    snapshot_interval: int = 50,
+    history_limit: int | None = 100,
+    history_buffer_size: int = 1000,
+    state_cache_entries: int = 256,
+    state_cache_bytes: int = 64 * 1024 * 1024,
+    token_cache_ttl_s: float = 60.0,
+    ticket_ttl_s: float = 0.0,
+    ticket_secret: str | None = None,
+) -> EncounterStore:
+    from .sqlite_store import SqliteEncounterStore, is_sqlite_url, sqlite_path
+
+    if is_sqlite_url(database_url):
+        return SqliteEncounterStore(
+            database_path=sqlite_path(str(database_url)),
+            server_salt=server_salt,
+            snapshot_interval=snapshot_interval,
+            history_limit=history_limit,
+            state_cache_entries=state_cache_entries,
+            state_cache_bytes=state_cache_bytes,
+            token_cache_ttl_s=token_cache_ttl_s,
+            ticket_ttl_s=ticket_ttl_s,
+            ticket_secret=ticket_secret,
+        )
     if database_url:
-        return PostgresEncounterStore(database_url=database_url, server_salt=server_salt)
-    return InMemoryEncounterStore(server_salt=server_salt)
+        return PostgresEncounterStore(
+            database_url=database_url,
+            server_salt=server_salt,
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pool_max_idle_s=pool_max_idle_s,
+            pool_timeout_s=pool_timeout_s,
+            snapshot_interval=snapshot_interval,
+            history_limit=history_limit,
+            state_cache_entries=state_cache_entries,
+            state_cache_bytes=state_cache_bytes,
+            token_cache_ttl_s=token_cache_ttl_s,
+            ticket_ttl_s=ticket_ttl_s,
+            ticket_secret=ticket_secret,
+        )
+    return InMemoryEncounterStore(
+        server_salt=server_salt,
+        history_limit=history_limit,
+        history_buffer_size=history_buffer_size,
+        ticket_ttl_s=ticket_ttl_s,
+        ticket_secret=ticket_secret,
+    )
@@ -0,0 +1,162 @@
+"""Opt-in spans, exported as Chrome trace-event JSON.
+
+With DNDTRACKER_TRACE_FILE set the API records spans around token lookups, reduction, JSON
+encoding, SQL statements and broadcasts, and rewrites the file every few seconds. Load it in
+chrome://tracing or https://ui.perfetto.dev. While tracing is off, `TRACER.span()` hands back a
+shared no-op span, so instrumented code pays one method call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from functools import lru_cache
+import json
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Any
+
+_WRITE_STATEMENT = re.compile(r"^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=128)
+def statement_name(sql: str) -> str:
+    """`INSERT encounter_snapshots` and the like: the verb and the table a write touches.
+
+    Reads only get their verb; their first FROM is often a subquery.
+    """
+    match = _WRITE_STATEMENT.match(sql)
+    if match is None:
+        words = sql.split(maxsplit=1)
+        return words[0].upper() if words else "sql"
+    return f"{match.group(1).split()[0].upper()} {match.group(2)}"
+
+
+def _track() -> tuple[int, str]:
+    """Spans of one asyncio task share a track, so awaits in other tasks do not interleave with them."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return id(task), f"task {task.get_name()}"
+    thread = threading.current_thread()
+    return thread.ident or 0, thread.name
+
+
+class _Span:
+    __slots__ = ("_tracer", "name", "category", "args", "_started_ns")
+
+    def __init__(self, tracer: Tracer, name: str, category: str, args: dict[str, Any] | None) -> None:
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self._started_ns = 0
+
+    def __enter__(self) -> _Span:
+        self._started_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._tracer.record(self.name, self.category, self._started_ns, time.perf_counter_ns(), self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Keeps the most recent `max_events` spans of the process in memory."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._events: deque[dict[str, Any]] = deque(maxlen=100_000)
+        self._tracks: dict[int, str] = {}
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+
+    def enable(self, max_events: int = 100_000) -> None:
+        if self._events.maxlen != max_events:
+            self._events = deque(self._events, maxlen=max(1, max_events))
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        self._events.clear()
+        self._tracks.clear()
+
+    def span(self, name: str, category: str = "app", args: dict[str, Any] | None = None) -> _Span | _NullSpan:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def sql(self, sql: str) -> _Span | _NullSpan:
+        """A span named after the statement, e.g. `INSERT encounter_snapshots`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, statement_name(sql), "sql", None)
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        started_ns: int,
+        ended_ns: int,
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        """Add one complete span; also used for spans whose name is only known at the end."""
+        track, track_name = _track()
+        self._tracks.setdefault(track, track_name)
+        event: dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (started_ns - self._origin_ns) / 1000,
+            "dur": (ended_ns - started_ns) / 1000,
+            "pid": self._pid,
+            "tid": track,
+        }
+        if args:
+            event["args"] = args
+        # deque.append is atomic, so worker threads can record without a lock.
+        self._events.append(event)
+
+    def events(self) -> list[dict[str, Any]]:
+        tracks = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": track, "args": {"name": name}}
+            for track, name in list(self._tracks.items())
+        ]
+        return [*tracks, *list(self._events)]
+
+    def export(self, path: str | Path) -> None:
+        """Write the buffered spans as a Chrome trace file; readers never see a half-written file."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".partial")
+        partial.write_text(json.dumps({"traceEvents": self.events(), "displayTimeUnit": "ms"}), encoding="utf-8")
+        os.replace(partial, target)
+
+
+TRACER = Tracer()
+
+
+async def export_periodically(path: str | Path, interval_s: float = 5.0) -> None:
+    """Background loop of the API: keep the trace file current while the server runs."""
+    while True:
+        await asyncio.sleep(interval_s)
+        await asyncio.to_thread(TRACER.export, path)
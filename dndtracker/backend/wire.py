@@ -0,0 +1,18 @@
+"""Websocket frame encoding; uses orjson when it is installed."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+
+def encode_message(message: dict[str, Any]) -> str:
+    """Encode one outbound message as a text frame payload."""
+    if orjson is not None:
+        return orjson.dumps(message).decode("utf-8")
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
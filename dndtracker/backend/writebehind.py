@@ -0,0 +1,226 @@
+"""Write-behind log that group-commits encounter writes for the async Postgres store."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import logging
+from typing import Any, Awaitable, Callable
+
+from .sql import Statement
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _PendingWrite:
+    encounter_id: str
+    version: int
+    statements: list[Statement]
+
+
+class WriteBehindLog:
+    """Buffers committed-in-memory writes and flushes them for all encounters in one transaction.
+
+    A flush starts `window_s` after the first buffered write, or as soon as `max_events` writes are
+    waiting, so the database sees one commit per window instead of one per click. Until a write is
+    durable its state stays pinned here and is the authoritative copy for reads and further writes.
+    Failed flushes keep the writes and retry after `retry_delay_s`. When the database rejects a write
+    outright (`is_permanent`), the flush is retried one encounter at a time and the writes of the
+    rejected encounter are dropped into `dead_letters`, so they cannot hold back everyone else.
+    At most `max_buffered` writes wait here; `wait_for_room` holds new writes back beyond that.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[Statement]], Awaitable[None]],
+        window_s: float = 0.05,
+        max_events: int = 500,
+        retry_delay_s: float = 1.0,
+        max_buffered: int = 10_000,
+        is_permanent: Callable[[Exception], bool] = lambda exc: False,
+        on_dropped: Callable[[str], None] | None = None,
+    ) -> None:
+        self._write = write
+        self.window_s = window_s
+        self.max_events = max(1, max_events)
+        self.retry_delay_s = retry_delay_s
+        self.max_buffered = max(self.max_events, max_buffered)
+        self._is_permanent = is_permanent
+        self._on_dropped = on_dropped
+        self._pending: list[_PendingWrite] = []
+        self.dead_letters: deque[_PendingWrite] = deque(maxlen=1000)
+        # Newest state and checkpoint version per encounter with writes that are not durable yet.
+        self._states: dict[str, tuple[dict[str, Any], int]] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._full: asyncio.Event | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._room: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def latest(self, encounter_id: str) -> tuple[dict[str, Any], int] | None:
+        return self._states.get(encounter_id)
+
+    def add(
+        self,
+        encounter_id: str,
+        state: dict[str, Any],
+        checkpoint_version: int,
+        statements: list[Statement],
+    ) -> None:
+        write = _PendingWrite(encounter_id=encounter_id, version=int(state["version"]), statements=statements)
+        self._pending.append(write)
+        self._states[encounter_id] = (state, checkpoint_version)
+        if self._wakeup is not None and self._full is not None:
+            self._wakeup.set()
+            if len(self._pending) >= self.max_events:
+                self._full.set()
+
+    async def wait_for_room(self) -> None:
+        """Wait until the buffer holds fewer than `max_buffered` writes; flushes inline when not started."""
+        while len(self._pending) >= self.max_buffered:
+            if self._room is None or self._wakeup is None or self._full is None:
+                await self.flush()
+                continue
+            self._room.clear()
+            self._wakeup.set()
+            self._full.set()
+            await self._room.wait()
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._room = asyncio.Event()
+        self._room.set()
+        if self._pending:
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background flusher and make everything buffered so far durable."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    async def flush(self) -> None:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            try:
+                await self._flush_batch()
+            finally:
+                self._signal_room()
+
+    async def _flush_batch(self) -> None:
+        batch, self._pending = self._pending, []
+        if self._wakeup is not None and self._full is not None:
+            self._wakeup.clear()
+            self._full.clear()
+        if not batch:
+            return
+        try:
+            await self._write([statement for write in batch for statement in write.statements])
+        except Exception as exc:
+            if not self._is_permanent(exc):
+                self._requeue(batch)
+                raise
+            durable = await self._flush_per_encounter(batch)
+        except BaseException:
+            self._requeue(batch)
+            raise
+        else:
+            durable = batch
+        self._unpin(durable)
+
+    async def _flush_per_encounter(self, batch: list[_PendingWrite]) -> list[_PendingWrite]:
+        """Retry a rejected group commit one encounter at a time; returns the writes that became durable."""
+        by_encounter: dict[str, list[_PendingWrite]] = {}
+        for write in batch:
+            by_encounter.setdefault(write.encounter_id, []).append(write)
+        durable: list[_PendingWrite] = []
+        retry: list[_PendingWrite] = []
+        failure: Exception | None = None
+        remaining = list(by_encounter.values())
+        while remaining:
+            writes = remaining.pop(0)
+            try:
+                await self._write([statement for write in writes for statement in write.statements])
+            except Exception as exc:
+                if self._is_permanent(exc):
+                    self._drop(writes, exc)
+                else:
+                    retry.extend(writes)
+                    failure = exc
+            except BaseException:
+                self._unpin(durable)
+                self._requeue([*retry, *writes, *(write for rest in remaining for write in rest)])
+                raise
+            else:
+                durable.extend(writes)
+        if failure is not None:
+            self._unpin(durable)
+            self._requeue(retry)
+            raise failure
+        return durable
+
+    def _drop(self, writes: list[_PendingWrite], exc: Exception) -> None:
+        """Give up on an encounter's writes; later buffered writes build on them and go as well."""
+        encounter_id = writes[0].encounter_id
+        later = [write for write in self._pending if write.encounter_id == encounter_id]
+        self._pending = [write for write in self._pending if write.encounter_id != encounter_id]
+        dropped = [*writes, *later]
+        self.dead_letters.extend(dropped)
+        self._states.pop(encounter_id, None)
+        logger.error(
+            "write-behind dropped versions %d-%d of encounter %s: %s",
+            dropped[0].version,
+            dropped[-1].version,
+            encounter_id,
+            exc,
+        )
+        if self._on_dropped is not None:
+            self._on_dropped(encounter_id)
+
+    def _requeue(self, writes: list[_PendingWrite]) -> None:
+        # Keep order: these versions precede anything buffered while the write was in flight.
+        self._pending[:0] = writes
+
+    def _unpin(self, durable: list[_PendingWrite]) -> None:
+        flushed: dict[str, int] = {}
+        for write in durable:
+            flushed[write.encounter_id] = write.version
+        for encounter_id, version in flushed.items():
+            current = self._states.get(encounter_id)
+            if current is not None and int(current[0]["version"]) <= version:
+                del self._states[encounter_id]
+
+    def _signal_room(self) -> None:
+        if self._room is not None and len(self._pending) < self.max_buffered:
+            self._room.set()
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None and self._full is not None
+        while True:
+            await self._wakeup.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.window_s)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.warning("write-behind flush of %d writes failed; retrying", len(self._pending), exc_info=True)
+                await asyncio.sleep(self.retry_delay_s)
+                self._wakeup.set()
@@ -0,0 +1,29 @@
+"""Reproducible micro-benchmarks for the reducer, the stores and the API fan-out.
+
+Run them with `python -m dndtracker.benchmarks run --output results.json` and check for
+regressions with `python -m dndtracker.benchmarks compare results.json`, which compares against
+`baseline.json` next to this file. Timings only compare on the machine and interpreter that
+produced the baseline; refresh it with `run --output dndtracker/benchmarks/baseline.json`.
+"""
+
+from __future__ import annotations
+
+from .harness import Benchmark, BenchmarkResult, Comparison, compare, measure, read_results, write_results
+
+
+def all_benchmarks() -> list[Benchmark]:
+    from . import api, engine, stores
+
+    return [*engine.benchmarks(), *stores.benchmarks(), *api.benchmarks()]
+
+
+__all__ = [
+    "all_benchmarks",
+    "Benchmark",
+    "BenchmarkResult",
+    "compare",
+    "Comparison",
+    "measure",
+    "read_results",
+    "write_results",
+]
@@ -0,0 +1,73 @@
+"""Command line entry point: `run` the benchmarks, `compare` a results file against the baseline."""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+from . import all_benchmarks
+from .harness import compare, measure, read_results, write_results
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+
+def _run(args: argparse.Namespace) -> int:
+    selected = [benchmark for benchmark in all_benchmarks() if args.filter in benchmark.name]
+    if not selected:
+        print(f"no benchmark matches {args.filter!r}", file=sys.stderr)
+        return 2
+    scale = 0.1 if args.quick else 1.0
+    results = []
+    for benchmark in selected:
+        result = measure(benchmark, samples=args.samples, scale=scale)
+        results.append(result)
+        print(f"{result.name:<45} {result.median_us:>12.2f} us  (min {result.min_us:.2f}, max {result.max_us:.2f})")
+    if args.output:
+        write_results(args.output, results)
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    comparisons = compare(read_results(args.baseline), read_results(args.results))
+    regressed = 0
+    for comparison in comparisons:
+        status = comparison.status(args.threshold)
+        regressed += status == "regressed"
+        ratio = comparison.ratio
+        change = "" if ratio is None else f"{(ratio - 1) * 100:+.1f}%"
+        print(f"{comparison.name:<45} {change:>9}  {status}")
+    if regressed:
+        print(f"{regressed} benchmark(s) slower than the baseline by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m dndtracker.benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and print the median time per call")
+    run.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this text")
+    run.add_argument("--samples", type=int, default=7, help="timed samples per benchmark")
+    run.add_argument("--quick", action="store_true", help="a tenth of the calls per sample, for smoke runs")
+    run.add_argument("--output", help="write the results as JSON to this file")
+    run.set_defaults(handler=_run)
+
+    check = commands.add_parser("compare", help="flag benchmarks that got slower than the baseline")
+    check.add_argument("results", help="results file written by `run --output`")
+    check.add_argument("--baseline", default=str(BASELINE_PATH))
+    check.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="relative slowdown of the median that counts as a regression",
+    )
+    check.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""End-to-end latency from an HTTP action to its state patch arriving on every connected socket."""
+
+from __future__ import annotations
+
+from contextlib import ExitStack, contextmanager
+from importlib.util import find_spec
+from typing import Any, Callable, Iterator
+
+from .harness import Benchmark
+
+SOCKET_COUNTS = (1, 8, 32)
+
+
+@contextmanager
+def _fan_out(sockets: int) -> Iterator[Callable[[], Any]]:
+    from fastapi.testclient import TestClient
+
+    from ..backend.api import create_app
+    from ..backend.store import InMemoryEncounterStore
+
+    app = create_app(store=InMemoryEncounterStore(server_salt="bench-salt"))
+    with ExitStack() as stack:
+        client = stack.enter_context(TestClient(app))
+        created = client.post("/api/encounters", json={"name": "Benchmark"}).json()
+        encounter_id = created["encounter_id"]
+        url = f"/ws/encounters/{encounter_id}?token={created['player_token']}"
+        connections = [stack.enter_context(client.websocket_connect(url)) for _ in range(sockets)]
+        for connection in connections:
+            connection.receive_json()
+
+        action_url = f"/api/encounters/{encounter_id}/actions"
+        body = {"token": created["host_token"], "action": {"type": "NEXT_TURN"}}
+
+        def operation() -> None:
+            response = client.post(action_url, json=body)
+            response.raise_for_status()
+            for connection in connections:
+                connection.receive_json()
+
+        yield operation
+
+
+def _fan_out_benchmark(sockets: int) -> Benchmark:
+    return Benchmark(name=f"api.broadcast.sockets_{sockets}", setup=lambda: _fan_out(sockets), number=20)
+
+
+def benchmarks() -> list[Benchmark]:
+    # The API needs the optional web stack (backend/requirements.txt); without it this suite is empty.
+    if find_spec("fastapi") is None or find_spec("httpx") is None:
+        return []
+    return [_fan_out_benchmark(sockets) for sockets in SOCKET_COUNTS]
@@ -0,0 +1,121 @@
+"""Reducer benchmarks: one per host action type, plus event reduction at growing log sizes."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from ..backend.engine import apply_host_action
+from ..backend.state import build_initial_state
+from ..backend.events import _next_state_with_event
+from .harness import Benchmark
+
+PLAYERS = 8
+EFFECTS = 64
+# Actions per cycle; the reducer reuses its indexes while states chain, so a cycle only rebuilds them once.
+CYCLE = 64
+LOG_SIZES = (0, 100, 1_000, 10_000)
+
+
+def encounter_state(encounter_id: str = "bench-encounter") -> dict[str, Any]:
+    """A running encounter: initiative set for every player, each effect held by one concentrating actor."""
+    state = build_initial_state(encounter_id=encounter_id, name="Benchmark")
+    players = [
+        {"id": f"player-{index}", "name": f"Player {index}", "initiative": 20 - index} for index in range(PLAYERS)
+    ]
+    state.update(
+        status="running",
+        players=players,
+        turnOrder=[player["id"] for player in players],
+        effects=[
+            {
+                "id": f"effect-{index}",
+                "name": f"Effect {index}",
+                "roundsRemaining": 3 + index % 5,
+                "requiresConcentration": True,
+                "sourceActorId": f"actor-{index}",
+            }
+            for index in range(EFFECTS)
+        ],
+        concentration={f"actor-{index}": {"checkNeeded": False} for index in range(EFFECTS)},
+    )
+    return state
+
+
+ACTION_CYCLES: dict[str, Callable[[int], dict[str, Any]]] = {
+    "next_turn": lambda index: {"type": "NEXT_TURN"},
+    "add_effect": lambda index: {
+        "type": "ADD_EFFECT",
+        "effect": {
+            "id": f"added-{index}",
+            "roundsRemaining": 3,
+            "requiresConcentration": True,
+            "sourceActorId": "actor-0",
+        },
+    },
+    "remove_effect": lambda index: {"type": "REMOVE_EFFECT", "effectId": f"effect-{index % EFFECTS}"},
+    "apply_damage": lambda index: {
+        "type": "APPLY_DAMAGE",
+        "actorId": f"actor-{index % EFFECTS}",
+        "damageTaken": 10 + index,
+    },
+    "resolve_concentration_save": lambda index: {
+        "type": "RESOLVE_CONCENTRATION_SAVE",
+        "actorId": f"actor-{index % EFFECTS}",
+        "success": False,
+    },
+    "apply_save_result": lambda index: {
+        "type": "APPLY_SAVE_RESULT",
+        "effectId": f"effect-{index % EFFECTS}",
+        "success": index % 2 == 0,
+    },
+    "set_initiative": lambda index: {
+        "type": "SET_INITIATIVE",
+        "playerId": f"player-{index % PLAYERS}",
+        "initiative": 1 + (index * 7) % 20,
+    },
+}
+
+
+def _action_benchmark(name: str, make_action: Callable[[int], dict[str, Any]]) -> Benchmark:
+    @contextmanager
+    def setup() -> Iterator[Callable[[], Any]]:
+        base = encounter_state()
+        actions = [make_action(index) for index in range(CYCLE)]
+        state = base
+        position = 0
+
+        def operation() -> None:
+            # Each action applies to the previous result, as in the store; after a cycle the state starts over.
+            nonlocal state, position
+            state = apply_host_action(state=state, action=actions[position]).state
+            position += 1
+            if position == CYCLE:
+                state, position = base, 0
+
+        yield operation
+
+    return Benchmark(name=f"engine.action.{name}", setup=setup, number=2000)
+
+
+def _log_benchmark(log_size: int) -> Benchmark:
+    @contextmanager
+    def setup() -> Iterator[Callable[[], Any]]:
+        state = encounter_state()
+        state["log"] = [
+            {"kind": "chat", "role": "PLAYER", "text": "filler", "version": version} for version in range(log_size)
+        ]
+        state["version"] = log_size + 1
+        event = {"kind": "action", "role": "HOST", "action": {"type": "NEXT_TURN"}, "at": "2024-01-01T00:00:00+00:00"}
+
+        # Unbounded history, so the cost of carrying the log along shows up.
+        yield lambda: _next_state_with_event(state=state, event=event, history_limit=None)
+
+    return Benchmark(name=f"engine.event.log_{log_size}", setup=setup, number=500)
+
+
+def benchmarks() -> list[Benchmark]:
+    return [
+        *(_action_benchmark(name, make_action) for name, make_action in ACTION_CYCLES.items()),
+        *(_log_benchmark(log_size) for log_size in LOG_SIZES),
+    ]
@@ -0,0 +1,144 @@
+"""Timing harness, result files and regression comparison for the benchmark suites."""
+
+from __future__ import annotations
+
+from contextlib import AbstractContextManager
+from dataclasses import asdict, dataclass
+import gc
+import json
+from pathlib import Path
+import platform
+import statistics
+import time
+from typing import Any, Callable, Iterable
+
+RESULTS_FORMAT = 1
+
+# A benchmark's setup yields the operation to time and tears its fixtures down afterwards.
+Setup = Callable[[], AbstractContextManager[Callable[[], Any]]]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """One timed operation; `number` calls make up a sample, the median sample is what gets compared."""
+
+    name: str
+    setup: Setup
+    number: int = 1000
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    samples: int
+    number: int
+    median_us: float
+    min_us: float
+    max_us: float
+
+    @property
+    def ops_per_s(self) -> float:
+        return 1_000_000 / self.median_us if self.median_us > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class Comparison:
+    name: str
+    baseline_us: float | None
+    current_us: float | None
+
+    @property
+    def ratio(self) -> float | None:
+        if self.baseline_us is None or self.current_us is None or self.baseline_us <= 0:
+            return None
+        return self.current_us / self.baseline_us
+
+    def status(self, threshold: float) -> str:
+        """`regressed`, `improved`, `ok`, or `new`/`missing` when only one side has the benchmark."""
+        if self.baseline_us is None:
+            return "new"
+        if self.current_us is None:
+            return "missing"
+        ratio = self.ratio
+        if ratio is not None and ratio > 1 + threshold:
+            return "regressed"
+        if ratio is not None and ratio < 1 / (1 + threshold):
+            return "improved"
+        return "ok"
+
+
+def measure(benchmark: Benchmark, samples: int = 7, scale: float = 1.0) -> BenchmarkResult:
+    """Time `benchmark` like `timeit`: fixed call counts, garbage collection paused, a warm-up sample discarded.
+
+    `scale` shrinks or grows the calls per sample, e.g. for a quick smoke run.
+    """
+    number = max(1, round(benchmark.number * scale))
+    per_call_us: list[float] = []
+    with benchmark.setup() as operation:
+        gc_was_enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(samples + 1):
+                start = time.perf_counter_ns()
+                for _ in range(number):
+                    operation()
+                per_call_us.append((time.perf_counter_ns() - start) / number / 1000)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    timed = per_call_us[1:]
+    return BenchmarkResult(
+        name=benchmark.name,
+        samples=len(timed),
+        number=number,
+        median_us=statistics.median(timed),
+        min_us=min(timed),
+        max_us=max(timed),
+    )
+
+
+def environment() -> dict[str, str]:
+    """Where the numbers came from; results are only comparable on the same machine and interpreter."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def _rounded(values: dict[str, Any]) -> dict[str, Any]:
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in values.items()}
+
+
+def write_results(path: str | Path, results: Iterable[BenchmarkResult]) -> None:
+    document = {
+        "format": RESULTS_FORMAT,
+        "environment": environment(),
+        "results": {result.name: _rounded(asdict(result)) for result in results},
+    }
+    Path(path).write_text(json.dumps(document, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def read_results(path: str | Path) -> dict[str, BenchmarkResult]:
+    document = json.loads(Path(path).read_text(encoding="utf-8"))
+    if document.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path}: unsupported results format {document.get('format')!r}")
+    return {name: BenchmarkResult(**values) for name, values in document["results"].items()}
+
+
+def compare(
+    baseline: dict[str, BenchmarkResult],
+    current: dict[str, BenchmarkResult],
+) -> list[Comparison]:
+    """Pair up results by name, baseline order first, then benchmarks only the current run has."""
+    names = [*baseline, *(name for name in current if name not in baseline)]
+    return [
+        Comparison(
+            name=name,
+            baseline_us=baseline[name].median_us if name in baseline else None,
+            current_us=current[name].median_us if name in current else None,
+        )
+        for name in names
+    ]
@@ -0,0 +1,59 @@
+"""Store write benchmarks: one host action per call, in memory and on an embedded SQLite file."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+import tempfile
+from typing import Any, Callable, Iterator
+
+from ..backend.sqlite_store import SqliteEncounterStore
+from ..backend.store import EncounterStore, InMemoryEncounterStore
+from .harness import Benchmark
+
+SERVER_SALT = "bench-salt"
+HOST_TOKEN = "bench-host"
+PLAYER_TOKEN = "bench-player"
+PLAYERS = 8
+
+
+def _writer(store: EncounterStore) -> Callable[[], Any]:
+    """Prepare an encounter with a full turn order and return an operation that advances it one turn."""
+    created = store.create_encounter(name="Benchmark", host_token=HOST_TOKEN, player_token=PLAYER_TOKEN)
+    encounter_id = created.encounter_id
+    state: dict[str, Any] | None = None
+    for index in range(PLAYERS):
+        state = store.register_player(encounter_id=encounter_id, raw_token=PLAYER_TOKEN, name=f"Player {index}")
+    if state is None:
+        raise RuntimeError("the store refused to register benchmark players")
+    for index, player in enumerate(state["players"]):
+        store.apply_action(
+            encounter_id=encounter_id,
+            raw_token=HOST_TOKEN,
+            action={"type": "SET_INITIATIVE", "playerId": player["id"], "initiative": 20 - index},
+        )
+    action = {"type": "NEXT_TURN"}
+    return lambda: store.apply_action(encounter_id=encounter_id, raw_token=HOST_TOKEN, action=action)
+
+
+@contextmanager
+def _in_memory() -> Iterator[Callable[[], Any]]:
+    yield _writer(InMemoryEncounterStore(server_salt=SERVER_SALT))
+
+
+@contextmanager
+def _sqlite() -> Iterator[Callable[[], Any]]:
+    with tempfile.TemporaryDirectory(prefix="dndtracker-bench-") as directory:
+        store = SqliteEncounterStore(database_path=str(Path(directory) / "bench.db"), server_salt=SERVER_SALT)
+        store.open()
+        try:
+            yield _writer(store)
+        finally:
+            store.close()
+
+
+def benchmarks() -> list[Benchmark]:
+    return [
+        Benchmark(name="store.write.memory", setup=_in_memory, number=1000),
+        Benchmark(name="store.write.sqlite", setup=_sqlite, number=200),
+    ]
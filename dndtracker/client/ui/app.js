@@ -4,7 +4,17 @@
   const serverBase = params.get("server") || "http://127.0.0.1:8000";
   let encounterId = params.get("encounter_id") || "";
   let token = params.get("token") || "";
+  // Session ticket from the last state load; stands in for the token until shortly before it expires.
+  let ticket = null;
+  let ticketExpiresAt = 0;
   let ws = null;
+  let reconnectTimer = null;
+  let reconnectDelayMs = 0;
+  // Set while a state.resync is unanswered, so a burst of out-of-order patches asks only once.
+  let resyncPending = false;
+  let currentState = null;
+  let nextRequestId = 1;
+  const pendingAcks = new Map();
 
   const el = (id) => document.getElementById(id);
 
@@ -27,6 +37,7 @@
   }
 
   function setState(state) {
+    currentState = state;
     el("state").textContent = JSON.stringify(state, null, 2);
     el("encounter").textContent = state.id;
     renderPlayers(state);
@@ -92,6 +103,43 @@
     }
   }
 
+  function pointerTokens(path) {
+    return path
+      .split("/")
+      .slice(1)
+      .map((part) => part.replace(/~1/g, "/").replace(/~0/g, "~"));
+  }
+
+  function applyPatch(state, ops) {
+    const next = structuredClone(state);
+    for (const op of ops) {
+      const tokens = pointerTokens(op.path);
+      const last = tokens.pop();
+      let parent = next;
+      for (const part of tokens) {
+        parent = Array.isArray(parent) ? parent[Number(part)] : parent[part];
+      }
+      if (Array.isArray(parent)) {
+        if (op.op === "add") {
+          if (last === "-") {
+            parent.push(op.value);
+          } else {
+            parent.splice(Number(last), 0, op.value);
+          }
+        } else if (op.op === "remove") {
+          parent.splice(Number(last), 1);
+        } else {
+          parent[Number(last)] = op.value;
+        }
+      } else if (op.op === "remove") {
+        delete parent[last];
+      } else {
+        parent[last] = op.value;
+      }
+    }
+    return next;
+  }
+
   function wsUrl(id, tok) {
     const base = new URL(serverBase);
     const proto = base.protocol === "https:" ? "wss:" : "ws:";
@@ -101,7 +149,9 @@
   async function requestJson(url, options) {
     const response = await fetch(url, options);
     if (!response.ok) {
-      throw new Error(`${response.status} ${response.statusText}`);
+      const error = new Error(`${response.status} ${response.statusText}`);
+      error.status = response.status;
+      throw error;
     }
     return response.json();
   }
@@ -110,18 +160,114 @@
     const data = await requestJson(
       `${serverBase}/api/encounters/${id}?token=${encodeURIComponent(tok)}`,
     );
+    ticket = data.ticket || null;
+    ticketExpiresAt = data.ticket_expires_at || 0;
     setState(data.state);
   }
 
+  function credential() {
+    return ticket && Date.now() / 1000 < ticketExpiresAt - 10 ? ticket : token;
+  }
+
+  // REST fallback for commands. A ticket can be refused by a worker or restarted server that did not issue it;
+  // it is then dropped and the command sent once more with the raw token.
+  async function postCommand(path, body) {
+    const send = (tok) =>
+      requestJson(`${serverBase}/api/encounters/${encounterId}/${path}`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ ...body, token: tok }),
+      });
+    const tok = credential();
+    try {
+      return await send(tok);
+    } catch (err) {
+      if (tok === token || (err.status !== 403 && err.status !== 404)) {
+        throw err;
+      }
+      ticket = null;
+      ticketExpiresAt = 0;
+      return send(token);
+    }
+  }
+
+  function rejectPendingAcks(reason) {
+    for (const pending of pendingAcks.values()) {
+      pending.reject(new Error(reason));
+    }
+    pendingAcks.clear();
+  }
+
+  // Sends a command over the open socket; resolves on its ack. Returns null when REST has to be used.
+  function sendCommand(message) {
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+      return null;
+    }
+    const requestId = String(nextRequestId++);
+    return new Promise((resolve, reject) => {
+      pendingAcks.set(requestId, { resolve, reject });
+      ws.send(JSON.stringify({ ...message, requestId }));
+    });
+  }
+
   function connectWs(id, tok) {
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
     if (ws) {
-      ws.close();
+      const previous = ws;
+      ws = null;
+      previous.close();
+      rejectPendingAcks("WebSocket geschlossen");
     }
-    ws = new WebSocket(wsUrl(id, tok));
-    ws.onmessage = (event) => {
+    resyncPending = false;
+    const socket = new WebSocket(wsUrl(id, tok));
+    ws = socket;
+    socket.onopen = () => {
+      reconnectDelayMs = 0;
+    };
+    socket.onclose = (event) => {
+      if (ws !== socket) {
+        return;
+      }
+      ws = null;
+      rejectPendingAcks("WebSocket geschlossen");
+      // 1008: the token is no longer valid, so retrying cannot help.
+      if (event.code === 1008) {
+        setError("Verbindung abgelehnt: Token ungueltig.");
+        return;
+      }
+      // The server sends a full state right after connecting, which is the resync after e.g. 1013 (too slow).
+      reconnectDelayMs = Math.min(reconnectDelayMs ? reconnectDelayMs * 2 : 500, 15000);
+      const delay = reconnectDelayMs / 2 + Math.random() * (reconnectDelayMs / 2);
+      reconnectTimer = setTimeout(() => connectWs(id, tok), delay);
+    };
+    socket.onmessage = (event) => {
       const payload = JSON.parse(event.data);
-      if (payload.type === "state.full") {
+      if (payload.type === "ack") {
+        const pending = pendingAcks.get(payload.requestId);
+        if (pending) {
+          pendingAcks.delete(payload.requestId);
+          if (payload.ok) {
+            pending.resolve(payload);
+          } else {
+            pending.reject(new Error(`${payload.status} ${payload.error}`));
+          }
+        }
+      } else if (payload.type === "state.full") {
+        resyncPending = false;
         setState(payload.state);
+      } else if (payload.type === "state.patch") {
+        if (currentState && payload.version <= currentState.version) {
+          return;
+        }
+        if (!currentState || currentState.version !== payload.baseVersion) {
+          if (!resyncPending) {
+            resyncPending = true;
+            socket.send(JSON.stringify({ type: "state.resync" }));
+          }
+          return;
+        }
+        setState(applyPatch(currentState, payload.ops));
       }
     };
   }
@@ -155,38 +301,32 @@
   }
 
   async function postAction(action) {
-    const data = await requestJson(
-      `${serverBase}/api/encounters/${encounterId}/actions`,
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ token, action }),
-      },
-    );
+    const sent = sendCommand({ type: "action", action });
+    if (sent) {
+      await sent;
+      return;
+    }
+    const data = await postCommand("actions", { action });
     setState(data.state);
   }
 
   async function postRoll(kind) {
-    const data = await requestJson(
-      `${serverBase}/api/encounters/${encounterId}/rolls`,
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ token, roll: { kind } }),
-      },
-    );
+    const sent = sendCommand({ type: "roll.submit", roll: { kind } });
+    if (sent) {
+      await sent;
+      return;
+    }
+    const data = await postCommand("rolls", { roll: { kind } });
     setState(data.state);
   }
 
   async function postChat(message) {
-    const data = await requestJson(
-      `${serverBase}/api/encounters/${encounterId}/chat`,
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ token, message }),
-      },
-    );
+    const sent = sendCommand({ type: "chat.send", message });
+    if (sent) {
+      await sent;
+      return;
+    }
+    const data = await postCommand("chat", { message });
     setState(data.state);
   }
 
@@ -196,14 +336,12 @@
       setError("Spielername benoetigt.");
       return;
     }
-    const data = await requestJson(
-      `${serverBase}/api/encounters/${encounterId}/players`,
-      {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ token, name }),
-      },
-    );
+    const sent = sendCommand({ type: "player.register", name });
+    if (sent) {
+      await sent;
+      return;
+    }
+    const data = await postCommand("players", { name });
     setState(data.state);
   }
 
@@ -0,0 +1,470 @@
+"""Load generator: many encounters, many player sockets, a steady mix of actions, rolls and chat.
+
+Point it at a running server, or let it start one with `--start-server`:
+
+    python -m dndtracker.loadgen --encounters 50 --players 5 --rate 200 --duration 60 --start-server
+
+Operations are issued open-loop at the target rate, so a slow server shows up as latency rather
+than as a lower request rate. For every operation the tool records when each player socket of
+that encounter first held the resulting version; the gap is the action-to-broadcast latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+import json
+import math
+import os
+from pathlib import Path
+import random
+import subprocess
+import sys
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_MIX = "next_turn=4,damage=2,roll=3,chat=3"
+OPERATIONS = ("next_turn", "damage", "roll", "chat")
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """`next_turn=4,chat=1` -> relative weights; unknown operations and negative weights are rejected."""
+    weights: dict[str, float] = {}
+    for part in filter(None, (item.strip() for item in text.split(","))):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+        weights[name] = float(weight) if weight else 1.0
+        if weights[name] < 0:
+            raise ValueError(f"negative weight for {name!r}")
+    if not any(weights.values()):
+        raise ValueError("the mix needs at least one operation with a positive weight")
+    return weights
+
+
+def percentile(values: list[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of `values`, `None` when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(fraction * len(ordered))))
+    return ordered[rank - 1]
+
+
+def rss_bytes(pid: int) -> int | None:
+    """Resident set size of a process from /proc; `None` where that is not available."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text(encoding="ascii")
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return None
+
+
+@dataclass
+class Listener:
+    """One player socket: the versions it received, in order, and when they arrived."""
+
+    versions: list[int] = field(default_factory=list)
+    arrivals: list[float] = field(default_factory=list)
+
+    def record(self, message: dict[str, Any], at: float) -> None:
+        if message.get("type") == "state.patch":
+            version = message.get("version")
+        elif message.get("type") == "state.full":
+            version = message.get("state", {}).get("version")
+        else:
+            return
+        if isinstance(version, int) and (not self.versions or version > self.versions[-1]):
+            # Patches arrive in order and a coalesced full state only skips ahead, so this stays sorted.
+            self.versions.append(version)
+            self.arrivals.append(at)
+
+    def first_holding(self, version: int) -> float | None:
+        """When this socket first held `version` or a later one."""
+        position = bisect_left(self.versions, version)
+        return self.arrivals[position] if position < len(self.arrivals) else None
+
+
+@dataclass
+class Table:
+    encounter_id: str
+    host_token: str
+    player_token: str
+    player_ids: list[str]
+    listeners: list[Listener] = field(default_factory=list)
+
+
+@dataclass
+class Sample:
+    operation: str
+    table: Table
+    started: float
+    responded: float
+    version: int
+
+
+@dataclass
+class LoadReport:
+    encounters: int
+    sockets_per_encounter: int
+    duration_s: float
+    target_rate: float
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    deliveries: int = 0
+    missed: int = 0
+    broadcast_ms: dict[str, dict[str, float | None]] = field(default_factory=dict)
+    response_ms: dict[str, float | None] = field(default_factory=dict)
+    server_rss_mib: dict[str, float | None] = field(default_factory=dict)
+
+    def lines(self) -> list[str]:
+        def ms(value: float | None) -> str:
+            return "-" if value is None else f"{value:.1f}"
+
+        lines = [
+            f"{self.encounters} encounters x {self.sockets_per_encounter} sockets, "
+            f"{self.duration_s:.0f} s at {self.target_rate:g} ops/s target",
+            f"operations  {self.completed} completed ({self.completed / self.duration_s:.1f}/s), "
+            f"{self.failed} failed, {self.skipped} skipped at the in-flight limit",
+            f"broadcasts  {self.deliveries} delivered ({self.deliveries / self.duration_s:.1f}/s), "
+            f"{self.missed} missed",
+            f"response ms  p50 {ms(self.response_ms.get('p50'))}  p99 {ms(self.response_ms.get('p99'))}",
+        ]
+        for name, stats in self.broadcast_ms.items():
+            lines.append(
+                f"broadcast ms {name:<10} p50 {ms(stats['p50'])}  p99 {ms(stats['p99'])}  max {ms(stats['max'])}"
+            )
+        if self.server_rss_mib:
+            lines.append(
+                "server RSS MiB  "
+                + "  ".join(f"{key} {ms(value)}" for key, value in self.server_rss_mib.items())
+            )
+        return lines
+
+
+def summarize(samples: list[Sample], report: LoadReport) -> None:
+    """Fill in the latency figures: per operation, every socket of its encounter counts once."""
+    by_operation: dict[str, list[float]] = {}
+    for sample in samples:
+        for listener in sample.table.listeners:
+            arrived = listener.first_holding(sample.version)
+            if arrived is None:
+                report.missed += 1
+                continue
+            report.deliveries += 1
+            latency_ms = max(0.0, arrived - sample.started) * 1000
+            by_operation.setdefault("all", []).append(latency_ms)
+            by_operation.setdefault(sample.operation, []).append(latency_ms)
+    report.broadcast_ms = {
+        name: {
+            "p50": percentile(values, 0.50),
+            "p99": percentile(values, 0.99),
+            "max": max(values),
+        }
+        for name, values in sorted(by_operation.items(), key=lambda item: item[0] != "all")
+    }
+    responses = [(sample.responded - sample.started) * 1000 for sample in samples]
+    report.response_ms = {"p50": percentile(responses, 0.50), "p99": percentile(responses, 0.99)}
+
+
+class LoadGenerator:
+    """Sets up the encounters, drives the operation mix and collects what the sockets saw."""
+
+    def __init__(
+        self,
+        server: str,
+        encounters: int,
+        players: int,
+        rate: float,
+        duration_s: float,
+        mix: dict[str, float],
+        max_in_flight: int = 256,
+        settle_s: float = 2.0,
+        seed: int = 1,
+    ) -> None:
+        self.server = server.rstrip("/")
+        self.encounters = encounters
+        self.players = players
+        self.rate = rate
+        self.duration_s = duration_s
+        self.mix = mix
+        self.max_in_flight = max_in_flight
+        self.settle_s = settle_s
+        self._random = random.Random(seed)
+        self._tables: list[Table] = []
+        self._samples: list[Sample] = []
+        self._in_flight = 0
+
+    @property
+    def _ws_base(self) -> str:
+        parts = urlsplit(self.server)
+        scheme = "wss" if parts.scheme == "https" else "ws"
+        return f"{scheme}://{parts.netloc}"
+
+    async def run(self, server_pid: int | None = None) -> LoadReport:
+        import httpx
+
+        report = LoadReport(
+            encounters=self.encounters,
+            sockets_per_encounter=self.players,
+            duration_s=self.duration_s,
+            target_rate=self.rate,
+        )
+        limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+        async with httpx.AsyncClient(base_url=self.server, limits=limits, timeout=30.0) as client:
+            setup_slots = asyncio.Semaphore(16)
+
+            async def create_table() -> Table:
+                async with setup_slots:
+                    return await self._create_table(client)
+
+            self._tables = list(await asyncio.gather(*(create_table() for _ in range(self.encounters))))
+            background: list[asyncio.Task[None]] = []
+            ready: list[asyncio.Future[None]] = []
+            loop = asyncio.get_running_loop()
+            rss_samples: list[int] = []
+            try:
+                for table in self._tables:
+                    for _ in range(self.players):
+                        listener = Listener()
+                        table.listeners.append(listener)
+                        connected = loop.create_future()
+                        ready.append(connected)
+                        background.append(asyncio.create_task(self._listen(table, listener, connected)))
+                await asyncio.gather(*ready)
+                if server_pid:
+                    background.append(asyncio.create_task(self._sample_rss(server_pid, rss_samples)))
+                await self._drive(client, report)
+                # Give the last broadcasts time to land before the sockets close.
+                await asyncio.sleep(self.settle_s)
+            finally:
+                for task in background:
+                    task.cancel()
+                await asyncio.gather(*background, return_exceptions=True)
+
+        summarize(self._samples, report)
+        if rss_samples:
+            mib = 1024 * 1024
+            report.server_rss_mib = {
+                "start": rss_samples[0] / mib,
+                "peak": max(rss_samples) / mib,
+                "end": rss_samples[-1] / mib,
+            }
+        return report
+
+    async def _create_table(self, client: Any) -> Table:
+        response = await client.post("/api/encounters", json={"name": "Load test"})
+        response.raise_for_status()
+        created = response.json()
+        encounter_id = created["encounter_id"]
+        host_token = created["host_token"]
+        player_token = created["player_token"]
+
+        state: dict[str, Any] = {}
+        for index in range(self.players):
+            response = await client.post(
+                f"/api/encounters/{encounter_id}/players",
+                json={"token": player_token, "name": f"Player {index + 1}"},
+            )
+            response.raise_for_status()
+            state = response.json()["state"]
+        player_ids = [player["id"] for player in state.get("players", [])]
+
+        # Initiative for everyone and a concentration effect per player, so turns cycle and damage triggers checks.
+        actions: list[dict[str, Any]] = []
+        for index, player_id in enumerate(player_ids):
+            actions.append({"type": "SET_INITIATIVE", "playerId": player_id, "initiative": 20 - index % 20})
+            actions.append(
+                {
+                    "type": "ADD_EFFECT",
+                    "effect": {
+                        "id": f"bless-{player_id}",
+                        "name": "Bless",
+                        "roundsRemaining": 10,
+                        "requiresConcentration": True,
+                        "sourceActorId": player_id,
+                    },
+                }
+            )
+        if actions:
+            response = await client.post(
+                f"/api/encounters/{encounter_id}/actions:batch",
+                json={"token": host_token, "actions": actions},
+            )
+            response.raise_for_status()
+        return Table(encounter_id=encounter_id, host_token=host_token, player_token=player_token, player_ids=player_ids)
+
+    async def _listen(self, table: Table, listener: Listener, connected: asyncio.Future[None]) -> None:
+        import websockets
+
+        url = f"{self._ws_base}/ws/encounters/{table.encounter_id}?token={table.player_token}"
+        try:
+            async with websockets.connect(url, max_size=None) as websocket:
+                async for raw in websocket:
+                    listener.record(json.loads(raw), time.perf_counter())
+                    if not connected.done():
+                        connected.set_result(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if not connected.done():
+                connected.set_exception(exc)
+            return
+        if not connected.done():
+            connected.set_exception(ConnectionError(f"socket closed before the initial state: {url}"))
+
+    async def _drive(self, client: Any, report: LoadReport) -> None:
+        names = [name for name, weight in self.mix.items() if weight > 0]
+        weights = [self.mix[name] for name in names]
+        interval = 1.0 / self.rate
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        pending: set[asyncio.Task[None]] = set()
+        for tick in range(int(self.duration_s * self.rate)):
+            delay = start + tick * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self._in_flight >= self.max_in_flight:
+                report.skipped += 1
+                continue
+            table = self._tables[tick % len(self._tables)]
+            operation = self._random.choices(names, weights)[0]
+            self._in_flight += 1
+            task = asyncio.create_task(self._issue(client, table, operation, report))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+
+    def _request(self, table: Table, operation: str) -> tuple[str, dict[str, Any]]:
+        base = f"/api/encounters/{table.encounter_id}"
+        actor_id = self._random.choice(table.player_ids) if table.player_ids else None
+        if operation == "next_turn":
+            return f"{base}/actions", {"token": table.host_token, "action": {"type": "NEXT_TURN"}}
+        if operation == "damage":
+            action = {"type": "APPLY_DAMAGE", "actorId": actor_id, "damageTaken": self._random.randint(1, 30)}
+            return f"{base}/actions", {"token": table.host_token, "action": action}
+        if operation == "roll":
+            # The server rolls the die itself.
+            roll = {"kind": self._random.choice(("d20", "d20", "d6", "d8")), "actorId": actor_id}
+            return f"{base}/rolls", {"token": table.player_token, "roll": roll}
+        return f"{base}/chat", {"token": table.player_token, "message": f"message {self._random.randint(1, 10**6)}"}
+
+    async def _issue(self, client: Any, table: Table, operation: str, report: LoadReport) -> None:
+        """Send one operation; the driver counted it as in flight when it was scheduled."""
+        path, body = self._request(table, operation)
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=body)
+            responded = time.perf_counter()
+            if response.status_code != 200:
+                report.failed += 1
+                return
+            version = int(response.json()["state"]["version"])
+        except Exception:
+            report.failed += 1
+            return
+        finally:
+            self._in_flight -= 1
+        report.completed += 1
+        self._samples.append(
+            Sample(operation=operation, table=table, started=started, responded=responded, version=version)
+        )
+
+    @staticmethod
+    async def _sample_rss(pid: int, samples: list[int]) -> None:
+        while True:
+            value = rss_bytes(pid)
+            if value is not None:
+                samples.append(value)
+            await asyncio.sleep(0.5)
+
+
+def start_server(server: str, timeout_s: float = 10.0) -> subprocess.Popen[bytes]:
+    """Run the API under uvicorn on the host and port of `server`, with the environment's settings."""
+    import httpx
+
+    parts = urlsplit(server)
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "dndtracker.backend.api:app",
+        "--host",
+        parts.hostname or "127.0.0.1",
+        "--port",
+        str(parts.port or 8000),
+        "--log-level",
+        "warning",
+    ]
+    process = subprocess.Popen(command, cwd=str(ROOT_DIR), env=os.environ.copy())
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(f"{server.rstrip('/')}/docs", timeout=0.5).status_code < 500:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not come up on {server}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate many tables of players against a local server")
+    parser.add_argument("--server", default="http://127.0.0.1:8000")
+    parser.add_argument("--encounters", type=int, default=10, help="encounters to create")
+    parser.add_argument("--players", type=int, default=4, help="player sockets (and registered players) per encounter")
+    parser.add_argument("--rate", type=float, default=50.0, help="operations per second across all encounters")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to drive load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights, default {DEFAULT_MIX}")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="skip operations beyond this many open requests")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-server", action="store_true", help="run uvicorn for the duration of the test")
+    parser.add_argument("--server-pid", type=int, help="process to report RSS for, when not using --start-server")
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+    generator = LoadGenerator(
+        server=args.server,
+        encounters=max(1, args.encounters),
+        players=max(1, args.players),
+        rate=max(0.1, args.rate),
+        duration_s=max(1.0, args.duration),
+        mix=mix,
+        max_in_flight=max(1, args.max_in_flight),
+        seed=args.seed,
+    )
+    process = start_server(args.server) if args.start_server else None
+    try:
+        server_pid = process.pid if process is not None else args.server_pid
+        report = asyncio.run(generator.run(server_pid=server_pid))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print("\n".join(report.lines()))
+    if args.output:
+        Path(args.output).write_text(json.dumps(asdict(report), indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+import asyncio
+
+from dndtracker.backend.actors import EncounterActors
+from dndtracker.backend.async_store import AsyncInMemoryEncounterStore
+from dndtracker.backend.models import ActionBatchResult
+from dndtracker.backend.store import InMemoryEncounterStore
+
+
+class _SlowStore:
+    """Counts overlapping writes per encounter; every write yields to the loop like real I/O would."""
+
+    def __init__(self, fail_on: str | None = None, broken: bool = False) -> None:
+        self.fail_on = fail_on
+        self.broken = broken
+        self.versions: dict[str, int] = {}
+        self.in_flight: dict[str, int] = {}
+        self.max_in_flight: dict[str, int] = {}
+        self.max_total_in_flight = 0
+        self.calls: list[tuple[str, str, int]] = []
+        self.closed = False
+
+    async def _write(self, encounter_id: str, kind: str, size: int) -> dict:
+        self.in_flight[encounter_id] = self.in_flight.get(encounter_id, 0) + 1
+        self.max_in_flight[encounter_id] = max(self.max_in_flight.get(encounter_id, 0), self.in_flight[encounter_id])
+        self.max_total_in_flight = max(self.max_total_in_flight, sum(self.in_flight.values()))
+        await asyncio.sleep(0.01)
+        self.in_flight[encounter_id] -= 1
+        self.calls.append((encounter_id, kind, size))
+        self.versions[encounter_id] = self.versions.get(encounter_id, 1) + 1
+        return {"id": encounter_id, "version": self.versions[encounter_id]}
+
+    async def apply_action(self, encounter_id: str, raw_token: str, action: dict) -> dict | None:
+        if action.get("type") == self.fail_on:
+            raise ValueError("bad action")
+        return await self._write(encounter_id, "action", 1)
+
+    async def apply_actions(self, encounter_id: str, raw_token: str, actions: list[dict]) -> ActionBatchResult | None:
+        if any(action.get("type") == self.fail_on for action in actions):
+            raise ValueError("bad action")
+        state = await self._write(encounter_id, "batch", len(actions))
+        return ActionBatchResult(state=state, engine_events=[[] for _ in actions])
+
+    async def apply_each_action(self, encounter_id: str, raw_token: str, actions: list[dict]) -> list:
+        if self.broken:
+            self.calls.append((encounter_id, "failed", len(actions)))
+            raise ConnectionError("database went away")
+        await self._write(encounter_id, "each", len(actions))
+        # _write counted one version; every action that reduces gets its own instead.
+        version = self.versions[encounter_id] - 1
+        results: list = []
+        for action in actions:
+            if action.get("type") == self.fail_on:
+                results.append(ValueError("bad action"))
+            else:
+                version += 1
+                results.append({"id": encounter_id, "version": version})
+        self.versions[encounter_id] = version
+        return results
+
+    async def append_chat(self, encounter_id: str, raw_token: str, message: str) -> dict | None:
+        return await self._write(encounter_id, "chat", 1)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_writes_to_one_encounter_never_overlap_and_queued_actions_share_one_write() -> None:
+    store = _SlowStore()
+    actors = EncounterActors(store=store)
+
+    async def scenario() -> list:
+        return await asyncio.gather(
+            actors.append_chat(encounter_id="a", raw_token="p", message="hi"),
+            *(actors.apply_action(encounter_id="a", raw_token="h", action={"type": "NEXT_TURN"}) for _ in range(5)),
+            actors.append_chat(encounter_id="a", raw_token="p", message="bye"),
+        )
+
+    results = asyncio.run(scenario())
+
+    assert store.max_in_flight["a"] == 1
+    assert store.calls == [("a", "chat", 1), ("a", "each", 5), ("a", "chat", 1)]
+    # One version per request, even though the five actions were persisted together.
+    assert [result["version"] for result in results] == [2, 3, 4, 5, 6, 7, 8]
+    assert actors.active == 0
+
+
+def test_different_encounters_write_concurrently() -> None:
+    store = _SlowStore()
+    actors = EncounterActors(store=store)
+
+    async def scenario() -> None:
+        await asyncio.gather(
+            *(actors.append_chat(encounter_id=f"enc-{index}", raw_token="p", message="hi") for index in range(4))
+        )
+
+    asyncio.run(scenario())
+
+    assert store.max_total_in_flight == 4
+
+
+def test_failing_action_in_a_merged_run_only_fails_its_own_caller() -> None:
+    store = _SlowStore(fail_on="BROKEN")
+    actors = EncounterActors(store=store)
+
+    async def scenario() -> list:
+        return await asyncio.gather(
+            actors.append_chat(encounter_id="a", raw_token="p", message="hi"),
+            actors.apply_action(encounter_id="a", raw_token="h", action={"type": "NEXT_TURN"}),
+            actors.apply_action(encounter_id="a", raw_token="h", action={"type": "BROKEN"}),
+            actors.apply_action(encounter_id="a", raw_token="h", action={"type": "NEXT_TURN"}),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+
+    assert isinstance(results[2], ValueError)
+    assert [result["version"] for result in (results[1], results[3])] == [3, 4]
+
+
+def test_failed_shared_write_fails_every_caller_without_replaying_them() -> None:
+    store = _SlowStore(broken=True)
+    actors = EncounterActors(store=store)
+
+    async def scenario() -> list:
+        return await asyncio.gather(
+            actors.append_chat(encounter_id="a", raw_token="p", message="hi"),
+            *(actors.apply_action(encounter_id="a", raw_token="h", action={"type": "NEXT_TURN"}) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, ConnectionError) for result in results[1:])
+    assert store.calls == [("a", "chat", 1), ("a", "failed", 3)]
+
+
+def test_close_waits_for_accepted_writes() -> None:
+    store = _SlowStore()
+    actors = EncounterActors(store=store)
+
+    async def scenario() -> None:
+        pending = asyncio.ensure_future(actors.append_chat(encounter_id="a", raw_token="p", message="hi"))
+        await asyncio.sleep(0)
+        await actors.close()
+        assert store.calls == [("a", "chat", 1)]
+        await pending
+
+    asyncio.run(scenario())
+
+    assert store.closed is True
+
+
+def test_actors_keep_store_semantics_for_rejected_writes() -> None:
+    base = InMemoryEncounterStore(server_salt="salt")
+    created = base.create_encounter(name="S", host_token="host", player_token="player")
+    actors = EncounterActors(store=AsyncInMemoryEncounterStore(store=base))
+
+    async def scenario() -> tuple:
+        return await asyncio.gather(
+            actors.apply_action(encounter_id=created.encounter_id, raw_token="player", action={"type": "NEXT_TURN"}),
+            actors.apply_action(encounter_id=created.encounter_id, raw_token="host", action={"type": "NEXT_TURN"}),
+        )
+
+    refused, applied = asyncio.run(scenario())
+
+    assert refused is None
+    assert applied["version"] == 2
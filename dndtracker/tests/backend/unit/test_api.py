@@ -1,10 +1,19 @@
+import asyncio
+import json
+import time
+
 import pytest
 
 fastapi = pytest.importorskip("fastapi")
 pytest.importorskip("httpx")
 from fastapi.testclient import TestClient
 
-from dndtracker.backend.api import create_app
+from dndtracker.backend import api as api_module
+from dndtracker.backend.api import EncounterWebSocketHub, create_app
+from dndtracker.backend.broadcast import StateUpdate
+from dndtracker.backend.patch import apply_patch
+from dndtracker.backend.profiling import RequestProfiler
+from dndtracker.backend.security import issue_ticket
 from dndtracker.backend.store import InMemoryEncounterStore
 
 
@@ -39,6 +48,92 @@ def test_get_encounter_returns_full_state_for_valid_token() -> None:
     assert state["meta"]["name"] == "Session 1"
 
 
+def test_get_encounter_returns_session_ticket_usable_for_commands() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt", ticket_ttl_s=300)
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+    encounter_id = created["encounter_id"]
+
+    data = client.get(f"/api/encounters/{encounter_id}", params={"token": created["host_token"]}).json()
+    ticket = data["ticket"]
+
+    assert ticket.startswith("st1.")
+    assert data["ticket_expires_at"] > time.time()
+    response = client.post(f"/api/encounters/{encounter_id}/chat", json={"token": ticket, "message": "hi"})
+    assert response.status_code == 200
+
+
+def test_metrics_endpoint_reports_requests_broadcasts_and_connections(monkeypatch) -> None:
+    monkeypatch.setattr(api_module.METRICS, "enabled", False)
+    api_module.METRICS.reset()
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    assert TestClient(create_app(store=store, metrics=False)).get("/metrics").status_code == 404
+
+    with TestClient(create_app(store=store, metrics=True)) as client:
+        created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+        encounter_id = created["encounter_id"]
+        with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={created['player_token']}") as websocket:
+            websocket.receive_json()
+            client.post(
+                f"/api/encounters/{encounter_id}/actions",
+                json={"token": created["host_token"], "action": {"type": "NEXT_TURN"}},
+            )
+            websocket.receive_json()
+            response = client.get("/metrics")
+    api_module.METRICS.reset()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    route = "/api/encounters/{encounter_id}/actions"
+    assert f'dndtracker_http_request_seconds_count{{method="POST",route="{route}"}} 1' in body
+    assert 'dndtracker_action_seconds_count{type="NEXT_TURN"} 1' in body
+    assert "dndtracker_broadcast_seconds_count 1" in body
+    assert 'dndtracker_ws_frame_bytes_count{type="state.patch"} 1' in body
+    assert f'dndtracker_ws_connections{{encounter_id="{encounter_id}"}} 1' in body
+
+
+def test_trace_file_and_profiles_cover_requests(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(api_module.TRACER, "enabled", False)
+    api_module.TRACER.reset()
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    trace_file = tmp_path / "trace.json"
+    profiler = RequestProfiler(
+        directory=tmp_path / "profiles",
+        threshold_ms=0,
+        interval_s=0.001,
+        header_secret="profile-secret",
+    )
+    app = create_app(store=store, trace_file=str(trace_file), profiler=profiler)
+
+    with TestClient(app) as client:
+        created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+        encounter_id = created["encounter_id"]
+        with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={created['player_token']}") as websocket:
+            websocket.receive_json()
+            client.post(
+                f"/api/encounters/{encounter_id}/actions",
+                json={"token": created["host_token"], "action": {"type": "NEXT_TURN"}},
+                headers={"X-Dndtracker-Profile": "1"},
+            )
+            websocket.receive_json()
+            client.post(
+                f"/api/encounters/{encounter_id}/actions",
+                json={"token": created["host_token"], "action": {"type": "NEXT_TURN"}},
+                headers={"X-Dndtracker-Profile": "profile-secret"},
+            )
+            websocket.receive_json()
+    api_module.TRACER.reset()
+
+    names = {event["name"] for event in json.loads(trace_file.read_text(encoding="utf-8"))["traceEvents"]}
+    assert {"POST /api/encounters/{encounter_id}/actions", "get_encounter_access", "reduce_event"} <= names
+    assert {"broadcast_state", "encode_message"} <= names
+    profiles = list((tmp_path / "profiles").glob("*.folded"))
+    assert len(profiles) == 1
+    assert "-POST-api-encounters-encounter-id-actions-" in profiles[0].name
+
+
 def test_get_encounter_rejects_invalid_token() -> None:
     store = InMemoryEncounterStore(server_salt="test-salt")
     app = create_app(store=store)
@@ -73,6 +168,103 @@ def test_post_action_accepts_host_and_rejects_player() -> None:
     assert allowed.json()["state"]["status"] == "running"
 
 
+def test_post_action_rejects_malformed_effect() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+    encounter_id = created["encounter_id"]
+
+    response = client.post(
+        f"/api/encounters/{encounter_id}/actions",
+        json={"token": created["host_token"], "action": {"type": "ADD_EFFECT", "effect": {"roundsRemaining": "2"}}},
+    )
+
+    assert response.status_code == 400
+    assert "roundsRemaining" in response.json()["detail"]
+
+
+def test_post_action_rejects_non_numeric_damage_without_a_server_error() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    client = TestClient(create_app(store=store))
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+
+    response = client.post(
+        f"/api/encounters/{created['encounter_id']}/actions",
+        json={"token": created["host_token"], "action": {"type": "APPLY_DAMAGE", "actorId": "a", "damageTaken": "abc"}},
+    )
+
+    assert response.status_code == 400
+    assert "action.damageTaken" in response.json()["detail"]
+
+
+def test_post_action_batch_commits_one_version_and_one_broadcast() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+    encounter_id = created["encounter_id"]
+    token = created["player_token"]
+    for name in ("Alice", "Bob"):
+        client.post(f"/api/encounters/{encounter_id}/players", json={"token": token, "name": name})
+    players = client.get(f"/api/encounters/{encounter_id}", params={"token": token}).json()["state"]["players"]
+    actions = [
+        {"type": "SET_INITIATIVE", "playerId": players[0]["id"], "initiative": 10},
+        {"type": "SET_INITIATIVE", "playerId": players[1]["id"], "initiative": 15},
+        {"type": "ADD_EFFECT", "effect": {"id": "e1", "name": "Bless"}},
+    ]
+
+    with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={token}") as websocket:
+        initial = websocket.receive_json()
+        forbidden = client.post(
+            f"/api/encounters/{encounter_id}/actions:batch",
+            json={"token": token, "actions": actions},
+        )
+        response = client.post(
+            f"/api/encounters/{encounter_id}/actions:batch",
+            json={"token": created["host_token"], "actions": actions},
+        )
+        patch = websocket.receive_json()
+
+    assert forbidden.status_code == 403
+    assert response.status_code == 200
+    data = response.json()
+    assert data["state"]["version"] == initial["state"]["version"] + 1
+    assert data["state"]["turnOrder"] == [players[1]["id"], players[0]["id"]]
+    assert [[event["kind"] for event in events] for events in data["engine_events"]] == [
+        ["initiative_set"],
+        ["initiative_set"],
+        ["effect_added"],
+    ]
+    assert patch["type"] == "state.patch"
+    assert patch["version"] == data["state"]["version"]
+
+
+def test_post_action_batch_rejects_invalid_action_before_applying_any() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+    encounter_id = created["encounter_id"]
+
+    response = client.post(
+        f"/api/encounters/{encounter_id}/actions:batch",
+        json={
+            "token": created["host_token"],
+            "actions": [{"type": "NEXT_TURN"}, {"type": "ADD_EFFECT", "effect": {"name": 3}}],
+        },
+    )
+    empty = client.post(
+        f"/api/encounters/{encounter_id}/actions:batch",
+        json={"token": created["host_token"], "actions": []},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("actions[1]")
+    assert empty.status_code == 422
+    assert store.load_state(encounter_id)["version"] == 1
+
+
 def test_post_roll_and_chat_accept_player() -> None:
     store = InMemoryEncounterStore(server_salt="test-salt")
     client = TestClient(create_app(store=store))
@@ -95,6 +287,33 @@ def test_post_roll_and_chat_accept_player() -> None:
     assert chat_response.json()["state"]["chat"][-1]["text"] == "Hallo"
 
 
+def test_history_endpoints_page_entries_outside_live_window() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt", history_limit=2)
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+    encounter_id = created["encounter_id"]
+    token = created["player_token"]
+    for index in range(4):
+        client.post(f"/api/encounters/{encounter_id}/chat", json={"token": token, "message": f"m{index}"})
+
+    state = client.get(f"/api/encounters/{encounter_id}", params={"token": token}).json()["state"]
+    chat_page = client.get(
+        f"/api/encounters/{encounter_id}/chat",
+        params={"token": token, "before": state["chat"][0]["version"], "limit": 10},
+    )
+    log_page = client.get(f"/api/encounters/{encounter_id}/log", params={"token": token, "limit": 1})
+    denied = client.get(f"/api/encounters/{encounter_id}/log", params={"token": "invalid"})
+
+    assert len(state["chat"]) == 2
+    assert chat_page.status_code == 200
+    assert [entry["text"] for entry in chat_page.json()["entries"]] == ["m0", "m1"]
+    assert chat_page.json()["next_before"] is None
+    assert log_page.json()["entries"][-1]["message"] == "m3"
+    assert log_page.json()["next_before"] == 5
+    assert denied.status_code == 404
+
+
 def test_websocket_sends_initial_state_after_connect() -> None:
     store = InMemoryEncounterStore(server_salt="test-salt")
     app = create_app(store=store)
@@ -124,7 +343,7 @@ def test_websocket_rejects_invalid_token() -> None:
             pass
 
 
-def test_websocket_broadcasts_full_state_to_all_clients() -> None:
+def test_websocket_broadcasts_state_patch_to_all_clients() -> None:
     store = InMemoryEncounterStore(server_salt="test-salt")
     app = create_app(store=store)
 
@@ -136,8 +355,8 @@ def test_websocket_broadcasts_full_state_to_all_clients() -> None:
 
         with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={host_token}") as ws_host:
             with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={player_token}") as ws_player:
-                ws_host.receive_json()
-                ws_player.receive_json()
+                host_initial = ws_host.receive_json()["state"]
+                player_initial = ws_player.receive_json()["state"]
 
                 client.post(
                     f"/api/encounters/{encounter_id}/chat",
@@ -147,7 +366,324 @@ def test_websocket_broadcasts_full_state_to_all_clients() -> None:
                 host_message = ws_host.receive_json()
                 player_message = ws_player.receive_json()
 
-    assert host_message["type"] == "state.full"
-    assert player_message["type"] == "state.full"
-    assert host_message["state"]["chat"][-1]["text"] == "sync me"
-    assert player_message["state"]["chat"][-1]["text"] == "sync me"
+    assert host_message["type"] == "state.patch"
+    assert player_message == host_message
+    assert host_message["baseVersion"] == host_initial["version"]
+    assert host_message["version"] == host_initial["version"] + 1
+    host_state = apply_patch(host_initial, host_message["ops"])
+    player_state = apply_patch(player_initial, player_message["ops"])
+    assert host_state["chat"][-1]["text"] == "sync me"
+    assert player_state == host_state
+    assert host_state == store.get_encounter_access(encounter_id=encounter_id, raw_token=host_token).state
+
+
+def test_websocket_resync_sends_full_state() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    app = create_app(store=store)
+
+    with TestClient(app) as client:
+        created = client.post("/api/encounters", json={"name": "Session WS"}).json()
+        encounter_id = created["encounter_id"]
+        host_token = created["host_token"]
+
+        with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={host_token}") as websocket:
+            websocket.receive_json()
+            client.post(f"/api/encounters/{encounter_id}/chat", json={"token": host_token, "message": "missed"})
+            websocket.receive_json()
+            websocket.send_json({"type": "state.resync"})
+            message = websocket.receive_json()
+
+    assert message["type"] == "state.full"
+    assert message["state"]["chat"][-1]["text"] == "missed"
+
+
+def test_websocket_commands_apply_changes_and_ack_after_state() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session WS"}).json()
+    encounter_id = created["encounter_id"]
+
+    with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={created['host_token']}") as host:
+        host.receive_json()
+        host.send_json({"type": "action", "requestId": "r1", "action": {"type": "NEXT_TURN"}})
+        patch = host.receive_json()
+        ack = host.receive_json()
+        host.send_json({"type": "chat.send", "requestId": "r2", "message": "Hallo"})
+        host.receive_json()
+        chat_ack = host.receive_json()
+
+    assert patch["type"] == "state.patch"
+    assert ack == {"type": "ack", "requestId": "r1", "ok": True, "version": patch["version"]}
+    assert chat_ack["ok"] is True
+    assert store.load_state(encounter_id)["chat"][-1]["text"] == "Hallo"
+
+
+def test_websocket_commands_are_refused_by_role_and_validated() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    client = TestClient(create_app(store=store))
+
+    created = client.post("/api/encounters", json={"name": "Session WS"}).json()
+    encounter_id = created["encounter_id"]
+
+    with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={created['player_token']}") as player:
+        player.receive_json()
+        player.send_json({"type": "action", "requestId": 7, "action": {"type": "NEXT_TURN"}})
+        refused = player.receive_json()
+        player.send_json({"type": "player.register", "requestId": 8, "name": ""})
+        invalid = player.receive_json()
+        player.send_json({"type": "roll.submit", "requestId": 9, "roll": {"kind": "d7"}})
+        bad_roll = player.receive_json()
+
+    assert refused == {"type": "ack", "requestId": 7, "ok": False, "status": 403, "error": "Action not allowed"}
+    assert invalid["status"] == 400
+    assert bad_roll["status"] == 400
+    assert store.load_state(encounter_id)["version"] == 1
+
+
+def test_websocket_acks_unexpected_command_errors_and_unregisters_on_close(monkeypatch) -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    app = create_app(store=store)
+    client = TestClient(app)
+
+    created = client.post("/api/encounters", json={"name": "Session WS"}).json()
+    encounter_id = created["encounter_id"]
+
+    def broken_chat(**kwargs):
+        raise RuntimeError("database went away")
+
+    with client.websocket_connect(f"/ws/encounters/{encounter_id}?token={created['host_token']}") as host:
+        host.receive_json()
+        monkeypatch.setattr(store, "append_chat", broken_chat)
+        host.send_json({"type": "chat.send", "requestId": "r1", "message": "Hallo"})
+        failed = host.receive_json()
+        monkeypatch.undo()
+        host.send_json({"type": "action", "requestId": "r2", "action": {"type": "NEXT_TURN"}})
+        host.receive_json()
+        recovered = host.receive_json()
+
+    assert failed == {"type": "ack", "requestId": "r1", "ok": False, "status": 500, "error": "Internal server error"}
+    assert recovered["ok"] is True
+    assert app.state.websocket_hub._connections == {}
+
+
+def test_app_lifespan_opens_and_closes_store() -> None:
+    class _TrackingStore(InMemoryEncounterStore):
+        def __post_init__(self) -> None:
+            super().__post_init__()
+            self.calls: list[str] = []
+
+        def open(self) -> None:
+            self.calls.append("open")
+
+        def close(self) -> None:
+            self.calls.append("close")
+
+    store = _TrackingStore(server_salt="test-salt")
+
+    with TestClient(create_app(store=store)):
+        assert store.calls == ["open"]
+
+    assert store.calls == ["open", "close"]
+
+
+class _FakeSocket:
+    def __init__(self, delay_s: float = 0.0) -> None:
+        self.delay_s = delay_s
+        self.frames: list[str] = []
+        self.close_codes: list[int] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, frame: str) -> None:
+        await asyncio.sleep(self.delay_s)
+        self.frames.append(frame)
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_codes.append(code)
+
+
+def test_hub_broadcast_encodes_once_and_evicts_stragglers(monkeypatch) -> None:
+    encoded: list[dict] = []
+    real_encode = api_module.encode_message
+
+    def counting_encode(message: dict) -> str:
+        encoded.append(message)
+        return real_encode(message)
+
+    monkeypatch.setattr(api_module, "encode_message", counting_encode)
+    hub = EncounterWebSocketHub(send_timeout_s=0.05)
+    fast = [_FakeSocket(delay_s=0.01) for _ in range(5)]
+    slow = _FakeSocket(delay_s=1.0)
+
+    async def scenario() -> float:
+        for websocket in [*fast, slow]:
+            await hub.connect(encounter_id="enc-1", websocket=websocket)
+        started = time.perf_counter()
+        await hub.broadcast_state(encounter_id="enc-1", state={"version": 1})
+        await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - started
+        await hub.broadcast_state(encounter_id="enc-1", state={"version": 2})
+        await asyncio.sleep(0.1)
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+
+    assert len(encoded) == 2
+    assert elapsed < 0.5
+    assert all(len(websocket.frames) == 2 for websocket in fast)
+    assert all(websocket.frames[0] is fast[0].frames[0] for websocket in fast)
+    assert json.loads(fast[0].frames[1])["type"] == "state.patch"
+    assert slow.frames == []
+    assert slow.close_codes == [1013]
+
+
+def test_hub_coalesces_backlog_to_latest_full_state(monkeypatch) -> None:
+    encoded: list[dict] = []
+    real_encode = api_module.encode_message
+
+    def counting_encode(message: dict) -> str:
+        encoded.append(message)
+        return real_encode(message)
+
+    monkeypatch.setattr(api_module, "encode_message", counting_encode)
+    hub = EncounterWebSocketHub(send_timeout_s=1.0, send_queue_size=3)
+    lagging = _FakeSocket(delay_s=0.05)
+    pending_sizes: list[int] = []
+
+    async def scenario() -> None:
+        await hub.connect(encounter_id="enc-1", websocket=lagging)
+        hub.remember_state(encounter_id="enc-1", state={"version": 0})
+        for version in range(1, 21):
+            await hub.broadcast_state(encounter_id="enc-1", state={"version": version})
+            pending_sizes.append(hub._writers[lagging].pending)
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+
+    messages = [json.loads(frame) for frame in lagging.frames]
+    assert max(pending_sizes) <= 3
+    assert len(messages) < 20
+    assert messages[-1] == {"type": "state.full", "state": {"version": 20}}
+    assert len(encoded) == len(messages)
+
+
+def test_hub_keeps_replies_when_coalescing_state_frames() -> None:
+    hub = EncounterWebSocketHub(send_timeout_s=1.0, send_queue_size=2)
+    lagging = _FakeSocket(delay_s=0.05)
+
+    async def scenario() -> None:
+        await hub.connect(encounter_id="enc-1", websocket=lagging)
+        hub.remember_state(encounter_id="enc-1", state={"version": 0})
+        for version in range(1, 6):
+            await hub.broadcast_state(encounter_id="enc-1", state={"version": version})
+            await hub.send_reply(websocket=lagging, message={"type": "ack", "requestId": version})
+        await asyncio.sleep(0.5)
+
+    asyncio.run(scenario())
+
+    messages = [json.loads(frame) for frame in lagging.frames]
+    assert [message["requestId"] for message in messages if message["type"] == "ack"] == [1, 2, 3, 4, 5]
+    assert [message for message in messages if message["type"] != "ack"][-1] == {
+        "type": "state.full",
+        "state": {"version": 5},
+    }
+
+
+class _CapturingBroadcast:
+    def __init__(self) -> None:
+        self.deliver = None
+        self.published: list[tuple[str, int]] = []
+        self.stopped = False
+
+    async def start(self, deliver) -> None:
+        self.deliver = deliver
+
+    async def publish(self, encounter_id: str, state: dict) -> None:
+        self.published.append((encounter_id, state["version"]))
+
+    async def stop(self) -> None:
+        self.stopped = True
+
+
+def test_publish_state_forwards_changes_to_broadcast_backend() -> None:
+    remote = _CapturingBroadcast()
+    app = create_app(store=InMemoryEncounterStore(server_salt="test-salt"), broadcast=remote)
+
+    with TestClient(app) as client:
+        created = client.post("/api/encounters", json={"name": "Session"}).json()
+        client.post(
+            f"/api/encounters/{created['encounter_id']}/chat",
+            json={"token": created["host_token"], "message": "hello"},
+        )
+
+    assert remote.published == [(created["encounter_id"], 2)]
+    assert remote.stopped is True
+
+
+def test_remote_update_reaches_local_sockets_once() -> None:
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    encounter_id = created.encounter_id
+    remote = _CapturingBroadcast()
+    app = create_app(store=store, broadcast=remote)
+    hub = app.state.websocket_hub
+    socket = _FakeSocket()
+
+    async def scenario() -> None:
+        async with app.router.lifespan_context(app):
+            await hub.connect(encounter_id=encounter_id, websocket=socket)
+            hub.remember_state(encounter_id=encounter_id, state=store.load_state(encounter_id=encounter_id))
+            # Another worker committed version 2 against the shared database.
+            store.append_chat(encounter_id=encounter_id, raw_token="host-1", message="from worker b")
+            await remote.deliver(StateUpdate(encounter_id=encounter_id, version=2))
+            await remote.deliver(StateUpdate(encounter_id=encounter_id, version=2))
+            await remote.deliver(StateUpdate(encounter_id="unwatched", version=9))
+            await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    messages = [json.loads(frame) for frame in socket.frames]
+    assert [message["type"] for message in messages] == ["state.patch"]
+    assert messages[0]["version"] == 2
+
+
+def test_repeated_disconnects_leave_the_connection_gauge_alone(monkeypatch) -> None:
+    monkeypatch.setattr(api_module.METRICS, "enabled", True)
+    api_module.METRICS.reset()
+    hub = EncounterWebSocketHub()
+    first, second = _FakeSocket(), _FakeSocket()
+
+    async def scenario() -> tuple[list[str], list[str]]:
+        await hub.connect(encounter_id="enc-1", websocket=first)
+        await hub.connect(encounter_id="enc-1", websocket=second)
+        hub.disconnect(encounter_id="enc-1", websocket=first)
+        hub.disconnect(encounter_id="enc-1", websocket=first)
+        samples = list(api_module.METRICS.ws_connections.samples())
+        hub.disconnect(encounter_id="enc-1", websocket=second)
+        hub.disconnect(encounter_id="enc-1", websocket=second)
+        return samples, list(api_module.METRICS.ws_connections.samples())
+
+    samples, remaining = asyncio.run(scenario())
+    api_module.METRICS.reset()
+
+    assert samples == ['dndtracker_ws_connections{encounter_id="enc-1"} 1']
+    assert remaining == []
+
+
+def test_default_salt_cannot_sign_a_host_ticket() -> None:
+    store = InMemoryEncounterStore(server_salt="dev-salt", ticket_ttl_s=300)
+    client = TestClient(create_app(store=store))
+    created = client.post("/api/encounters", json={"name": "Session 1"}).json()
+    encounter_id = created["encounter_id"]
+    forged = issue_ticket(encounter_id=encounter_id, role="HOST", token_hash="whatever", secret="dev-salt", ttl_s=60)
+
+    response = client.post(
+        f"/api/encounters/{encounter_id}/actions",
+        json={"token": forged, "action": {"type": "NEXT_TURN"}},
+    )
+
+    assert response.status_code in (403, 404)
+    state = client.get(f"/api/encounters/{encounter_id}", params={"token": created["host_token"]}).json()["state"]
+    assert state["version"] == 1
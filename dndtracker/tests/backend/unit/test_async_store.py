@@ -0,0 +1,261 @@
+import asyncio
+import threading
+import time
+
+from dndtracker.backend.async_store import (
+    AsyncInMemoryEncounterStore,
+    AsyncPostgresEncounterStore,
+    ThreadedEncounterStore,
+    as_async_store,
+    create_async_store,
+)
+from dndtracker.backend.state import build_initial_state
+from dndtracker.backend.store import InMemoryEncounterStore, PostgresEncounterStore
+
+
+def test_as_async_store_wraps_sync_stores_and_passes_async_stores_through() -> None:
+    in_memory = InMemoryEncounterStore(server_salt="salt")
+    postgres = PostgresEncounterStore(database_url="postgresql://local", server_salt="salt")
+    async_postgres = AsyncPostgresEncounterStore(database_url="postgresql://local", server_salt="salt")
+
+    assert isinstance(as_async_store(in_memory), AsyncInMemoryEncounterStore)
+    assert isinstance(as_async_store(postgres), ThreadedEncounterStore)
+    assert as_async_store(async_postgres) is async_postgres
+
+
+def test_create_async_store_selects_backend_by_database_url() -> None:
+    postgres = create_async_store(database_url="postgresql://local", server_salt="salt", pool_max_size=4)
+    in_memory = create_async_store(database_url=None, server_salt="salt")
+
+    assert isinstance(postgres, AsyncPostgresEncounterStore)
+    assert postgres.pooled is True
+    assert isinstance(in_memory, AsyncInMemoryEncounterStore)
+
+
+def test_async_in_memory_store_round_trip() -> None:
+    async def scenario() -> dict:
+        store = AsyncInMemoryEncounterStore(store=InMemoryEncounterStore(server_salt="salt"))
+        created = await store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+        await store.register_player(encounter_id=created.encounter_id, raw_token="player-1", name="Mira")
+        forbidden = await store.apply_action(
+            encounter_id=created.encounter_id,
+            raw_token="player-1",
+            action={"type": "NEXT_TURN"},
+        )
+        assert forbidden is None
+        state = await store.append_chat(encounter_id=created.encounter_id, raw_token="host-1", message="hi")
+        assert state is not None
+        return state
+
+    state = asyncio.run(scenario())
+
+    assert state["version"] == 3
+    assert state["players"][0]["name"] == "Mira"
+    assert state["chat"][-1]["whoLabel"] == "Host"
+
+
+def test_threaded_store_does_not_block_event_loop() -> None:
+    class _SlowStore(InMemoryEncounterStore):
+        def get_encounter_access(self, encounter_id: str, raw_token: str):
+            self.thread_id = threading.get_ident()
+            time.sleep(0.2)
+            return super().get_encounter_access(encounter_id=encounter_id, raw_token=raw_token)
+
+    slow = _SlowStore(server_salt="salt")
+    created = slow.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    store = ThreadedEncounterStore(store=slow)
+
+    async def scenario() -> list[str]:
+        order: list[str] = []
+
+        async def read() -> None:
+            await store.get_encounter_access(encounter_id=created.encounter_id, raw_token="host-1")
+            order.append("read")
+
+        async def tick() -> None:
+            await asyncio.sleep(0.01)
+            order.append("tick")
+
+        await asyncio.gather(read(), tick())
+        return order
+
+    assert asyncio.run(scenario()) == ["tick", "read"]
+    assert slow.thread_id != threading.get_ident()
+
+
+class _FakeAsyncCursor:
+    def __init__(self, row: tuple | None) -> None:
+        self.commands: list[tuple[str, tuple]] = []
+        self.row = row
+
+    async def execute(self, sql: str, params: tuple) -> None:
+        self.commands.append((sql, params))
+
+    async def fetchone(self) -> tuple | None:
+        return self.row
+
+    async def __aenter__(self) -> "_FakeAsyncCursor":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+class _FakeAsyncConnection:
+    def __init__(self, row: tuple | None) -> None:
+        self.cursor_instance = _FakeAsyncCursor(row=row)
+        self.committed = False
+
+    def cursor(self) -> _FakeAsyncCursor:
+        return self.cursor_instance
+
+    async def commit(self) -> None:
+        self.committed = True
+
+
+class _AsyncPostgresStoreWithFakeConnection(AsyncPostgresEncounterStore):
+    def __init__(self, row: tuple | None, **options) -> None:
+        super().__init__(database_url="postgresql://local", server_salt="salt", **options)
+        self.fake_connection = _FakeAsyncConnection(row=row)
+
+    def _connect(self):
+        connection = self.fake_connection
+
+        class _Context:
+            async def __aenter__(self) -> _FakeAsyncConnection:
+                return connection
+
+            async def __aexit__(self, exc_type, exc, tb) -> None:
+                return None
+
+        return _Context()
+
+
+def test_async_postgres_apply_action_locks_reduces_and_writes_in_one_transaction() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    store = _AsyncPostgresStoreWithFakeConnection(row=("HOST", state, 1, []))
+
+    next_state = asyncio.run(store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"}))
+
+    commands = store.fake_connection.cursor_instance.commands
+    assert next_state is not None
+    assert next_state["version"] == 2
+    assert store.fake_connection.committed is True
+    assert "FOR UPDATE OF e" in commands[0][0]
+    assert "INSERT INTO encounter_events" in commands[1][0]
+    assert "UPDATE encounters" in commands[2][0]
+
+
+def test_async_postgres_append_chat_rejects_unknown_token() -> None:
+    store = _AsyncPostgresStoreWithFakeConnection(row=None)
+
+    next_state = asyncio.run(store.append_chat(encounter_id="enc-1", raw_token="nope", message="hi"))
+
+    assert next_state is None
+    assert store.fake_connection.committed is False
+    assert len(store.fake_connection.cursor_instance.commands) == 1
+
+
+def test_async_postgres_serves_repeat_reads_and_mutations_from_cache() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    store = _AsyncPostgresStoreWithFakeConnection(row=("HOST", state, 1, []))
+    cursor = store.fake_connection.cursor_instance
+
+    async def scenario() -> dict | None:
+        await store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+        await store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+        cursor.row = ("HOST", 1)
+        return await store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
+
+    next_state = asyncio.run(scenario())
+
+    assert next_state is not None
+    assert next_state["version"] == 2
+    assert len(cursor.commands) == 4
+    assert "e.current_version" in cursor.commands[1][0]
+    assert asyncio.run(store.load_state("enc-1")) is next_state
+
+
+def test_async_postgres_write_behind_acks_before_writing_and_flushes_in_one_transaction() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    store = _AsyncPostgresStoreWithFakeConnection(
+        row=("HOST", state, 1, []),
+        write_behind=True,
+        write_behind_window_s=60,
+    )
+    cursor = store.fake_connection.cursor_instance
+
+    async def scenario() -> tuple[dict | None, dict | None, int]:
+        await store.open()
+        first = await store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
+        second = await store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
+        writes_before_close = len(cursor.commands)
+        await store.close()
+        return first, second, writes_before_close
+
+    first, second, writes_before_close = asyncio.run(scenario())
+
+    assert first is not None and first["version"] == 2
+    assert second is not None and second["version"] == 3
+    # Only the access lookup for the first write reached the database before shutdown.
+    assert writes_before_close == 1
+    assert store.fake_connection.committed is True
+    inserts = [sql for sql, _ in cursor.commands if "INSERT INTO encounter_events" in sql]
+    updates = [params for sql, params in cursor.commands if "UPDATE encounters" in sql]
+    assert len(inserts) == 2
+    assert len(updates) == 2
+
+
+def test_async_postgres_write_behind_queues_each_action_as_its_own_event() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    store = _AsyncPostgresStoreWithFakeConnection(
+        row=("HOST", state, 1, []),
+        write_behind=True,
+        write_behind_window_s=60,
+    )
+    cursor = store.fake_connection.cursor_instance
+
+    async def scenario() -> list:
+        await store.open()
+        results = await store.apply_each_action(
+            encounter_id="enc-1",
+            raw_token="host",
+            actions=[{"type": "NEXT_TURN"}, {"type": "NEXT_TURN"}],
+        )
+        await store.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    versions = [params[2] for sql, params in cursor.commands if "INSERT INTO encounter_events" in sql]
+    assert [result["version"] for result in results] == [2, 3]
+    assert versions == [2, 3]
+    assert store.fake_connection.committed is True
+
+
+def test_concurrent_first_pool_callers_share_one_opened_pool(monkeypatch) -> None:
+    import psycopg_pool
+
+    created: list["_OpeningPool"] = []
+
+    class _OpeningPool:
+        check_connection = None
+
+        def __init__(self, *args, **kwargs) -> None:
+            self.opened = False
+            created.append(self)
+
+        async def open(self) -> None:
+            await asyncio.sleep(0.01)
+            self.opened = True
+
+    monkeypatch.setattr(psycopg_pool, "AsyncConnectionPool", _OpeningPool)
+    store = AsyncPostgresEncounterStore(database_url="postgresql://local", server_salt="salt", pool_max_size=4)
+
+    async def scenario() -> list:
+        return await asyncio.gather(*(store._get_pool() for _ in range(5)))
+
+    pools = asyncio.run(scenario())
+
+    assert len(created) == 1
+    assert all(pool is created[0] and pool.opened for pool in pools)
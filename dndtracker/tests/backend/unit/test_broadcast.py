@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+
+from dndtracker.backend.broadcast import (
+    InProcessBroadcast,
+    PostgresBroadcast,
+    StateUpdate,
+    create_broadcast,
+    parse_notification,
+)
+
+
+def test_parse_notification_decodes_updates_from_other_processes() -> None:
+    payload = '{"encounterId": "enc-1", "version": 7, "origin": "worker-b"}'
+
+    assert parse_notification(payload, origin="worker-a") == StateUpdate(encounter_id="enc-1", version=7)
+    assert parse_notification(payload, origin="worker-b") is None
+
+
+@pytest.mark.parametrize("payload", ["not json", "[]", '{"encounterId": "enc-1"}', '{"version": "x"}'])
+def test_parse_notification_ignores_malformed_payloads(payload: str) -> None:
+    assert parse_notification(payload, origin="worker-a") is None
+
+
+def test_create_broadcast_selects_backend() -> None:
+    assert isinstance(create_broadcast(backend="local", database_url=None), InProcessBroadcast)
+    postgres = create_broadcast(backend="postgres", database_url="postgresql://local")
+    assert isinstance(postgres, PostgresBroadcast)
+    assert postgres.database_url == "postgresql://local"
+    with pytest.raises(ValueError):
+        create_broadcast(backend="postgres", database_url=None)
+
+
+def test_postgres_broadcast_publish_before_start_is_a_no_op() -> None:
+    backend = PostgresBroadcast(database_url="postgresql://local")
+
+    asyncio.run(backend.publish(encounter_id="enc-1", state={"version": 2}))
+
+    assert backend._publisher is None
+
+
+class _FakeNotify:
+    def __init__(self, payload: str) -> None:
+        self.payload = payload
+
+
+class _FakeAsyncConnection:
+    def __init__(self, payloads: list[str]) -> None:
+        self.payloads = payloads
+        self.executed: list[tuple] = []
+
+    async def execute(self, sql, params=None) -> None:
+        self.executed.append((sql, params))
+
+    async def notifies(self):
+        for payload in self.payloads:
+            yield _FakeNotify(payload)
+        await asyncio.Event().wait()
+
+    async def close(self) -> None:
+        return None
+
+    async def __aenter__(self) -> "_FakeAsyncConnection":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+def _fake_connect(monkeypatch, payloads: list[str] | None = None, connect_delay_s: float = 0.0) -> list:
+    import psycopg
+
+    connections: list[_FakeAsyncConnection] = []
+
+    async def connect(url, autocommit=False):
+        await asyncio.sleep(connect_delay_s)
+        connection = _FakeAsyncConnection(payloads=payloads or [])
+        connections.append(connection)
+        return connection
+
+    monkeypatch.setattr(psycopg.AsyncConnection, "connect", connect)
+    return connections
+
+
+def test_postgres_broadcast_publish_returns_at_once_and_sends_the_newest_version(monkeypatch) -> None:
+    connections = _fake_connect(monkeypatch, connect_delay_s=0.05)
+    backend = PostgresBroadcast(database_url="postgresql://local")
+
+    async def scenario() -> float:
+        async def deliver(update: StateUpdate) -> None:
+            return None
+
+        await backend.start(deliver)
+        started = asyncio.get_running_loop().time()
+        await backend.publish(encounter_id="enc-1", state={"version": 2})
+        await backend.publish(encounter_id="enc-1", state={"version": 3})
+        await backend.publish(encounter_id="enc-2", state={"version": 5})
+        elapsed = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(0.2)
+        await backend.stop()
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+
+    notified = [params[1] for connection in connections for sql, params in connection.executed if params]
+    assert elapsed < 0.05
+    assert [(message["encounterId"], message["version"]) for message in map(json.loads, notified)] == [
+        ("enc-1", 3),
+        ("enc-2", 5),
+    ]
+
+
+def test_postgres_broadcast_listener_survives_a_failing_delivery(monkeypatch) -> None:
+    payloads = [
+        '{"encounterId": "enc-1", "version": 2, "origin": "worker-b"}',
+        '{"encounterId": "enc-1", "version": 3, "origin": "worker-b"}',
+    ]
+    _fake_connect(monkeypatch, payloads=payloads)
+    backend = PostgresBroadcast(database_url="postgresql://local")
+    delivered: list[StateUpdate] = []
+
+    async def deliver(update: StateUpdate) -> None:
+        if update.version == 2:
+            raise RuntimeError("hub exploded")
+        delivered.append(update)
+
+    async def scenario() -> None:
+        await backend.start(deliver)
+        await asyncio.sleep(0.05)
+        await backend.stop()
+
+    asyncio.run(scenario())
+
+    assert delivered == [StateUpdate(encounter_id="enc-1", version=3)]
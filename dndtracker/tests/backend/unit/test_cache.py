@@ -0,0 +1,111 @@
+from dndtracker.backend.cache import EncounterCache, StateCache, TokenCache
+from dndtracker.backend.security import hash_token, issue_ticket
+
+
+def _state(version: int, padding: int = 0) -> dict:
+    return {"version": version, "log": ["x" * padding] if padding else []}
+
+
+def test_state_cache_evicts_least_recently_used_entry() -> None:
+    cache = StateCache(max_entries=2, max_bytes=1_000_000)
+    cache.put("a", _state(1), checkpoint_version=1)
+    cache.put("b", _state(1), checkpoint_version=1)
+    cache.get("a")
+    cache.put("c", _state(1), checkpoint_version=1)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_state_cache_is_bounded_by_encoded_bytes() -> None:
+    cache = StateCache(max_entries=100, max_bytes=200)
+    cache.put("a", _state(1, padding=100), checkpoint_version=1)
+    cache.put("b", _state(1, padding=100), checkpoint_version=1)
+    cache.put("huge", _state(1, padding=500), checkpoint_version=1)
+
+    assert cache.get("huge") is None
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.size_bytes <= 200
+
+
+def test_state_cache_keeps_newest_version_and_discards_stale_entries() -> None:
+    cache = StateCache(max_entries=10, max_bytes=1_000_000)
+    cache.put("a", _state(5), checkpoint_version=1)
+    cache.put("a", _state(4), checkpoint_version=1)
+
+    entry = cache.get("a")
+    assert entry is not None
+    assert entry.version == 5
+    assert entry.pending_events == 4
+
+    cache.discard_older("a", version=5)
+    assert cache.get("a") is not None
+    cache.discard_older("a", version=6)
+    assert cache.get("a") is None
+    assert cache.size_bytes == 0
+
+
+def test_state_cache_sizes_new_versions_without_encoding_each_one(monkeypatch) -> None:
+    from dndtracker.backend import cache as cache_module
+
+    encoded: list[int] = []
+    monkeypatch.setattr(cache_module, "encode_message", lambda state: encoded.append(state["version"]) or "x" * 10)
+    cache = StateCache(max_entries=10, max_bytes=1_000_000)
+    for version in range(1, 2 * cache_module.REMEASURE_EVERY + 2):
+        cache.put("a", _state(version), checkpoint_version=1)
+
+    entry = cache.get("a")
+    assert encoded == [1, 1 + cache_module.REMEASURE_EVERY, 1 + 2 * cache_module.REMEASURE_EVERY]
+    assert entry is not None
+    assert entry.size == 10
+    assert cache.size_bytes == 10
+
+
+def test_token_cache_expires_entries_after_ttl() -> None:
+    now = [100.0]
+    cache = TokenCache(max_entries=10, ttl_s=30.0, clock=lambda: now[0])
+    cache.put("hash-1", encounter_id="enc-1", role="HOST")
+
+    assert cache.get("hash-1") == ("enc-1", "HOST")
+    now[0] = 130.0
+    assert cache.get("hash-1") is None
+    assert len(cache) == 0
+
+
+def test_encounter_cache_access_requires_matching_encounter_and_cached_state() -> None:
+    cache = EncounterCache(max_entries=10, max_bytes=1_000_000, token_ttl_s=60.0)
+    cache.remember("enc-1", _state(3), checkpoint_version=1, token_hash="hash-1", role="PLAYER")
+
+    access = cache.access("enc-1", "hash-1")
+    assert access is not None
+    assert access.role == "PLAYER"
+    assert access.state["version"] == 3
+    assert cache.access("enc-2", "hash-1") is None
+
+    cache.states.discard_older("enc-1", version=4)
+    assert cache.access("enc-1", "hash-1") is None
+    assert cache.role("enc-1", "hash-1") == "PLAYER"
+
+
+def test_encounter_cache_credentials_take_ticket_roles_from_the_token_cache() -> None:
+    cache = EncounterCache(
+        max_entries=4, max_bytes=1024 * 1024, token_ttl_s=60, ticket_ttl_s=300, ticket_secret="secret"
+    )
+    token_hash = hash_token("player", "salt")
+    ticket = issue_ticket(encounter_id="enc-1", role="PLAYER", token_hash=token_hash, secret="secret", ttl_s=300)
+    forged = issue_ticket(encounter_id="enc-1", role="HOST", token_hash=token_hash, secret="salt", ttl_s=300)
+
+    # Until the token is known, even a valid ticket leaves the role to the database.
+    assert cache.credentials(encounter_id="enc-1", raw_token=ticket, server_salt="salt") == (token_hash, None)
+    cache.tokens.put(token_hash=token_hash, encounter_id="enc-1", role="PLAYER")
+
+    assert cache.credentials(encounter_id="enc-1", raw_token=ticket, server_salt="salt") == (token_hash, "PLAYER")
+    assert cache.credentials(encounter_id="enc-2", raw_token=ticket, server_salt="salt")[1] is None
+    assert cache.credentials(encounter_id="enc-1", raw_token="player", server_salt="salt") == (token_hash, "PLAYER")
+    assert cache.credentials(encounter_id="enc-1", raw_token=forged, server_salt="salt")[0] != token_hash
+
+    cache.revoke(token_hash)
+
+    assert cache.credentials(encounter_id="enc-1", raw_token=ticket, server_salt="salt")[1] is None
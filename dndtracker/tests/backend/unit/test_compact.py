@@ -0,0 +1,81 @@
+import gzip
+import json
+
+from dndtracker.backend.compact import Compactor, RetentionPolicy, prunable_snapshots
+from dndtracker.backend.sqlite_store import SqliteEncounterStore
+
+
+def test_prunable_snapshots_keeps_latest_span_starts_and_round_boundaries() -> None:
+    snapshots = [(1, 1), (3, 1), (6, 1), (8, 2), (9, 2), (12, 2), (14, 3), (20, 3)]
+
+    pruned = prunable_snapshots(snapshots, current_version=16, policy=RetentionPolicy(keep_every=5))
+
+    # 1, 6 and 12 open a span of 5 versions, 8 and 14 open a round, 14 is the latest live snapshot
+    # and 20 lies above the current version.
+    assert pruned == [3, 9]
+    assert prunable_snapshots([(1, 1), (6, 1), (8, 2), (12, 2), (14, 3)], 16, RetentionPolicy(keep_every=5)) == []
+
+
+def test_prunable_snapshots_can_ignore_round_boundaries() -> None:
+    snapshots = [(1, 1), (2, 2), (3, 3), (4, 4)]
+
+    policy = RetentionPolicy(keep_every=10, keep_round_boundaries=False)
+
+    pruned = prunable_snapshots(snapshots, current_version=4, policy=policy)
+
+    assert pruned == [2, 3]
+
+
+def _seed(path: str, messages: int) -> str:
+    store = SqliteEncounterStore(database_path=path, server_salt="salt", snapshot_interval=1)
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    for index in range(messages):
+        store.append_chat(encounter_id=created.encounter_id, raw_token="player-1", message=f"m{index}")
+    store.close()
+    return created.encounter_id
+
+
+def test_compactor_thins_snapshots_without_changing_replayed_state(tmp_path) -> None:
+    path = str(tmp_path / "tracker.db")
+    encounter_id = _seed(path, messages=10)
+    before = SqliteEncounterStore(database_path=path, server_salt="salt").load_state(encounter_id)
+
+    compactor = Compactor(database_url=f"sqlite:///{path}", policy=RetentionPolicy(keep_every=5), batch_size=1)
+    stats = compactor.run()
+    again = compactor.run()
+
+    store = SqliteEncounterStore(database_path=path, server_salt="salt")
+    versions = store._connection().execute("SELECT version FROM encounter_snapshots ORDER BY version").fetchall()
+    after = store.load_state(encounter_id)
+    page = store.get_chat_page(encounter_id=encounter_id, raw_token="player-1", before=None, limit=20)
+    store.close()
+
+    assert stats.encounters == 1
+    assert stats.snapshots_pruned == 7
+    assert again.snapshots_pruned == 0
+    assert versions == [(1,), (5,), (10,), (11,)]
+    assert after == before
+    assert page is not None and len(page.entries) == 10
+
+
+def test_compactor_archives_idle_encounters_to_compressed_files(tmp_path) -> None:
+    path = str(tmp_path / "tracker.db")
+    encounter_id = _seed(path, messages=2)
+    archive_dir = tmp_path / "archive"
+
+    stats = Compactor(database_url=f"sqlite:///{path}", archive_dir=str(archive_dir), archive_after_days=0).run()
+
+    with gzip.open(archive_dir / f"{encounter_id}.json.gz", "rt", encoding="utf-8") as handle:
+        archive = json.load(handle)
+    store = SqliteEncounterStore(database_path=path, server_salt="salt")
+    remaining = store._connection().execute("SELECT COUNT(*) FROM encounter_events").fetchone()[0]
+    record = store.get_encounter_state(encounter_id=encounter_id, raw_token="host-1")
+    store.close()
+
+    assert stats.archived == [encounter_id]
+    assert archive["encounter"]["current_version"] == 3
+    assert [event["event_json"]["message"] for event in archive["events"]] == ["m0", "m1"]
+    assert len(archive["tokens"]) == 2
+    assert len(archive["chat"]) == 2
+    assert remaining == 0
+    assert record is None
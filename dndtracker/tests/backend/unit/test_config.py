@@ -1,3 +1,5 @@
+import pytest
+
 from dndtracker.backend.config import load_settings
 
 
@@ -6,6 +8,35 @@ def test_load_settings_reads_expected_env(monkeypatch) -> None:
     monkeypatch.setenv("DNDTRACKER_DATABASE_URL", "postgresql://local")
     monkeypatch.setenv("DNDTRACKER_HOST", "localhost")
     monkeypatch.setenv("DNDTRACKER_PORT", "9000")
+    monkeypatch.setenv("DNDTRACKER_DB_POOL_MIN_SIZE", "2")
+    monkeypatch.setenv("DNDTRACKER_DB_POOL_MAX_SIZE", "16")
+    monkeypatch.setenv("DNDTRACKER_DB_POOL_MAX_IDLE_S", "60")
+    monkeypatch.setenv("DNDTRACKER_DB_POOL_TIMEOUT_S", "2.5")
+    monkeypatch.setenv("DNDTRACKER_WS_SEND_TIMEOUT_S", "0.5")
+    monkeypatch.setenv("DNDTRACKER_WS_SEND_QUEUE_SIZE", "0")
+    monkeypatch.setenv("DNDTRACKER_BROADCAST_BACKEND", "Postgres")
+    monkeypatch.setenv("DNDTRACKER_STATE_CACHE_ENTRIES", "32")
+    monkeypatch.setenv("DNDTRACKER_STATE_CACHE_BYTES", "1048576")
+    monkeypatch.setenv("DNDTRACKER_TOKEN_CACHE_TTL_S", "0")
+    monkeypatch.setenv("DNDTRACKER_TICKET_TTL_S", "-5")
+    monkeypatch.setenv("DNDTRACKER_WRITE_BATCH_SIZE", "0")
+    monkeypatch.setenv("DNDTRACKER_WRITE_BEHIND", "false")
+    monkeypatch.setenv("DNDTRACKER_WRITE_BEHIND_WINDOW_S", "0.2")
+    monkeypatch.setenv("DNDTRACKER_WRITE_BEHIND_MAX_EVENTS", "0")
+    monkeypatch.setenv("DNDTRACKER_WRITE_BEHIND_MAX_BUFFERED", "0")
+    monkeypatch.setenv("DNDTRACKER_SNAPSHOT_KEEP_EVERY", "0")
+    monkeypatch.setenv("DNDTRACKER_SNAPSHOT_KEEP_ROUND_BOUNDARIES", "off")
+    monkeypatch.setenv("DNDTRACKER_ARCHIVE_DIR", "/var/lib/dndtracker/archive")
+    monkeypatch.setenv("DNDTRACKER_ARCHIVE_AFTER_DAYS", "7")
+    monkeypatch.setenv("DNDTRACKER_COMPACTION_INTERVAL_S", "600")
+    monkeypatch.setenv("DNDTRACKER_METRICS", "1")
+    monkeypatch.setenv("DNDTRACKER_TICKET_SECRET", "ticket-secret")
+    monkeypatch.setenv("DNDTRACKER_TRACE_FILE", "/tmp/dndtracker-trace.json")
+    monkeypatch.setenv("DNDTRACKER_TRACE_MAX_EVENTS", "0")
+    monkeypatch.setenv("DNDTRACKER_PROFILE_DIR", "/tmp/dndtracker-profiles")
+    monkeypatch.setenv("DNDTRACKER_PROFILE_SECRET", "profile-secret")
+    monkeypatch.setenv("DNDTRACKER_PROFILE", "yes")
+    monkeypatch.setenv("DNDTRACKER_PROFILE_THRESHOLD_MS", "250")
 
     settings = load_settings()
 
@@ -13,6 +44,64 @@ def test_load_settings_reads_expected_env(monkeypatch) -> None:
     assert settings.database_url == "postgresql://local"
     assert settings.host == "localhost"
     assert settings.port == 9000
+    assert settings.db_pool_min_size == 2
+    assert settings.db_pool_max_size == 16
+    assert settings.db_pool_max_idle_s == 60.0
+    assert settings.db_pool_timeout_s == 2.5
+    assert settings.ws_send_timeout_s == 0.5
+    assert settings.ws_send_queue_size == 1
+    assert settings.broadcast_backend == "postgres"
+    assert settings.state_cache_entries == 32
+    assert settings.state_cache_bytes == 1048576
+    assert settings.token_cache_ttl_s == 0.0
+    assert settings.ticket_ttl_s == 0.0
+    assert settings.write_batch_size == 1
+    assert settings.write_behind is False
+    assert settings.write_behind_window_s == 0.2
+    assert settings.write_behind_max_events == 1
+    assert settings.write_behind_max_buffered == 1
+    assert settings.snapshot_keep_every == 1
+    assert settings.snapshot_keep_round_boundaries is False
+    assert settings.archive_dir == "/var/lib/dndtracker/archive"
+    assert settings.archive_after_days == 7.0
+    assert settings.compaction_interval_s == 600.0
+    assert settings.metrics is True
+    assert settings.ticket_secret == "ticket-secret"
+    assert settings.trace_file == "/tmp/dndtracker-trace.json"
+    assert settings.trace_max_events == 1
+    assert settings.profile_dir == "/tmp/dndtracker-profiles"
+    assert settings.profile_all is True
+    assert settings.profile_threshold_ms == 250.0
+    assert settings.profile_secret == "profile-secret"
+
+
+def test_load_settings_enables_tickets_only_with_a_shared_secret(monkeypatch) -> None:
+    monkeypatch.delenv("DNDTRACKER_TICKET_TTL_S", raising=False)
+    monkeypatch.setenv("DNDTRACKER_TICKET_SECRET", "ticket-secret")
+
+    assert load_settings().ticket_ttl_s == 300.0
+
+    monkeypatch.setenv("DNDTRACKER_TICKET_SECRET", "")
+    monkeypatch.setenv("DNDTRACKER_TICKET_TTL_S", "600")
+
+    assert load_settings().ticket_ttl_s == 0.0
+
+
+def test_load_settings_refuses_write_behind_with_more_than_one_writer(monkeypatch) -> None:
+    monkeypatch.setenv("DNDTRACKER_WRITE_BEHIND", "1")
+    monkeypatch.setenv("DNDTRACKER_BROADCAST_BACKEND", "local")
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+
+    assert load_settings().write_behind is True
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(ValueError, match="DNDTRACKER_WRITE_BEHIND"):
+        load_settings()
+
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    monkeypatch.setenv("DNDTRACKER_BROADCAST_BACKEND", "postgres")
+    with pytest.raises(ValueError, match="DNDTRACKER_WRITE_BEHIND"):
+        load_settings()
 
 
 def test_load_settings_applies_defaults(monkeypatch) -> None:
@@ -20,6 +109,23 @@ def test_load_settings_applies_defaults(monkeypatch) -> None:
     monkeypatch.delenv("DNDTRACKER_DATABASE_URL", raising=False)
     monkeypatch.delenv("DNDTRACKER_HOST", raising=False)
     monkeypatch.delenv("DNDTRACKER_PORT", raising=False)
+    monkeypatch.delenv("DNDTRACKER_DB_POOL_MIN_SIZE", raising=False)
+    monkeypatch.delenv("DNDTRACKER_DB_POOL_MAX_SIZE", raising=False)
+    monkeypatch.delenv("DNDTRACKER_DB_POOL_MAX_IDLE_S", raising=False)
+    monkeypatch.delenv("DNDTRACKER_DB_POOL_TIMEOUT_S", raising=False)
+    monkeypatch.delenv("DNDTRACKER_SNAPSHOT_INTERVAL", raising=False)
+    monkeypatch.delenv("DNDTRACKER_HISTORY_LIMIT", raising=False)
+    monkeypatch.delenv("DNDTRACKER_WS_SEND_TIMEOUT_S", raising=False)
+    monkeypatch.delenv("DNDTRACKER_BROADCAST_BACKEND", raising=False)
+    monkeypatch.delenv("DNDTRACKER_WRITE_BEHIND", raising=False)
+    monkeypatch.delenv("DNDTRACKER_ARCHIVE_DIR", raising=False)
+    monkeypatch.delenv("DNDTRACKER_COMPACTION_INTERVAL_S", raising=False)
+    monkeypatch.delenv("DNDTRACKER_METRICS", raising=False)
+    monkeypatch.delenv("DNDTRACKER_TICKET_SECRET", raising=False)
+    monkeypatch.delenv("DNDTRACKER_TRACE_FILE", raising=False)
+    monkeypatch.delenv("DNDTRACKER_PROFILE_DIR", raising=False)
+    monkeypatch.delenv("DNDTRACKER_PROFILE", raising=False)
+    monkeypatch.delenv("DNDTRACKER_PROFILE_SECRET", raising=False)
 
     settings = load_settings()
 
@@ -27,3 +133,19 @@ def test_load_settings_applies_defaults(monkeypatch) -> None:
     assert settings.database_url is None
     assert settings.host == "127.0.0.1"
     assert settings.port == 8000
+    assert settings.db_pool_min_size == 1
+    assert settings.db_pool_max_size == 10
+    assert settings.snapshot_interval == 50
+    assert settings.history_limit == 100
+    assert settings.ws_send_timeout_s == 5.0
+    assert settings.broadcast_backend == "local"
+    assert settings.write_behind is False
+    assert settings.archive_dir is None
+    assert settings.compaction_interval_s == 0.0
+    assert settings.metrics is False
+    assert settings.ticket_secret is None
+    assert settings.ticket_ttl_s == 0.0
+    assert settings.trace_file is None
+    assert settings.profile_dir is None
+    assert settings.profile_all is False
+    assert settings.profile_secret is None
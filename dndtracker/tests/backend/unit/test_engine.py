@@ -151,3 +151,46 @@ def test_apply_save_result_failure_keeps_effect() -> None:
     )
 
     assert [effect["id"] for effect in result.state["effects"]] == ["e-save"]
+
+
+def test_reducer_shares_unchanged_substructures_between_versions() -> None:
+    untimed = {"id": "aura"}
+    players = [{"id": "a", "initiative": 12}, {"id": "b", "initiative": 8}]
+    concentration = {"a": {"checkNeeded": False}}
+    state = {
+        "status": "running",
+        "round": 1,
+        "turnIndex": 1,
+        "turnOrder": ["a", "b"],
+        "players": players,
+        "concentration": concentration,
+        "effects": [untimed, {"id": "bless", "roundsRemaining": 3}],
+    }
+
+    wrapped = apply_host_action(state=state, action={"type": "NEXT_TURN"}).state
+    damaged = apply_host_action(state=wrapped, action={"type": "APPLY_DAMAGE", "actorId": "a", "damageTaken": 4}).state
+    initiative = apply_host_action(
+        state=damaged,
+        action={"type": "SET_INITIATIVE", "playerId": "b", "initiative": 15},
+    ).state
+
+    assert wrapped["players"] is players
+    assert wrapped["concentration"] is concentration
+    assert wrapped["effects"][0] is untimed
+    assert state["effects"][1] == {"id": "bless", "roundsRemaining": 3}
+    assert damaged["effects"] is wrapped["effects"]
+    assert damaged["concentration"] is not concentration
+    assert concentration == {"a": {"checkNeeded": False}}
+    assert initiative["players"][0] is players[0]
+    assert initiative["concentration"] is damaged["concentration"]
+    assert players[1] == {"id": "b", "initiative": 8}
+
+
+def test_round_end_without_timed_effects_keeps_effect_list() -> None:
+    effects = [{"id": "aura"}]
+    state = {"status": "running", "round": 1, "turnIndex": 0, "turnOrder": ["a"], "effects": effects}
+
+    result = apply_host_action(state=state, action={"type": "NEXT_TURN"})
+
+    assert result.state["round"] == 2
+    assert result.state["effects"] is effects
@@ -0,0 +1,53 @@
+from dndtracker.backend.events import _action_event, _plan_checkpoint, _plan_event, _reduce_each_action
+from dndtracker.backend.models import EncounterAccess
+from dndtracker.backend.sql import INSERT_SNAPSHOT_SQL
+from dndtracker.backend.state import build_initial_state
+
+
+def _host_access(state: dict) -> EncounterAccess:
+    return EncounterAccess(encounter_id="enc-1", role="HOST", state=state)
+
+
+def test_plan_event_snapshots_once_the_interval_is_reached() -> None:
+    access = _host_access(build_initial_state(encounter_id="enc-1", name="Keep"))
+    event = _action_event(access, {"type": "NEXT_TURN"})
+
+    pending = _plan_event(access, pending_events=0, event=event, history_limit=None, snapshot_interval=2)
+    due = _plan_event(access, pending_events=1, event=event, history_limit=None, snapshot_interval=2)
+
+    assert pending.state["version"] == due.state["version"] == 2
+    assert not pending.write_snapshot
+    assert pending.checkpoint_version == 1
+    assert INSERT_SNAPSHOT_SQL not in [sql for sql, _ in pending.statements]
+    assert due.write_snapshot
+    assert due.checkpoint_version == 2
+    assert INSERT_SNAPSHOT_SQL in [sql for sql, _ in due.statements]
+
+
+def test_reduce_each_action_tracks_the_checkpoint_across_the_run() -> None:
+    access = _host_access(build_initial_state(encounter_id="enc-1", name="Keep"))
+
+    run = _reduce_each_action(
+        access=access,
+        pending_events=0,
+        actions=[{"type": "NEXT_TURN"}] * 3,
+        history_limit=None,
+        snapshot_interval=2,
+    )
+
+    assert run.state["version"] == 4
+    assert run.pending_events == 1
+    assert run.checkpoint_version == 3
+
+
+def test_plan_checkpoint_skips_versions_that_already_have_a_snapshot() -> None:
+    initial = build_initial_state(encounter_id="enc-1", name="Keep")
+    event = _action_event(_host_access(initial), {"type": "NEXT_TURN"})
+
+    current, current_writes = _plan_checkpoint("enc-1", (initial, 1, []), history_limit=None)
+    behind, behind_writes = _plan_checkpoint("enc-1", (initial, 1, [event]), history_limit=None)
+
+    assert current["version"] == 1
+    assert current_writes == []
+    assert behind["version"] == 2
+    assert [sql for sql, _ in behind_writes] == [INSERT_SNAPSHOT_SQL]
@@ -0,0 +1,87 @@
+import random
+
+from dndtracker.backend.engine import apply_host_action
+from dndtracker.backend.indexes import EffectIndex, IndexCache, RosterIndex
+
+
+def _reference_turn_order(players: list[dict]) -> list[str]:
+    ranked = [(index, player) for index, player in enumerate(players) if isinstance(player.get("initiative"), int)]
+    ranked.sort(key=lambda item: (-item[1]["initiative"], item[0]))
+    return [player["id"] for _, player in ranked]
+
+
+def test_roster_index_keeps_turn_order_equal_to_full_sort() -> None:
+    rng = random.Random(7)
+    players = [{"id": f"p{index}"} for index in range(40)]
+    roster = RosterIndex(players)
+
+    for _ in range(300):
+        position = rng.randrange(len(players))
+        players, turn_order = roster.with_initiative(position, rng.randint(1, 20))
+
+        assert turn_order == _reference_turn_order(players)
+    assert RosterIndex(players).turn_order == roster.turn_order
+
+
+def test_effect_index_tracks_ids_and_concentration_dependents() -> None:
+    effects = [
+        {"id": "bless", "sourceActorId": "a", "requiresConcentration": True},
+        {"id": "hex", "concentrationActorId": "b", "sourceActorId": "a", "requiresConcentration": True},
+        {"id": "aura", "sourceActorId": "a"},
+    ]
+    index = EffectIndex(effects)
+
+    assert [effect["id"] for effect in index.dependents["a"]] == ["bless", "hex"]
+    assert [effect["id"] for effect in index.dependents["b"]] == ["hex"]
+
+    remaining = index.without(list(index.dependents["a"]))
+
+    assert [effect["id"] for effect in remaining] == ["aura"]
+    assert "a" not in index.dependents and "b" not in index.dependents
+    assert set(index.by_id) == {"aura"}
+    assert len(effects) == 3
+
+
+def test_index_cache_rebuilds_for_a_different_list() -> None:
+    cache = IndexCache(max_entries=1)
+    effects = [{"id": "e1"}]
+    index = cache.effects.take("enc-1", effects)
+    cache.effects.keep("enc-1", index)
+
+    assert cache.effects.take("enc-1", effects) is index
+    assert cache.effects.take("enc-1", effects) is not index
+    assert cache.effects.take("enc-1", [{"id": "e2"}]).by_id.keys() == {"e2"}
+
+
+def test_reducer_matches_linear_semantics_on_large_encounter() -> None:
+    rng = random.Random(11)
+    state = {"id": "enc-big", "status": "running", "players": [{"id": f"m{index}"} for index in range(200)]}
+    for index in range(300):
+        state = apply_host_action(
+            state,
+            {
+                "type": "ADD_EFFECT",
+                "effect": {"id": f"e{index % 250}", "sourceActorId": f"m{index % 20}", "requiresConcentration": True},
+            },
+        ).state
+    for _ in range(200):
+        roll = rng.random()
+        if roll < 0.4:
+            player_id = f"m{rng.randrange(200)}"
+            state = apply_host_action(
+                state, {"type": "SET_INITIATIVE", "playerId": player_id, "initiative": rng.randint(1, 30)}
+            ).state
+            assert state["turnOrder"] == _reference_turn_order(state["players"])
+        elif roll < 0.7:
+            effect_id = f"e{rng.randrange(260)}"
+            expected = [effect for effect in state["effects"] if effect["id"] != effect_id]
+            state = apply_host_action(state, {"type": "REMOVE_EFFECT", "effectId": effect_id}).state
+            assert state["effects"] == expected
+        else:
+            actor_id = f"m{rng.randrange(20)}"
+            state = {**state, "concentration": {actor_id: {"checkNeeded": True}}}
+            expected = [effect for effect in state["effects"] if effect["sourceActorId"] != actor_id]
+            state = apply_host_action(
+                state, {"type": "RESOLVE_CONCENTRATION_SAVE", "actorId": actor_id, "success": False}
+            ).state
+            assert state["effects"] == expected
@@ -0,0 +1,63 @@
+from dndtracker.backend.engine import apply_host_action
+from dndtracker.backend.metrics import METRICS, Gauge, Histogram
+from dndtracker.backend.store import InMemoryEncounterStore
+
+
+def test_histogram_renders_cumulative_buckets_per_label_set() -> None:
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(3.0, "/a")
+    histogram.observe(1.0, 'say "hi"')
+
+    assert list(histogram.samples()) == [
+        'demo_seconds_bucket{route="/a",le="0.1"} 1',
+        'demo_seconds_bucket{route="/a",le="1"} 2',
+        'demo_seconds_bucket{route="/a",le="+Inf"} 3',
+        'demo_seconds_sum{route="/a"} 3.55',
+        'demo_seconds_count{route="/a"} 3',
+        'demo_seconds_bucket{route="say \\"hi\\"",le="0.1"} 0',
+        'demo_seconds_bucket{route="say \\"hi\\"",le="1"} 1',
+        'demo_seconds_bucket{route="say \\"hi\\"",le="+Inf"} 1',
+        'demo_seconds_sum{route="say \\"hi\\""} 1',
+        'demo_seconds_count{route="say \\"hi\\""} 1',
+    ]
+
+
+def test_gauge_drops_removed_label_sets() -> None:
+    gauge = Gauge("demo_connections", "Demo.", ("encounter_id",))
+
+    gauge.set(2, "a")
+    gauge.set(1, "b")
+    gauge.remove("a")
+
+    assert list(gauge.samples()) == ['demo_connections{encounter_id="b"} 1']
+
+
+def test_disabled_metrics_record_nothing(monkeypatch) -> None:
+    monkeypatch.setattr(METRICS, "enabled", False)
+    METRICS.reset()
+    store = InMemoryEncounterStore(server_salt="salt")
+    created = store.create_encounter(name="Quiet", host_token="host", player_token="player")
+
+    store.apply_action(encounter_id=created.encounter_id, raw_token="host", action={"type": "NEXT_TURN"})
+
+    assert "_count" not in METRICS.render()
+
+
+def test_enabled_metrics_time_actions_and_store_stages(monkeypatch) -> None:
+    monkeypatch.setattr(METRICS, "enabled", True)
+    METRICS.reset()
+    store = InMemoryEncounterStore(server_salt="salt")
+    created = store.create_encounter(name="Timed", host_token="host", player_token="player")
+
+    store.apply_action(encounter_id=created.encounter_id, raw_token="host", action={"type": "NEXT_TURN"})
+    apply_host_action(state={"status": "running"}, action={"type": "whatever-a-client-sent"})
+
+    rendered = METRICS.render()
+    METRICS.reset()
+    assert 'dndtracker_action_seconds_count{type="NEXT_TURN"} 1' in rendered
+    assert 'dndtracker_action_seconds_count{type="OTHER"} 1' in rendered
+    assert 'dndtracker_store_stage_seconds_count{store="memory",stage="auth"} 1' in rendered
+    assert 'dndtracker_store_stage_seconds_count{store="memory",stage="reduce"} 1' in rendered
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from dndtracker.backend.migrate import (
+    MIGRATIONS,
+    RECORD_MIGRATION_SQL,
+    SNAPSHOT_PARTITIONING_VERSION,
+    migrate,
+    partition_snapshots_sql,
+    pending_migrations,
+)
+
+
+class _FakeCursor:
+    def __init__(self, connection: "_FakeConnection") -> None:
+        self.connection = connection
+
+    def execute(self, sql: str, params: tuple | None = None) -> None:
+        self.connection.commands.append(sql)
+        if sql == RECORD_MIGRATION_SQL:
+            self.connection.applied.add(params[0])
+
+    def fetchall(self) -> list[tuple]:
+        return [(version,) for version in sorted(self.connection.applied)]
+
+    def __enter__(self) -> "_FakeCursor":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+class _FakeConnection:
+    def __init__(self, applied: set[int] | None = None) -> None:
+        self.applied = set(applied or ())
+        self.commands: list[str] = []
+        self.commits = 0
+
+    def cursor(self) -> _FakeCursor:
+        return _FakeCursor(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+
+def test_migrate_applies_pending_migrations_in_order_and_records_them() -> None:
+    conn = _FakeConnection()
+
+    applied = migrate(conn)
+
+    assert applied == [migration.version for migration in MIGRATIONS]
+    assert conn.applied == {1, 2, 4}
+    assert any("CREATE TABLE IF NOT EXISTS encounters" in sql for sql in conn.commands)
+    assert any("encounter_rolls_encounter_created_idx" in sql for sql in conn.commands)
+    records = [index for index, sql in enumerate(conn.commands) if sql == RECORD_MIGRATION_SQL]
+    # Lock, read applied versions, run the migration, record it.
+    assert all("pg_advisory_xact_lock" in conn.commands[index - 3] for index in records)
+    assert conn.commits == 1 + len(records) + 1
+
+
+def test_migrate_is_idempotent() -> None:
+    conn = _FakeConnection(applied={1, 2, 4})
+
+    applied = migrate(conn)
+
+    assert applied == []
+    assert not any("CREATE INDEX" in sql for sql in conn.commands)
+
+
+def test_migrations_do_not_add_a_second_unique_index_on_token_hash(monkeypatch) -> None:
+    # Migration 1 is frozen, so it must not read db_schema.sql.
+    monkeypatch.setattr(Path, "read_text", lambda *args, **kwargs: pytest.fail("schema file read"))
+    conn = _FakeConnection()
+
+    migrate(conn)
+
+    assert "token_hash TEXT NOT NULL UNIQUE" in MIGRATIONS[0].sql()
+    assert not any("CREATE UNIQUE INDEX" in sql for sql in conn.commands)
+    assert conn.applied == {1, 2, 4}
+
+
+def test_snapshot_partitioning_is_opt_in() -> None:
+    assert [migration.version for migration in pending_migrations({1, 2, 4})] == []
+    pending = pending_migrations({1, 2, 4}, snapshot_partitions=4)
+
+    assert [migration.version for migration in pending] == [SNAPSHOT_PARTITIONING_VERSION]
+    assert pending_migrations({1, 2, SNAPSHOT_PARTITIONING_VERSION, 4}, snapshot_partitions=4) == []
+
+
+def test_partition_snapshots_sql_creates_every_hash_partition_and_copies_rows() -> None:
+    sql = partition_snapshots_sql(4)
+
+    assert "PARTITION BY HASH (encounter_id)" in sql
+    assert sql.count("PARTITION OF encounter_snapshots") == 4
+    assert "MODULUS 4, REMAINDER 3" in sql
+    assert sql.index("INSERT INTO encounter_snapshots") < sql.index("DROP TABLE encounter_snapshots_unpartitioned")
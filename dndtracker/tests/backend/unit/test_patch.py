@@ -0,0 +1,82 @@
+from dndtracker.backend.patch import apply_patch, diff_states
+from dndtracker.backend.state import build_initial_state
+from dndtracker.backend.events import _next_state_with_event
+
+
+def test_diff_of_identical_states_is_empty() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+
+    assert diff_states(state, state) == []
+    assert diff_states(state, dict(state)) == []
+
+
+def test_diff_replaces_only_changed_leaves() -> None:
+    old = {"version": 1, "meta": {"name": "S", "updatedAt": "a"}, "flag": True}
+    new = {"version": 2, "meta": {"name": "S", "updatedAt": "b"}, "flag": 1}
+
+    ops = diff_states(old, new)
+
+    assert ops == [
+        {"op": "replace", "path": "/version", "value": 2},
+        {"op": "replace", "path": "/meta/updatedAt", "value": "b"},
+        {"op": "replace", "path": "/flag", "value": 1},
+    ]
+    assert apply_patch(old, ops) == new
+
+
+def test_diff_handles_added_and_removed_keys_with_pointer_escaping() -> None:
+    old = {"concentration": {"a/b": 1, "gone": 2}}
+    new = {"concentration": {"a/b": 1, "x~y": 3}}
+
+    ops = diff_states(old, new)
+
+    assert {"op": "remove", "path": "/concentration/gone"} in ops
+    assert {"op": "add", "path": "/concentration/x~0y", "value": 3} in ops
+    assert apply_patch(old, ops) == new
+
+
+def test_diff_of_trimmed_window_drops_front_and_appends_tail() -> None:
+    old = {"log": [{"v": 1}, {"v": 2}, {"v": 3}]}
+    new = {"log": [{"v": 2}, {"v": 3}, {"v": 4}]}
+
+    ops = diff_states(old, new)
+
+    assert ops == [
+        {"op": "remove", "path": "/log/0"},
+        {"op": "add", "path": "/log/-", "value": {"v": 4}},
+    ]
+    assert apply_patch(old, ops) == new
+
+
+def test_diff_of_reordered_list_patches_elements_in_place() -> None:
+    old = {"players": [{"id": "a", "hp": 5}, {"id": "b", "hp": 7}, {"id": "c", "hp": 1}]}
+    new = {"players": [{"id": "a", "hp": 4}, {"id": "b", "hp": 7}]}
+
+    ops = diff_states(old, new)
+
+    assert ops == [
+        {"op": "replace", "path": "/players/0/hp", "value": 4},
+        {"op": "remove", "path": "/players/2"},
+    ]
+    assert apply_patch(old, ops) == new
+
+
+def test_patch_between_consecutive_encounter_states_is_small() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    for index in range(5):
+        state = _next_state_with_event(
+            state=state,
+            event={"kind": "chat", "role": "HOST", "whoLabel": "Host", "message": f"m{index}", "at": "t"},
+            history_limit=3,
+        )
+    next_state = _next_state_with_event(
+        state=state,
+        event={"kind": "chat", "role": "HOST", "whoLabel": "Host", "message": "m5", "at": "t2"},
+        history_limit=3,
+    )
+
+    ops = diff_states(state, next_state)
+
+    assert apply_patch(state, ops) == next_state
+    assert len(ops) == 6
+    assert state["chat"][-1]["text"] == "m4"
@@ -0,0 +1,117 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from dndtracker.backend.engine import apply_host_action
+from dndtracker.backend.schema import (
+    UNSET,
+    SchemaError,
+    decode_effect,
+    decode_state,
+    encode_state,
+    validate_action,
+    validate_state,
+)
+from dndtracker.backend.sql import snapshot_statement
+from dndtracker.backend.state import build_initial_state
+
+
+def test_initial_and_reduced_states_round_trip_exactly() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    state = apply_host_action(
+        state,
+        {
+            "type": "ADD_EFFECT",
+            "effect": {
+                "id": "e1",
+                "name": "Bless",
+                "roundsRemaining": 2,
+                "sourceActorId": "p1",
+                "requiresConcentration": True,
+            },
+        },
+    ).state
+    state = apply_host_action(state, {"type": "APPLY_DAMAGE", "actorId": "p1", "damageTaken": 12}).state
+
+    decoded = decode_state(state)
+
+    assert decoded.meta.name == "S"
+    assert decoded.effects[0].rounds_remaining == 2
+    assert decoded.concentration["p1"].dc == 10
+    assert encode_state(decoded) == state
+
+
+def test_unknown_keys_are_kept_and_absent_keys_stay_absent() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    state["effects"] = [{"id": "e1", "custom": {"color": "red"}}]
+    state["futureField"] = [1, 2]
+
+    decoded = decode_state(state)
+
+    assert decoded.extra == {"futureField": [1, 2]}
+    assert decoded.effects[0].extra == {"custom": {"color": "red"}}
+    assert decoded.effects[0].rounds_remaining is UNSET
+    assert encode_state(decoded) == state
+
+
+def test_invalid_state_reports_path() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    state["players"] = [{"id": "p1", "initiative": "high"}]
+
+    with pytest.raises(SchemaError, match=r"state\.players\[0\]\.initiative"):
+        validate_state(state)
+
+    with pytest.raises(SchemaError, match="required"):
+        validate_state({"id": "enc-1"})
+
+
+def test_effect_rejects_booleans_as_rounds() -> None:
+    with pytest.raises(SchemaError):
+        decode_effect({"id": "e1", "roundsRemaining": True})
+
+
+def test_validated_state_is_rebuilt_from_the_model() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+
+    validated = validate_state(state)
+
+    assert validated == state
+    assert validated is not state
+
+
+def test_snapshots_are_written_from_the_model() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="S")
+    state["round"] = "two"
+
+    with pytest.raises(SchemaError, match=r"state\.round"):
+        snapshot_statement(encounter_id="enc-1", state=state, now=datetime.now(timezone.utc))
+
+
+def test_validate_action_returns_valid_actions_rebuilt_from_the_model() -> None:
+    action = {"type": "ADD_EFFECT", "effect": {"id": "e1", "roundsRemaining": 1}}
+
+    assert validate_action(action) == action
+    assert validate_action({"type": "NEXT_TURN"}) == {"type": "NEXT_TURN"}
+    assert validate_action({"type": "set_initiative", "playerId": "p1", "initiative": 12})["initiative"] == 12
+    with pytest.raises(SchemaError, match="action.effect"):
+        validate_action({"type": "add_effect", "effect": "Bless"})
+
+
+@pytest.mark.parametrize(
+    ("action", "where"),
+    [
+        ({"type": "APPLY_DAMAGE", "actorId": "a1", "damageTaken": "abc"}, "action.damageTaken"),
+        ({"type": "APPLY_DAMAGE", "actorId": "a1", "damageTaken": -3}, "action.damageTaken"),
+        ({"type": "APPLY_DAMAGE", "damageTaken": 4}, "action.actorId"),
+        ({"type": "SET_INITIATIVE", "playerId": "p1", "initiative": 100}, "action.initiative"),
+        ({"type": "SET_INITIATIVE", "playerId": 7, "initiative": 10}, "action.playerId"),
+        ({"type": "REMOVE_EFFECT"}, "action.effectId"),
+        ({"type": "RESOLVE_CONCENTRATION_SAVE", "actorId": "a1", "success": "yes"}, "action.success"),
+        ({"type": "APPLY_SAVE_RESULT", "effectId": "e1"}, "action.success"),
+        ({"type": "TELEPORT"}, "action.type"),
+        ({"type": 3}, "action.type"),
+    ],
+)
+def test_validate_action_rejects_bad_fields_of_every_action_type(action: dict, where: str) -> None:
+    with pytest.raises(SchemaError, match=where.replace(".", r"\.")):
+        validate_action(action)
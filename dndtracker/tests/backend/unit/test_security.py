@@ -1,4 +1,13 @@
-from dndtracker.backend.security import generate_token, hash_token, verify_token
+import pytest
+
+from dndtracker.backend.security import (
+    generate_token,
+    hash_token,
+    issue_ticket,
+    read_ticket,
+    ticket_expires_at,
+    verify_token,
+)
 
 
 def test_hash_token_is_deterministic_for_same_inputs() -> None:
@@ -27,3 +36,44 @@ def test_generate_token_returns_non_empty_random_value() -> None:
     assert first
     assert second
     assert first != second
+
+
+def test_session_ticket_round_trips_claims_until_expiry() -> None:
+    ticket = issue_ticket(
+        encounter_id="enc-1",
+        role="PLAYER",
+        token_hash="abc",
+        secret="secret",
+        ttl_s=60,
+        now=1000.0,
+    )
+
+    claims = read_ticket(ticket, "secret", now=1030.0)
+
+    assert claims is not None
+    assert (claims.encounter_id, claims.role, claims.token_hash) == ("enc-1", "PLAYER", "abc")
+    assert ticket_expires_at(ticket) == 1060.0
+    assert read_ticket(ticket, "secret", now=1060.0) is None
+
+
+def test_session_ticket_rejects_tampering_other_secrets_and_raw_tokens() -> None:
+    ticket = issue_ticket(encounter_id="enc-1", role="PLAYER", token_hash="abc", secret="secret", ttl_s=60)
+    prefix, payload, signature = ticket[:4], *ticket[4:].split(".")
+    forged = issue_ticket(encounter_id="enc-1", role="HOST", token_hash="abc", secret="secret", ttl_s=60)
+    forged_payload = forged[4:].split(".")[0]
+
+    assert read_ticket(f"{prefix}{forged_payload}.{signature}", "secret") is None
+    assert read_ticket(ticket, "other-secret") is None
+    assert read_ticket(f"{prefix}{payload}", "secret") is None
+    assert read_ticket("st1.ünïcode.x", "secret") is None
+    assert read_ticket(generate_token(), "secret") is None
+
+
+def test_session_tickets_need_a_secret_and_a_positive_ttl() -> None:
+    with pytest.raises(ValueError):
+        issue_ticket(encounter_id="enc-1", role="HOST", token_hash="abc", secret="", ttl_s=60)
+    with pytest.raises(ValueError):
+        issue_ticket(encounter_id="enc-1", role="HOST", token_hash="abc", secret="secret", ttl_s=0)
+
+    ticket = issue_ticket(encounter_id="enc-1", role="HOST", token_hash="abc", secret="secret", ttl_s=60)
+    assert read_ticket(ticket, "") is None
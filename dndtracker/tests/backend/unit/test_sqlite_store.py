@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from dndtracker.backend.async_store import ThreadedEncounterStore, create_async_store
+from dndtracker.backend.sqlite_store import SqliteEncounterStore, sqlite_path
+from dndtracker.backend.store import create_store
+
+
+def test_create_store_selects_sqlite_by_url(tmp_path) -> None:
+    store = create_store(database_url=f"sqlite:///{tmp_path}/tracker.db", server_salt="salt", snapshot_interval=7)
+    async_store = create_async_store(database_url="sqlite:///tracker.db", server_salt="salt")
+
+    assert isinstance(store, SqliteEncounterStore)
+    assert store.database_path == f"{tmp_path}/tracker.db"
+    assert store.snapshot_interval == 7
+    assert isinstance(async_store, ThreadedEncounterStore)
+    assert isinstance(async_store.store, SqliteEncounterStore)
+
+
+def test_sqlite_path_parses_relative_absolute_and_memory_urls() -> None:
+    assert sqlite_path("sqlite:///tracker.db") == "tracker.db"
+    assert sqlite_path("sqlite:////var/lib/tracker.db") == "/var/lib/tracker.db"
+    assert sqlite_path("sqlite:///") == ":memory:"
+    with pytest.raises(ValueError):
+        sqlite_path("postgresql://local")
+
+
+def test_sqlite_store_uses_wal_and_survives_reopen(tmp_path) -> None:
+    path = str(tmp_path / "tracker.db")
+    store = SqliteEncounterStore(database_path=path, server_salt="salt", snapshot_interval=2)
+    store.open()
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    store.register_player(encounter_id=created.encounter_id, raw_token="player-1", name="Mira")
+    store.append_roll(encounter_id=created.encounter_id, raw_token="player-1", roll={"kind": "d20", "value": 12})
+    last = store.append_chat(encounter_id=created.encounter_id, raw_token="host-1", message="hi")
+    journal_mode = store._connection().execute("PRAGMA journal_mode").fetchone()[0]
+    store.close()
+
+    reopened = SqliteEncounterStore(database_path=path, server_salt="salt", snapshot_interval=2)
+    record = reopened.get_encounter_state(encounter_id=created.encounter_id, raw_token="player-1")
+    reopened.close()
+
+    assert journal_mode == "wal"
+    assert last is not None
+    assert record is not None
+    assert record.state == last
+    assert record.state["version"] == 4
+    assert record.state["players"][0]["name"] == "Mira"
+
+
+def test_sqlite_store_enforces_roles_and_rejects_unknown_tokens(tmp_path) -> None:
+    store = SqliteEncounterStore(database_path=str(tmp_path / "tracker.db"), server_salt="salt")
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+
+    forbidden = store.apply_action(
+        encounter_id=created.encounter_id,
+        raw_token="player-1",
+        action={"type": "NEXT_TURN"},
+    )
+    assert forbidden is None
+    assert store.append_chat(encounter_id=created.encounter_id, raw_token="nope", message="hi") is None
+    assert store.get_log_page(encounter_id=created.encounter_id, raw_token="nope", before=None, limit=5) is None
+    state = store.apply_action(encounter_id=created.encounter_id, raw_token="host-1", action={"type": "NEXT_TURN"})
+    store.close()
+
+    assert state is not None
+    assert state["version"] == 2
+
+
+def test_sqlite_store_applies_batches_and_pages_history(tmp_path) -> None:
+    store = SqliteEncounterStore(database_path=str(tmp_path / "tracker.db"), server_salt="salt", history_limit=2)
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    for index in range(4):
+        store.append_chat(encounter_id=created.encounter_id, raw_token="player-1", message=f"m{index}")
+    batch = store.apply_actions(
+        encounter_id=created.encounter_id,
+        raw_token="host-1",
+        actions=[{"type": "NEXT_TURN"}, {"type": "NEXT_TURN"}],
+    )
+    chat = store.get_chat_page(encounter_id=created.encounter_id, raw_token="player-1", before=4, limit=2)
+    log = store.get_log_page(encounter_id=created.encounter_id, raw_token="host-1", before=None, limit=1)
+    store.close()
+
+    assert batch is not None
+    assert batch.state["version"] == 6
+    assert len(batch.engine_events) == 2
+    assert chat is not None
+    assert [entry["text"] for entry in chat.entries] == ["m0", "m1"]
+    assert chat.next_before is None
+    assert log is not None
+    assert {entry["version"] for entry in log.entries} == {6}
+    assert log.next_before == 6
+
+
+def test_sqlite_store_applies_each_action_as_its_own_version(tmp_path) -> None:
+    path = str(tmp_path / "tracker.db")
+    store = SqliteEncounterStore(database_path=path, server_salt="salt")
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    actions = [{"type": "NEXT_TURN"}, {"type": "NEXT_TURN"}, {"type": "NEXT_TURN"}]
+    refused = store.apply_each_action(encounter_id=created.encounter_id, raw_token="player-1", actions=actions)
+    results = store.apply_each_action(encounter_id=created.encounter_id, raw_token="host-1", actions=actions)
+    log = store.get_log_page(encounter_id=created.encounter_id, raw_token="host-1", before=None, limit=10)
+    store.close()
+    reopened = SqliteEncounterStore(database_path=path, server_salt="salt")
+    state = reopened.load_state(encounter_id=created.encounter_id)
+    reopened.close()
+
+    assert refused == [None, None, None]
+    assert [result["version"] for result in results] == [2, 3, 4]
+    assert log is not None
+    assert [entry["version"] for entry in log.entries if entry["kind"] == "action"] == [2, 3, 4]
+    assert state is not None
+    assert state == results[-1]
+
+
+def test_sqlite_store_checkpoint_and_load_state_replay_from_file(tmp_path) -> None:
+    path = str(tmp_path / "tracker.db")
+    store = SqliteEncounterStore(database_path=path, server_salt="salt")
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    store.append_chat(encounter_id=created.encounter_id, raw_token="host-1", message="hi")
+
+    assert store.checkpoint(created.encounter_id) == 2
+    assert store.checkpoint("missing") is None
+    store.close()
+
+    fresh = SqliteEncounterStore(database_path=path, server_salt="salt")
+    state = fresh.load_state(created.encounter_id)
+    snapshots = fresh._connection().execute("SELECT version FROM encounter_snapshots ORDER BY version").fetchall()
+    fresh.close()
+
+    assert state is not None
+    assert state["chat"][-1]["text"] == "hi"
+    assert snapshots == [(1,), (2,)]
+
+
+def test_threaded_sqlite_store_round_trip(tmp_path) -> None:
+    async def scenario() -> dict | None:
+        store = create_async_store(database_url=f"sqlite:///{tmp_path}/tracker.db", server_salt="salt")
+        await store.open()
+        created = await store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+        state = await store.append_chat(encounter_id=created.encounter_id, raw_token="player-1", message="hi")
+        await store.close()
+        return state
+
+    state = asyncio.run(scenario())
+
+    assert state is not None
+    assert state["version"] == 2
@@ -1,4 +1,15 @@
+import json
+
+from dndtracker.backend.events import (
+    _action_event,
+    _chat_event,
+    _next_state_with_event,
+    _player_registered_event,
+    _replay_checkpoint,
+)
 from dndtracker.backend.models import EncounterAccess
+from dndtracker.backend.security import hash_token, issue_ticket
+from dndtracker.backend.state import build_initial_state
 from dndtracker.backend.store import InMemoryEncounterStore, PostgresEncounterStore, create_store
 
 
@@ -8,6 +19,22 @@ def test_create_store_returns_postgres_store_when_database_url_present() -> None
     assert isinstance(store, PostgresEncounterStore)
 
 
+def test_create_store_passes_pool_settings_to_postgres_store() -> None:
+    store = create_store(
+        database_url="postgresql://local",
+        server_salt="salt",
+        pool_min_size=2,
+        pool_max_size=8,
+        pool_max_idle_s=30.0,
+        pool_timeout_s=1.5,
+    )
+
+    assert isinstance(store, PostgresEncounterStore)
+    assert store.pooled is True
+    assert (store.pool_min_size, store.pool_max_size) == (2, 8)
+    assert (store.pool_max_idle_s, store.pool_timeout_s) == (30.0, 1.5)
+
+
 def test_create_store_returns_in_memory_store_when_database_url_missing() -> None:
     store = create_store(database_url=None, server_salt="salt")
 
@@ -71,13 +98,57 @@ def test_in_memory_store_accepts_roll_and_chat_for_player() -> None:
     assert chat_state["log"][-1]["kind"] == "chat"
 
 
+def test_in_memory_store_bounds_live_history_and_pages_older_entries() -> None:
+    store = InMemoryEncounterStore(server_salt="salt", history_limit=3)
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    for index in range(6):
+        state = store.append_chat(encounter_id=created.encounter_id, raw_token="player-1", message=f"m{index}")
+
+    assert state is not None
+    assert [entry["text"] for entry in state["chat"]] == ["m3", "m4", "m5"]
+    assert [entry["version"] for entry in state["log"]] == [5, 6, 7]
+
+    first = store.get_chat_page(encounter_id=created.encounter_id, raw_token="player-1", before=5, limit=2)
+    second = store.get_chat_page(encounter_id=created.encounter_id, raw_token="player-1", before=3, limit=2)
+
+    assert first is not None and second is not None
+    assert [entry["text"] for entry in first.entries] == ["m1", "m2"]
+    assert first.next_before == 3
+    assert [entry["text"] for entry in second.entries] == ["m0"]
+    assert second.next_before is None
+
+
+def test_in_memory_log_page_keeps_engine_events_with_their_action() -> None:
+    store = InMemoryEncounterStore(server_salt="salt", history_limit=2)
+    created = store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    store.apply_action(encounter_id=created.encounter_id, raw_token="host-1", action={"type": "NEXT_TURN"})
+    store.append_chat(encounter_id=created.encounter_id, raw_token="host-1", message="hi")
+
+    page = store.get_log_page(encounter_id=created.encounter_id, raw_token="player-1", before=3, limit=1)
+    denied = store.get_log_page(encounter_id=created.encounter_id, raw_token="nope", before=None, limit=1)
+
+    assert page is not None
+    assert [entry["kind"] for entry in page.entries] == ["action", "timing"]
+    assert {entry["version"] for entry in page.entries} == {2}
+    assert page.next_before is None
+    assert denied is None
+
+
 class _FakeCursor:
-    def __init__(self) -> None:
+    def __init__(self, row: tuple | None = None, rows: list[tuple] | None = None) -> None:
         self.commands: list[tuple[str, tuple]] = []
+        self.row = row
+        self.rows = rows or []
 
     def execute(self, sql: str, params: tuple) -> None:
         self.commands.append((sql, params))
 
+    def fetchone(self) -> tuple | None:
+        return self.row
+
+    def fetchall(self) -> list[tuple]:
+        return self.rows
+
     def __enter__(self) -> "_FakeCursor":
         return self
 
@@ -86,8 +157,8 @@ class _FakeCursor:
 
 
 class _FakeConnection:
-    def __init__(self) -> None:
-        self.cursor_instance = _FakeCursor()
+    def __init__(self, row: tuple | None = None, rows: list[tuple] | None = None) -> None:
+        self.cursor_instance = _FakeCursor(row=row, rows=rows)
         self.committed = False
 
     def cursor(self) -> _FakeCursor:
@@ -104,17 +175,16 @@ class _FakeConnection:
 
 
 class _PostgresStoreWithFakeConnection(PostgresEncounterStore):
-    def __init__(self) -> None:
-        super().__init__(database_url="postgresql://local", server_salt="salt")
-        self.fake_connection = _FakeConnection()
+    def __init__(self, row: tuple | None = None, rows: list[tuple] | None = None, **options) -> None:
+        super().__init__(database_url="postgresql://local", server_salt="salt", **options)
+        self.fake_connection = _FakeConnection(row=row, rows=rows)
 
     def _connect(self) -> _FakeConnection:
         return self.fake_connection
 
 
-def test_postgres_apply_action_persists_snapshot_and_updates_version() -> None:
-    store = _PostgresStoreWithFakeConnection()
-    state = {
+def _postgres_state() -> dict:
+    return {
         "id": "enc-1",
         "version": 1,
         "status": "setup",
@@ -131,28 +201,420 @@ def test_postgres_apply_action_persists_snapshot_and_updates_version() -> None:
         "log": [],
     }
 
-    store.get_encounter_access = lambda encounter_id, raw_token: EncounterAccess(
-        encounter_id="enc-1",
-        role="HOST",
-        state=state,
-    )
+
+def test_postgres_apply_action_persists_snapshot_and_updates_version() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []))
 
     next_state = store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
 
+    commands = store.fake_connection.cursor_instance.commands
     assert next_state is not None
     assert next_state["version"] == 2
     assert next_state["status"] == "running"
     assert store.fake_connection.committed is True
-    assert len(store.fake_connection.cursor_instance.commands) == 2
-    assert "INSERT INTO encounter_snapshots" in store.fake_connection.cursor_instance.commands[0][0]
-    assert "UPDATE encounters" in store.fake_connection.cursor_instance.commands[1][0]
+    assert len(commands) == 3
+    assert "FOR UPDATE OF e" in commands[0][0]
+    assert "INSERT INTO encounter_events" in commands[1][0]
+    assert "UPDATE encounters" in commands[2][0]
+
+
+def test_postgres_apply_actions_writes_one_event_for_the_whole_batch() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []))
+    actions = [
+        {"type": "ADD_EFFECT", "effect": {"id": "e1", "name": "Bless"}},
+        {"type": "NEXT_TURN"},
+        {"type": "REMOVE_EFFECT", "effectId": "missing"},
+    ]
+
+    result = store.apply_actions(encounter_id="enc-1", raw_token="host", actions=actions)
+
+    commands = store.fake_connection.cursor_instance.commands
+    assert result is not None
+    assert result.state["version"] == 2
+    assert [effect["id"] for effect in result.state["effects"]] == ["e1"]
+    assert result.state["turnIndex"] == 1
+    assert [[event["kind"] for event in events] for events in result.engine_events] == [
+        ["effect_added"],
+        ["timing", "timing"],
+        [],
+    ]
+    assert len(commands) == 3
+    assert "INSERT INTO encounter_events" in commands[1][0]
+    assert json.loads(commands[1][1][4])["kind"] == "action_batch"
+
+
+def test_postgres_apply_each_action_writes_one_version_per_action_in_one_transaction() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []), snapshot_interval=2)
+
+    results = store.apply_each_action(
+        encounter_id="enc-1",
+        raw_token="host",
+        actions=[{"type": "NEXT_TURN"}, {"type": "NEXT_TURN"}],
+    )
+
+    commands = store.fake_connection.cursor_instance.commands
+    events = [json.loads(params[4]) for sql, params in commands if "INSERT INTO encounter_events" in sql]
+    snapshots = [params for sql, params in commands if "INSERT INTO encounter_snapshots" in sql]
+    assert [state["version"] for state in results] == [2, 3]
+    assert [event["kind"] for event in events] == ["action", "action"]
+    assert len(snapshots) == 1
+    assert store.fake_connection.committed is True
+    assert store.load_state("enc-1") is results[-1]
+
+
+def test_replay_applies_every_action_of_a_stored_batch() -> None:
+    batch = {
+        "kind": "action_batch",
+        "role": "HOST",
+        "actions": [{"type": "NEXT_TURN"}, {"type": "NEXT_TURN"}],
+        "at": "2024-01-01T00:00:01+00:00",
+    }
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, [batch]))
+
+    access = store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+
+    assert access is not None
+    assert access.state["version"] == 2
+    assert access.state["round"] == 2
+    assert access.state["log"][-1]["actionIndex"] == 1
+
+
+def test_postgres_apply_action_rejects_unknown_token() -> None:
+    store = _PostgresStoreWithFakeConnection(row=None)
+
+    next_state = store.apply_action(encounter_id="enc-1", raw_token="player", action={"type": "NEXT_TURN"})
+
+    assert next_state is None
+    assert store.fake_connection.committed is False
+    assert len(store.fake_connection.cursor_instance.commands) == 1
 
 
 def test_postgres_apply_action_rejects_non_host() -> None:
-    store = _PostgresStoreWithFakeConnection()
-    store.get_encounter_access = lambda encounter_id, raw_token: None
+    store = _PostgresStoreWithFakeConnection(row=("PLAYER", _postgres_state(), 1, []))
 
     next_state = store.apply_action(encounter_id="enc-1", raw_token="player", action={"type": "NEXT_TURN"})
 
     assert next_state is None
     assert store.fake_connection.committed is False
+    assert len(store.fake_connection.cursor_instance.commands) == 1
+
+
+def test_postgres_get_encounter_access_does_not_lock() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("PLAYER", json.dumps(_postgres_state()), 1, "[]"))
+
+    access = store.get_encounter_access(encounter_id="enc-1", raw_token="player")
+
+    assert access is not None
+    assert access.role == "PLAYER"
+    assert access.state["version"] == 1
+    assert "FOR UPDATE" not in store.fake_connection.cursor_instance.commands[0][0]
+
+
+def _recorded_events(state: dict) -> tuple[dict, list[dict]]:
+    host = EncounterAccess(encounter_id=state["id"], role="HOST", state=state)
+    player = EncounterAccess(encounter_id=state["id"], role="PLAYER", state=state)
+    events = [
+        _player_registered_event(player, "Mira"),
+        _chat_event(player, "ready"),
+        _action_event(host, {"type": "ADD_EFFECT", "effect": {"id": "bless", "roundsRemaining": 1}}),
+        _action_event(host, {"type": "NEXT_TURN"}),
+    ]
+    for event in events:
+        state = _next_state_with_event(state=state, event=event)
+    return state, events
+
+
+def test_reduced_states_share_history_entries_and_untouched_fields() -> None:
+    state = build_initial_state(encounter_id="enc-1", name="Session")
+    versions = [state]
+    host = EncounterAccess(encounter_id="enc-1", role="HOST", state=state)
+    for index in range(6):
+        versions.append(_next_state_with_event(state=versions[-1], event=_chat_event(host, f"m{index}"), history_limit=4))
+
+    previous, latest = versions[-2], versions[-1]
+    assert [entry["text"] for entry in latest["chat"]] == ["m2", "m3", "m4", "m5"]
+    assert all(a is b for a, b in zip(latest["chat"], previous["chat"][1:]))
+    assert all(a is b for a, b in zip(latest["log"], previous["log"][1:]))
+    assert latest["players"] is state["players"]
+    assert [entry["text"] for entry in versions[3]["chat"]] == ["m0", "m1", "m2"]
+
+
+def test_replay_checkpoint_rebuilds_identical_state_from_events() -> None:
+    initial = build_initial_state(encounter_id="enc-1", name="Session")
+    expected, events = _recorded_events(initial)
+
+    state, pending_events = _replay_checkpoint((json.dumps(initial), 1, json.dumps(events)))
+
+    assert state == expected
+    assert pending_events == 4
+
+
+def test_postgres_mutation_writes_snapshot_when_interval_reached() -> None:
+    initial = build_initial_state(encounter_id="enc-1", name="Session")
+    checkpoint_state, events = _recorded_events(initial)
+    store = _PostgresStoreWithFakeConnection(row=("HOST", initial, 1, events))
+    store.snapshot_interval = 5
+
+    next_state = store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
+
+    commands = store.fake_connection.cursor_instance.commands
+    assert next_state is not None
+    assert next_state["version"] == checkpoint_state["version"] + 1
+    assert [sql.split()[0:3] for sql, _ in commands[1:]] == [
+        ["INSERT", "INTO", "encounter_events"],
+        ["INSERT", "INTO", "encounter_snapshots"],
+        ["UPDATE", "encounters", "SET"],
+    ]
+    assert json.loads(commands[2][1][4]) == next_state
+
+
+def test_postgres_checkpoint_snapshots_only_when_events_pending() -> None:
+    initial = build_initial_state(encounter_id="enc-1", name="Session")
+    expected, events = _recorded_events(initial)
+    pending = _PostgresStoreWithFakeConnection(row=(initial, 1, events))
+    current = _PostgresStoreWithFakeConnection(row=(expected, expected["version"], []))
+
+    assert pending.checkpoint("enc-1") == expected["version"]
+    assert current.checkpoint("enc-1") == expected["version"]
+    assert "INSERT INTO encounter_snapshots" in pending.fake_connection.cursor_instance.commands[1][0]
+    assert len(current.fake_connection.cursor_instance.commands) == 1
+
+
+def test_postgres_load_state_replays_without_token_or_lock() -> None:
+    initial = build_initial_state(encounter_id="enc-1", name="Session")
+    expected, events = _recorded_events(initial)
+    store = _PostgresStoreWithFakeConnection(row=(initial, 1, events))
+
+    assert store.load_state("enc-1") == expected
+    sql, params = store.fake_connection.cursor_instance.commands[0]
+    assert "FOR UPDATE" not in sql
+    assert "encounter_tokens" not in sql
+    assert params == ("enc-1",)
+
+
+def test_postgres_reads_of_hot_encounter_are_served_from_cache() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("PLAYER", _postgres_state(), 1, []))
+
+    first = store.get_encounter_access(encounter_id="enc-1", raw_token="player")
+    second = store.get_encounter_access(encounter_id="enc-1", raw_token="player")
+    other_token = store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+
+    assert first is not None and second is not None
+    assert second.state is first.state
+    assert store.load_state("enc-1") == first.state
+    assert other_token is not None
+    assert len(store.fake_connection.cursor_instance.commands) == 2
+
+
+def test_postgres_mutation_on_cached_state_only_locks_version() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []))
+    store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+    cursor = store.fake_connection.cursor_instance
+    cursor.commands.clear()
+    cursor.row = ("HOST", 1)
+
+    next_state = store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
+
+    assert next_state is not None
+    assert next_state["version"] == 2
+    assert cursor.commands[0][0].split()[0:4] == ["SELECT", "t.role,", "e.current_version", "FROM"]
+    assert "FOR UPDATE OF e" in cursor.commands[0][0]
+    assert store.get_encounter_access(encounter_id="enc-1", raw_token="host").state is next_state
+    assert len(cursor.commands) == 3
+
+
+def test_postgres_mutation_reloads_when_cached_version_is_stale() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []))
+    store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+    cursor = store.fake_connection.cursor_instance
+    cursor.commands.clear()
+    cursor.row = ("HOST", 3)
+
+    def fetchone() -> tuple:
+        if len(cursor.commands) == 1:
+            return ("HOST", 3)
+        return ("HOST", {**_postgres_state(), "version": 3}, 3, [])
+
+    cursor.fetchone = fetchone
+    next_state = store.apply_action(encounter_id="enc-1", raw_token="host", action={"type": "NEXT_TURN"})
+
+    assert next_state is not None
+    assert next_state["version"] == 4
+    assert "t.role," in cursor.commands[1][0] and "json_agg" in cursor.commands[1][0]
+
+
+def test_postgres_invalidate_drops_state_older_than_remote_version() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []))
+    store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+
+    store.invalidate(encounter_id="enc-1", version=1)
+    store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+    assert len(store.fake_connection.cursor_instance.commands) == 1
+
+    store.invalidate(encounter_id="enc-1", version=2)
+    store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+    assert len(store.fake_connection.cursor_instance.commands) == 2
+
+
+def test_postgres_log_page_reads_event_rows_and_reports_next_cursor() -> None:
+    rows = [
+        (9, [{"kind": "action", "version": 9}, {"kind": "timing", "version": 9}]),
+        (8, json.dumps([{"kind": "chat", "version": 8}])),
+        (7, [{"kind": "roll", "version": 7}]),
+    ]
+    store = _PostgresStoreWithFakeConnection(row=("PLAYER",), rows=rows)
+
+    page = store.get_log_page(encounter_id="enc-1", raw_token="player", before=10, limit=2)
+
+    commands = store.fake_connection.cursor_instance.commands
+    assert page is not None
+    assert [(entry["kind"], entry["version"]) for entry in page.entries] == [("chat", 8), ("action", 9), ("timing", 9)]
+    assert page.next_before == 8
+    assert "FROM encounter_events" in commands[1][0]
+    assert commands[1][1] == ("enc-1", 10, 10, 3)
+
+
+def test_postgres_chat_page_rejects_unknown_token() -> None:
+    store = _PostgresStoreWithFakeConnection(row=None)
+
+    assert store.get_chat_page(encounter_id="enc-1", raw_token="nope", before=None, limit=10) is None
+    assert len(store.fake_connection.cursor_instance.commands) == 1
+
+
+class _FakePool:
+    def __init__(self, connection: _FakeConnection) -> None:
+        self.connection_instance = connection
+        self.checkouts = 0
+        self.closed = False
+
+    def connection(self) -> _FakeConnection:
+        self.checkouts += 1
+        return self.connection_instance
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_postgres_store_is_unpooled_by_default() -> None:
+    store = PostgresEncounterStore(database_url="postgresql://local", server_salt="salt")
+
+    assert store.pooled is False
+    store.close()
+
+
+def test_postgres_pooled_store_checks_out_pool_connections_and_closes_pool() -> None:
+    store = PostgresEncounterStore(database_url="postgresql://local", server_salt="salt", pool_max_size=4)
+    pool = _FakePool(_FakeConnection())
+    store._pool = pool
+
+    store.create_encounter(name="Session", host_token="host-1", player_token="player-1")
+    store.close()
+
+    assert pool.checkouts == 1
+    assert pool.connection_instance.committed is True
+    assert pool.closed is True
+    assert store._pool is None
+
+
+def test_in_memory_store_indexes_tokens_across_encounters() -> None:
+    store = InMemoryEncounterStore(server_salt="salt")
+    first = store.create_encounter(name="A", host_token="host-a", player_token="player-a")
+    second = store.create_encounter(name="B", host_token="host-b", player_token="player-b")
+
+    access = store.get_encounter_access(encounter_id=second.encounter_id, raw_token="player-b")
+
+    assert access is not None and access.role == "PLAYER"
+    assert access.ticket is None
+    assert store.get_encounter_access(encounter_id=second.encounter_id, raw_token="player-a") is None
+    assert store.get_encounter_access(encounter_id=first.encounter_id, raw_token="host-b") is None
+
+
+def test_in_memory_store_issues_session_tickets_scoped_to_one_encounter() -> None:
+    store = InMemoryEncounterStore(server_salt="salt", ticket_ttl_s=300)
+    created = store.create_encounter(name="A", host_token="host-a", player_token="player-a")
+    other = store.create_encounter(name="B", host_token="host-b", player_token="player-b")
+
+    access = store.get_encounter_access(encounter_id=created.encounter_id, raw_token="host-a")
+    assert access is not None and access.ticket is not None
+    ticket = access.ticket
+
+    by_ticket = store.get_encounter_access(encounter_id=created.encounter_id, raw_token=ticket)
+    state = store.apply_action(encounter_id=created.encounter_id, raw_token=ticket, action={"type": "NEXT_TURN"})
+
+    assert by_ticket is not None and by_ticket.role == "HOST"
+    assert by_ticket.ticket is None
+    assert state is not None and state["version"] == 2
+    assert store.get_encounter_access(encounter_id=other.encounter_id, raw_token=ticket) is None
+
+
+def test_in_memory_store_reads_by_ticket_without_hashing(monkeypatch) -> None:
+    from dndtracker.backend import store as store_module
+
+    store = InMemoryEncounterStore(server_salt="salt", ticket_ttl_s=300)
+    created = store.create_encounter(name="A", host_token="host-a", player_token="player-a")
+    access = store.get_encounter_access(encounter_id=created.encounter_id, raw_token="host-a")
+    assert access is not None and access.ticket is not None
+    hashed: list[str] = []
+    real_hash = store_module.hash_token
+    monkeypatch.setattr(store_module, "hash_token", lambda raw, salt: hashed.append(raw) or real_hash(raw, salt))
+
+    by_ticket = store.get_encounter_access(encounter_id=created.encounter_id, raw_token=access.ticket)
+
+    assert by_ticket is not None and by_ticket.role == "HOST"
+    assert hashed == []
+
+
+def test_in_memory_store_refuses_forged_and_disabled_tickets() -> None:
+    store = InMemoryEncounterStore(server_salt="salt", ticket_ttl_s=300, ticket_secret="secret")
+    created = store.create_encounter(name="A", host_token="host-a", player_token="player-a")
+    salted = issue_ticket(
+        encounter_id=created.encounter_id, role="HOST", token_hash="whatever", secret="salt", ttl_s=300
+    )
+    unknown_token = issue_ticket(
+        encounter_id=created.encounter_id, role="HOST", token_hash="whatever", secret="secret", ttl_s=300
+    )
+    player_hash = hash_token("player-a", "salt")
+    promoted = issue_ticket(
+        encounter_id=created.encounter_id, role="HOST", token_hash=player_hash, secret="secret", ttl_s=300
+    )
+    disabled = InMemoryEncounterStore(server_salt="salt", ticket_secret="secret")
+    off = disabled.create_encounter(name="B", host_token="host-b", player_token="player-b")
+    host_b = issue_ticket(
+        encounter_id=off.encounter_id, role="HOST", token_hash=hash_token("host-b", "salt"), secret="secret", ttl_s=300
+    )
+
+    for ticket in (salted, unknown_token):
+        action = {"type": "NEXT_TURN"}
+        assert store.apply_action(encounter_id=created.encounter_id, raw_token=ticket, action=action) is None
+    # The role comes from the token the ticket names, not from the ticket's own claim.
+    promoted_access = store.get_encounter_access(encounter_id=created.encounter_id, raw_token=promoted)
+    assert promoted_access is not None and promoted_access.role == "PLAYER"
+    assert disabled.get_encounter_access(encounter_id=off.encounter_id, raw_token=host_b) is None
+
+
+def test_postgres_ticket_reads_recheck_revocation_once_the_token_cache_expires() -> None:
+    store = _PostgresStoreWithFakeConnection(
+        row=("HOST", _postgres_state(), 1, []), ticket_ttl_s=300, token_cache_ttl_s=0
+    )
+    access = store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+    assert access is not None and access.ticket is not None
+
+    store.fake_connection.cursor_instance.row = None
+
+    assert store.get_encounter_access(encounter_id="enc-1", raw_token=access.ticket) is None
+
+
+def test_postgres_ticket_reads_skip_the_database_until_a_write_finds_the_token_revoked() -> None:
+    store = _PostgresStoreWithFakeConnection(row=("HOST", _postgres_state(), 1, []), ticket_ttl_s=300)
+    access = store.get_encounter_access(encounter_id="enc-1", raw_token="host")
+    assert access is not None and access.ticket is not None
+    cursor = store.fake_connection.cursor_instance
+    cursor.commands.clear()
+
+    by_ticket = store.get_encounter_access(encounter_id="enc-1", raw_token=access.ticket)
+    assert by_ticket is not None and by_ticket.role == "HOST"
+    assert cursor.commands == []
+
+    cursor.row = None
+    assert store.apply_action(encounter_id="enc-1", raw_token=access.ticket, action={"type": "NEXT_TURN"}) is None
+    assert store.get_encounter_access(encounter_id="enc-1", raw_token=access.ticket) is None
@@ -0,0 +1,68 @@
+import json
+import time
+
+from dndtracker.backend.profiling import RequestProfiler, fold_stack
+from dndtracker.backend.store import InMemoryEncounterStore
+from dndtracker.backend.tracing import TRACER, Tracer, statement_name
+
+
+def test_disabled_tracer_hands_out_one_shared_null_span() -> None:
+    tracer = Tracer()
+
+    with tracer.span("reduce_event"), tracer.sql("INSERT INTO encounters VALUES (%s)"):
+        pass
+
+    assert tracer.span("a") is tracer.span("b")
+    assert tracer.events() == []
+
+
+def test_statement_names_carry_verb_and_table() -> None:
+    assert statement_name("\n    INSERT INTO encounter_snapshots (id) VALUES (%s)") == "INSERT encounter_snapshots"
+    assert statement_name("UPDATE encounters SET version = %s") == "UPDATE encounters"
+    assert statement_name("SELECT s.state_json FROM (SELECT 1) s") == "SELECT"
+
+
+def test_store_spans_export_as_chrome_trace(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(TRACER, "enabled", False)
+    TRACER.reset()
+    store = InMemoryEncounterStore(server_salt="test-salt")
+    created = store.create_encounter(name="Session 1", host_token="host", player_token="player")
+
+    TRACER.enable()
+    try:
+        store.apply_action(encounter_id=created.encounter_id, raw_token="host", action={"type": "NEXT_TURN"})
+        target = tmp_path / "trace" / "trace.json"
+        TRACER.export(target)
+    finally:
+        TRACER.reset()
+
+    events = json.loads(target.read_text(encoding="utf-8"))["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    assert [span["name"] for span in spans] == ["reduce_event"]
+    assert spans[0]["dur"] >= 0
+    assert {event["name"] for event in events if event["ph"] == "M"} == {"thread_name"}
+
+
+def test_profiler_keeps_folded_stacks_of_slow_requests_only(tmp_path) -> None:
+    profiler = RequestProfiler(directory=tmp_path, threshold_ms=50, interval_s=0.001, header_secret="s3cret")
+
+    assert profiler.wants({"x-dndtracker-profile": "s3cret"})
+    assert not profiler.wants({"x-dndtracker-profile": "1"})
+    assert not profiler.wants({})
+    assert not RequestProfiler(directory=tmp_path).wants({"x-dndtracker-profile": "1"})
+    assert RequestProfiler(directory=tmp_path, profile_all=True).wants({})
+
+    fast = profiler.start()
+    assert profiler.finish(fast, "GET /api/encounters/{encounter_id}", duration_s=0.001) is None
+
+    slow = profiler.start()
+    started = time.perf_counter()
+    while time.perf_counter() - started < 0.05:
+        fold_stack(None)
+    written = profiler.finish(slow, "POST /api/encounters/{encounter_id}/actions", duration_s=0.06)
+
+    assert written is not None
+    assert written.name.endswith("-POST-api-encounters-encounter-id-actions-60ms.folded")
+    lines = written.read_text(encoding="utf-8").splitlines()
+    assert any("test_profiler_keeps_folded_stacks_of_slow_requests_only (test_tracing.py:" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from dndtracker.backend.writebehind import WriteBehindLog
+
+
+def _state(encounter_id: str, version: int) -> dict:
+    return {"id": encounter_id, "version": version}
+
+
+def _statement(encounter_id: str, version: int) -> tuple[str, tuple]:
+    return ("INSERT", (encounter_id, version))
+
+
+class _RecordingWriter:
+    def __init__(self, failures: int = 0) -> None:
+        self.calls: list[list[tuple[str, tuple]]] = []
+        self.failures = failures
+
+    async def __call__(self, statements: list[tuple[str, tuple]]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        self.calls.append(list(statements))
+
+
+def _add(log: WriteBehindLog, encounter_id: str, version: int) -> None:
+    log.add(
+        encounter_id=encounter_id,
+        state=_state(encounter_id, version),
+        checkpoint_version=1,
+        statements=[_statement(encounter_id, version)],
+    )
+
+
+def test_flush_commits_writes_of_all_encounters_in_one_call_and_unpins_them() -> None:
+    writer = _RecordingWriter()
+    log = WriteBehindLog(write=writer)
+    _add(log, "enc-1", 2)
+    _add(log, "enc-2", 5)
+    _add(log, "enc-1", 3)
+
+    assert log.latest("enc-1") == (_state("enc-1", 3), 1)
+    asyncio.run(log.flush())
+
+    assert writer.calls == [[_statement("enc-1", 2), _statement("enc-2", 5), _statement("enc-1", 3)]]
+    assert log.pending == 0
+    assert log.latest("enc-1") is None
+    assert log.latest("enc-2") is None
+
+
+def test_background_flusher_commits_early_once_max_events_are_waiting() -> None:
+    writer = _RecordingWriter()
+    log = WriteBehindLog(write=writer, window_s=60, max_events=2)
+
+    async def scenario() -> None:
+        await log.start()
+        _add(log, "enc-1", 2)
+        await asyncio.sleep(0.01)
+        assert writer.calls == []
+        _add(log, "enc-2", 2)
+        for _ in range(100):
+            if writer.calls:
+                break
+            await asyncio.sleep(0.01)
+        await log.stop()
+
+    asyncio.run(scenario())
+
+    assert writer.calls == [[_statement("enc-1", 2), _statement("enc-2", 2)]]
+
+
+def test_failed_flush_keeps_writes_in_order_and_state_pinned() -> None:
+    writer = _RecordingWriter(failures=1)
+    log = WriteBehindLog(write=writer)
+    _add(log, "enc-1", 2)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(log.flush())
+    _add(log, "enc-1", 3)
+
+    assert log.pending == 2
+    assert log.latest("enc-1") == (_state("enc-1", 3), 1)
+    asyncio.run(log.flush())
+    assert writer.calls == [[_statement("enc-1", 2), _statement("enc-1", 3)]]
+    assert log.latest("enc-1") is None
+
+
+def test_stop_flushes_everything_buffered_within_the_window() -> None:
+    writer = _RecordingWriter()
+    log = WriteBehindLog(write=writer, window_s=60)
+
+    async def scenario() -> None:
+        await log.start()
+        _add(log, "enc-1", 2)
+        await log.stop()
+
+    asyncio.run(scenario())
+
+    assert writer.calls == [[_statement("enc-1", 2)]]
+    assert log.pending == 0
+
+
+class _RejectingWriter:
+    """Rejects every write that touches `rejected`, like a constraint violation would."""
+
+    def __init__(self, rejected: str) -> None:
+        self.rejected = rejected
+        self.calls: list[list[tuple[str, tuple]]] = []
+
+    async def __call__(self, statements: list[tuple[str, tuple]]) -> None:
+        if any(params[0] == self.rejected for _, params in statements):
+            raise ValueError("constraint violated")
+        self.calls.append(list(statements))
+
+
+def test_permanently_rejected_encounter_is_dead_lettered_without_blocking_others() -> None:
+    writer = _RejectingWriter(rejected="enc-1")
+    dropped: list[str] = []
+    log = WriteBehindLog(
+        write=writer,
+        is_permanent=lambda exc: isinstance(exc, ValueError),
+        on_dropped=dropped.append,
+    )
+    _add(log, "enc-1", 2)
+    _add(log, "enc-2", 5)
+    _add(log, "enc-1", 3)
+
+    asyncio.run(log.flush())
+
+    assert writer.calls == [[_statement("enc-2", 5)]]
+    assert [(write.encounter_id, write.version) for write in log.dead_letters] == [("enc-1", 2), ("enc-1", 3)]
+    assert dropped == ["enc-1"]
+    assert log.pending == 0
+    assert log.latest("enc-1") is None
+    assert log.latest("enc-2") is None
+
+
+def test_full_buffer_holds_writers_back_until_a_flush_makes_room() -> None:
+    writer = _RecordingWriter()
+    log = WriteBehindLog(write=writer, window_s=60, max_events=2, max_buffered=2)
+
+    async def scenario() -> list[int]:
+        await log.start()
+        _add(log, "enc-1", 2)
+        _add(log, "enc-1", 3)
+        await asyncio.wait_for(log.wait_for_room(), timeout=1)
+        seen = [log.pending]
+        await log.stop()
+        return seen
+
+    assert asyncio.run(scenario()) == [0]
+    assert writer.calls == [[_statement("enc-1", 2), _statement("enc-1", 3)]]
@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+
+from dndtracker.benchmarks import all_benchmarks
+from dndtracker.benchmarks.__main__ import BASELINE_PATH, main
+from dndtracker.benchmarks.harness import (
+    Benchmark,
+    BenchmarkResult,
+    Comparison,
+    compare,
+    measure,
+    read_results,
+    write_results,
+)
+
+
+def _result(name: str, median_us: float) -> BenchmarkResult:
+    return BenchmarkResult(name=name, samples=3, number=10, median_us=median_us, min_us=median_us, max_us=median_us)
+
+
+def test_measure_discards_the_warm_up_sample_and_tears_down() -> None:
+    calls: list[str] = []
+
+    @contextmanager
+    def setup():
+        calls.append("setup")
+        yield lambda: calls.append("call")
+        calls.append("teardown")
+
+    result = measure(Benchmark(name="noop", setup=setup, number=10), samples=3, scale=0.5)
+
+    assert result.samples == 3
+    assert result.number == 5
+    assert calls.count("call") == 4 * 5
+    assert calls[0] == "setup" and calls[-1] == "teardown"
+    assert result.min_us <= result.median_us <= result.max_us
+
+
+def test_compare_flags_slowdowns_beyond_the_threshold() -> None:
+    baseline = {"same": _result("same", 10.0), "slow": _result("slow", 10.0), "gone": _result("gone", 1.0)}
+    current = {"same": _result("same", 11.0), "slow": _result("slow", 13.0), "fast": _result("fast", 1.0)}
+
+    comparisons = compare(baseline, current)
+
+    assert [(item.name, item.status(0.25)) for item in comparisons] == [
+        ("same", "ok"),
+        ("slow", "regressed"),
+        ("gone", "missing"),
+        ("fast", "new"),
+    ]
+    assert Comparison(name="quicker", baseline_us=10.0, current_us=5.0).status(0.25) == "improved"
+
+
+def test_compare_command_exits_non_zero_on_regression(tmp_path) -> None:
+    baseline = tmp_path / "baseline.json"
+    current = tmp_path / "current.json"
+    write_results(baseline, [_result("engine.action.next_turn", 10.0)])
+    write_results(current, [_result("engine.action.next_turn", 20.0)])
+
+    assert read_results(current)["engine.action.next_turn"].median_us == 20.0
+    assert main(["compare", str(current), "--baseline", str(baseline)]) == 1
+    assert main(["compare", str(current), "--baseline", str(baseline), "--threshold", "1.5"]) == 0
+
+
+def test_every_benchmark_runs_and_is_in_the_baseline() -> None:
+    benchmarks = all_benchmarks()
+    quick = [benchmark for benchmark in benchmarks if not benchmark.name.startswith("api.")]
+
+    results = [measure(benchmark, samples=1, scale=0.001) for benchmark in quick]
+
+    assert all(result.median_us > 0 for result in results)
+    assert {benchmark.name for benchmark in benchmarks} <= set(read_results(BASELINE_PATH))
@@ -11,8 +11,9 @@ from backend.store import InMemoryEncounterStore, PostgresEncounterStore
 
 
 class FakeCursor:
-    def __init__(self, statements: list[tuple[str, tuple]]):
+    def __init__(self, statements: list[tuple[str, tuple]], access: EncounterAccess | None):
         self._statements = statements
+        self._access = access
 
     def __enter__(self):
         return self
@@ -23,10 +24,16 @@ class FakeCursor:
     def execute(self, sql: str, params: tuple):
         self._statements.append((sql.strip(), params))
 
+    def fetchone(self):
+        if self._access is None:
+            return None
+        return (self._access.role, self._access.state, self._access.state["version"], [])
+
 
 class FakeConnection:
-    def __init__(self, statements: list[tuple[str, tuple]]):
+    def __init__(self, statements: list[tuple[str, tuple]], access: EncounterAccess | None):
         self._statements = statements
+        self._access = access
         self.committed = False
 
     def __enter__(self):
@@ -36,7 +43,7 @@ class FakeConnection:
         return False
 
     def cursor(self):
-        return FakeCursor(self._statements)
+        return FakeCursor(self._statements, self._access)
 
     def commit(self):
         self.committed = True
@@ -45,12 +52,8 @@ class FakeConnection:
 class FakePostgresStore(PostgresEncounterStore):
     def __init__(self, access: EncounterAccess | None):
         super().__init__(database_url="postgresql://unused", server_salt="salt")
-        self._access = access
         self.statements: list[tuple[str, tuple]] = []
-        self.conn = FakeConnection(self.statements)
-
-    def get_encounter_access(self, encounter_id: str, raw_token: str):
-        return self._access
+        self.conn = FakeConnection(self.statements, access)
 
     def _connect(self):
         return self.conn
@@ -95,7 +98,7 @@ class Issue05RollsChatTests(unittest.TestCase):
         self.assertEqual(len(state["log"]), 4)
         self.assertEqual(state["log"][0]["kind"], "roll")
 
-    def test_postgres_append_roll_persists_roll_and_snapshot(self):
+    def test_postgres_append_roll_persists_roll_and_event(self):
         base_state = build_initial_state(encounter_id="enc-1", name="Issue5")
         access = EncounterAccess(encounter_id="enc-1", role="PLAYER", state=base_state)
         store = FakePostgresStore(access=access)
@@ -107,12 +110,13 @@ class Issue05RollsChatTests(unittest.TestCase):
         self.assertEqual(state["version"], 2)
         self.assertEqual(state["log"][-1]["kind"], "roll")
         self.assertTrue(store.conn.committed)
-        self.assertEqual(len(store.statements), 3)
-        self.assertIn("INSERT INTO encounter_rolls", store.statements[0][0])
-        self.assertIn("INSERT INTO encounter_snapshots", store.statements[1][0])
-        self.assertIn("UPDATE encounters", store.statements[2][0])
+        self.assertEqual(len(store.statements), 4)
+        self.assertIn("FOR UPDATE OF e", store.statements[0][0])
+        self.assertIn("INSERT INTO encounter_events", store.statements[1][0])
+        self.assertIn("INSERT INTO encounter_rolls", store.statements[2][0])
+        self.assertIn("UPDATE encounters", store.statements[3][0])
 
-    def test_postgres_append_chat_persists_chat_and_snapshot(self):
+    def test_postgres_append_chat_persists_chat_and_event(self):
         base_state = build_initial_state(encounter_id="enc-2", name="Issue5")
         access = EncounterAccess(encounter_id="enc-2", role="HOST", state=base_state)
         store = FakePostgresStore(access=access)
@@ -125,10 +129,11 @@ class Issue05RollsChatTests(unittest.TestCase):
         self.assertEqual(state["chat"][-1]["text"], "Ping")
         self.assertEqual(state["chat"][-1]["whoLabel"], "Host")
         self.assertTrue(store.conn.committed)
-        self.assertEqual(len(store.statements), 3)
-        self.assertIn("INSERT INTO encounter_chat", store.statements[0][0])
-        self.assertIn("INSERT INTO encounter_snapshots", store.statements[1][0])
-        self.assertIn("UPDATE encounters", store.statements[2][0])
+        self.assertEqual(len(store.statements), 4)
+        self.assertIn("FOR UPDATE OF e", store.statements[0][0])
+        self.assertIn("INSERT INTO encounter_events", store.statements[1][0])
+        self.assertIn("INSERT INTO encounter_chat", store.statements[2][0])
+        self.assertIn("UPDATE encounters", store.statements[3][0])
 
     def test_server_roll_overrides_value_and_bounds(self):
         store = InMemoryEncounterStore(server_salt="salt")
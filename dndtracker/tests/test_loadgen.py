@@ -0,0 +1,53 @@
+import pytest
+
+from dndtracker.loadgen import LoadReport, Listener, Sample, Table, parse_mix, percentile, summarize
+
+
+def test_parse_mix_reads_weights_and_rejects_unknown_operations() -> None:
+    assert parse_mix("next_turn=4, chat") == {"next_turn": 4.0, "chat": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("fireball=1")
+    with pytest.raises(ValueError):
+        parse_mix("chat=0")
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([3.0], 0.99) == 3.0
+    assert percentile([], 0.5) is None
+
+
+def test_listener_finds_the_first_frame_holding_a_version_across_coalesced_states() -> None:
+    listener = Listener()
+    listener.record({"type": "state.full", "state": {"version": 1}}, at=1.0)
+    listener.record({"type": "state.patch", "version": 2}, at=2.0)
+    listener.record({"type": "ack", "version": 9}, at=2.5)
+    listener.record({"type": "state.full", "state": {"version": 5}}, at=3.0)
+
+    assert listener.first_holding(2) == 2.0
+    assert listener.first_holding(4) == 3.0
+    assert listener.first_holding(6) is None
+
+
+def test_summarize_counts_every_socket_of_the_encounter() -> None:
+    fast, slow = Listener(), Listener()
+    fast.record({"type": "state.patch", "version": 2}, at=10.010)
+    slow.record({"type": "state.patch", "version": 2}, at=10.050)
+    table = Table(encounter_id="enc", host_token="h", player_token="p", player_ids=[], listeners=[fast, slow])
+    report = LoadReport(encounters=1, sockets_per_encounter=2, duration_s=1.0, target_rate=1.0)
+
+    summarize(
+        [
+            Sample(operation="chat", table=table, started=10.0, responded=10.005, version=2),
+            Sample(operation="chat", table=table, started=10.2, responded=10.205, version=3),
+        ],
+        report,
+    )
+
+    assert (report.deliveries, report.missed) == (2, 2)
+    assert report.broadcast_ms["all"]["p50"] == pytest.approx(10.0)
+    assert report.broadcast_ms["chat"]["max"] == pytest.approx(50.0)
+    assert report.response_ms["p50"] == pytest.approx(5.0)